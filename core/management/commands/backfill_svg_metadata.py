@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.services.metadata import backfill_metadata
+
+
+class Command(BaseCommand):
+    help = 'Extrai viewBox, dimensões, contagens e estilo (outline/fill) dos SVGs sem metadados, em lotes paralelos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None, help='Processos de parse (padrão: nº de CPUs; 1 = inline).')
+        parser.add_argument('--force', action='store_true', help='Reprocessa todas as linhas, não só as pendentes.')
+
+    def handle(self, *args, **options):
+        count = backfill_metadata(batch_size=options['batch_size'], workers=options['workers'], force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f"{count} SVGs com metadados atualizados."))
@@ -0,0 +1,60 @@
+import gzip
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.utils.serialization import dumps
+from core.utils.search_index import build_index, decode_index, search
+
+WORDS = (
+    'icon arrow home user cart star heart mail phone camera cloud lock search settings bell '
+    'calendar chart file folder image music play pause video map pin flag gift tag trash'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Mede tamanho e latência do índice da busca instantânea (binário vs JSON) com dados sintéticos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--docs', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        docs = [
+            {
+                'id': i + 1,
+                'title': ' '.join(rng.sample(WORDS, 3)) + f' {i}',
+                'price_cents': rng.choice((0, 0, 490, 990, 1990)),
+                'has_thumbnail': True,
+                'tags': rng.sample(WORDS, 2),
+            }
+            for i in range(options['docs'])
+        ]
+
+        start = time.perf_counter()
+        data = build_index(docs)
+        build_ms = (time.perf_counter() - start) * 1000
+        as_json = dumps(docs)
+        self.stdout.write(f"{len(docs)} documentos (geração {build_ms:.0f} ms)")
+        self.stdout.write(f"  binário: {len(data) / 1024:8.1f} KiB  gzip {len(gzip.compress(data)) / 1024:8.1f} KiB")
+        self.stdout.write(f"  JSON*:   {len(as_json) / 1024:8.1f} KiB  gzip {len(gzip.compress(as_json)) / 1024:8.1f} KiB")
+        self.stdout.write("  (* só a lista de documentos, sem postings: o cliente teria que indexar ao carregar)")
+
+        start = time.perf_counter()
+        _, _, postings = decode_index(data)
+        tokens = sorted(postings)
+        self.stdout.write(f"  decodificação (Python): {(time.perf_counter() - start) * 1000:.0f} ms, {len(tokens)} tokens")
+
+        queries = [rng.choice(WORDS)[:rng.randint(1, 4)] + (' ' + rng.choice(WORDS)[:3] if rng.random() < 0.3 else '') for _ in range(options['queries'])]
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            search(postings, tokens, query)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        p50 = timings[len(timings) // 2] * 1e6
+        p95 = timings[int(len(timings) * 0.95)] * 1e6
+        self.stdout.write(f"  busca (Python, referência): p50 {p50:.0f} µs, p95 {p95:.0f} µs")
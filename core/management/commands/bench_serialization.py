@@ -0,0 +1,44 @@
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import SvgFile
+from core.serializers import SvgFileSerializer
+from core.utils import serialization
+
+
+class Command(BaseCommand):
+    help = 'Mede o custo por linha da serialização JSON (DRF vs values()+json vs values()+orjson).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _measure(self, label, func, rows, repeat):
+        best = min(self._time(func) for _ in range(repeat))
+        self.stdout.write(f"{label:<28} {best * 1e6 / rows:8.2f} µs/linha  ({best * 1000:.1f} ms total)")
+
+    @staticmethod
+    def _time(func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        now = datetime.now(dt_timezone.utc)
+        # Dados em memória: mede só a serialização, não o banco
+        instances = [SvgFile(pk=i, title_name=f'Icon {i}', uploaded_at=now, price=Decimal('9.90')) for i in range(rows)]
+        dicts = [{'id': i, 'title_name': f'Icon {i}', 'uploaded_at': now, 'price': Decimal('9.90')} for i in range(rows)]
+
+        self.stdout.write(f"{rows} linhas, melhor de {repeat} execuções")
+        self._measure('DRF ModelSerializer + json', lambda: json.dumps(SvgFileSerializer(instances, many=True).data, cls=DjangoJSONEncoder), rows, repeat)
+        self._measure('values() + json (stdlib)', lambda: json.dumps({'results': dicts}, cls=DjangoJSONEncoder), rows, repeat)
+        if serialization.orjson is not None:
+            self._measure('values() + orjson', lambda: serialization.dumps({'results': dicts}), rows, repeat)
+        else:
+            self.stdout.write(self.style.WARNING('orjson não instalado; usando fallback da stdlib em FastJsonResponse.'))
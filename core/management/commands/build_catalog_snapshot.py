@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.services.snapshot import build_snapshot, snapshot_root
+
+
+class Command(BaseCommand):
+    help = 'Gera o snapshot estático (NDJSON gzip em shards + manifest) do catálogo público; só reescreve shards alterados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenera todos os shards mesmo sem mudança de versão.')
+
+    def handle(self, *args, **options):
+        result = build_snapshot(force=options['force'])
+        if result['skipped']:
+            self.stdout.write(f"Catálogo sem alterações (geração {result['generation']}); nada a fazer.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot g{result['generation']} em {snapshot_root()}: {result['rebuilt']} de {result['shards']} shards "
+            f"regenerados, {result['removed']} arquivos antigos removidos."
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SvgFile
+from core.services.codegen import build_bundle, ensure_artifacts, library_selections, plan_items
+from core.utils.codegen import FORMATS
+
+
+class Command(BaseCommand):
+    help = ('Pré-gera os artefatos de exportação de código (JSX/TSX/Vue/glifos) dos SVGs públicos e os ZIPs das '
+            'bibliotecas compartilhadas; só o que mudou é refeito.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS + ['all'], default='all')
+        parser.add_argument('--workers', type=int, default=None, help='Processos de geração (padrão: nº de CPUs).')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--skip-libraries', action='store_true', help='Não monta os ZIPs das bibliotecas.')
+
+    def handle(self, *args, **options):
+        import os
+
+        workers = options['workers'] or os.cpu_count() or 1
+        formats = FORMATS if options['format'] == 'all' else [options['format']]
+        svgs = list(SvgFile.objects.filter(is_public=True).order_by('id').only('id', 'title_name', 'content', 'content_hash'))
+        for fmt in formats:
+            stats = ensure_artifacts(plan_items(svgs, fmt), fmt, workers=workers, batch_size=options['batch_size'])
+            self.stdout.write(
+                f"{fmt}: {stats['total']} SVGs, {stats['reused']} reaproveitados, "
+                f"{stats['generated']} gerados ({stats['invalid']} inválidos)"
+            )
+            if options['skip_libraries']:
+                continue
+            # A view serve estes ZIPs prontos: a biblioteca inteira nunca é gerada dentro da requisição
+            for scope, queryset in library_selections().items():
+                library = list(queryset)
+                if not library:
+                    continue
+                relative, _ = build_bundle(library, fmt, workers=workers)
+                self.stdout.write(f"{fmt}: biblioteca '{scope}' em {relative}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.services.similarity import DEFAULT_TOP_K, build_neighbors
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os vizinhos similares dos SVGs públicos (incremental por padrão).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recalcula todos os vizinhos, ignorando o estado anterior.')
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+        parser.add_argument('--block-size', type=int, default=None,
+                            help='Linhas por bloco (padrão: derivado do tamanho do catálogo, ~64 MB por bloco).')
+
+    def handle(self, *args, **options):
+        stats = build_neighbors(full=options['full'], top_k=options['top_k'], block_size=options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['items']} SVGs; {stats['changed']} alterados, {stats['removed']} removidos, "
+            f"{stats['recomputed']} recalculados, {stats['merged']} mesclados."
+        ))
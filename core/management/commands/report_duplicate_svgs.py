@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SvgFile
+from core.services.duplicates import backfill_fingerprints, duplicate_clusters, max_distance
+
+
+class Command(BaseCommand):
+    help = 'Lista clusters de SVGs quase duplicados (mesma geometria, ignorando ids/cores/espaços).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-distance', type=int, default=None, help='Distância de Hamming máxima entre fingerprints.')
+        parser.add_argument('--public-only', action='store_true')
+        parser.add_argument('--backfill', action='store_true', help='Calcula antes os fingerprints ausentes.')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            count = backfill_fingerprints()
+            self.stdout.write(f"{count} fingerprints calculados.")
+
+        distance = options['max_distance'] if options['max_distance'] is not None else max_distance()
+        clusters = duplicate_clusters(distance=distance, public_only=options['public_only'])
+        titles = dict(SvgFile.objects.filter(pk__in=[pk for c in clusters for pk in c]).values_list('pk', 'title_name'))
+        for index, cluster in enumerate(clusters, start=1):
+            self.stdout.write(f"Cluster {index} ({len(cluster)} SVGs):")
+            for pk in cluster:
+                self.stdout.write(f"  #{pk} {titles.get(pk, '')}")
+        self.stdout.write(self.style.SUCCESS(f"{len(clusters)} clusters de quase-duplicatas encontrados."))
@@ -14,6 +14,7 @@ class SvgFile(models.Model):
     tags = models.CharField(max_length=255, blank=True, help_text="Tags separadas por vírgula")
     content = models.TextField(help_text="Conteúdo do arquivo SVG (texto XML)")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     # Armazena thumbnails em pasta privada para proteção via guardian
     thumbnail = models.ImageField(upload_to='private/thumbnails/', null=True, blank=True)
     owner = models.ForeignKey(
@@ -24,17 +25,64 @@ class SvgFile(models.Model):
     is_public = models.BooleanField(default=False)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Preço para venda do SVG (0 = gratuito)")
     hash_value = models.CharField(max_length=64, unique=True, blank=True)
+    # Contadores de popularidade: atualizados em lote por core.services.popularity
+    impression_count = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(default=0)
+    copy_count = models.PositiveIntegerField(default=0)
+    favorite_count = models.IntegerField(default=0)
+    # Score com decaimento exponencial relativo a uma época fixa (ver popularity.trending_weight)
+    trending_score = models.FloatField(default=0.0)
+    # SimHash da geometria (core.utils.fingerprint) e suas 4 faixas de 16 bits (índice LSH)
+    shape_hash = models.BigIntegerField(null=True, blank=True, editable=False)
+    shape_band0 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    shape_band1 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    shape_band2 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    shape_band3 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    # Metadados extraídos na ingestão (core.utils.svg_metadata); backfill: `backfill_svg_metadata`
+    viewbox = models.CharField(max_length=64, blank=True, editable=False)
+    width = models.FloatField(null=True, blank=True, editable=False)
+    height = models.FloatField(null=True, blank=True, editable=False)
+    element_count = models.PositiveIntegerField(default=0, editable=False)
+    path_count = models.PositiveIntegerField(default=0, editable=False)
+    path_command_count = models.PositiveIntegerField(default=0, editable=False)
+    paint_style = models.CharField(
+        max_length=8, blank=True, editable=False,
+        choices=[('outline', 'Outline'), ('fill', 'Fill'), ('mixed', 'Mixed')],
+    )
+    byte_size = models.PositiveIntegerField(default=0, editable=False)
+    # SHA-256 do markup: chave de caches derivados do conteúdo (recoloração, exportações)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
+    metadata_version = models.PositiveSmallIntegerField(default=0, editable=False, db_index=True)
+
+    class Meta:
+        # Índices no formato das consultas quentes (listagens públicas, admin_svg, facetas de preço).
+        # Os parciais (WHERE is_public) ficam menores e são usados por toda listagem pública.
+        indexes = [
+            models.Index(fields=['-uploaded_at', 'id'], condition=models.Q(is_public=True), name='core_svg_pub_recent_idx'),
+            models.Index(fields=['title_name', 'id'], condition=models.Q(is_public=True), name='core_svg_pub_title_idx'),
+            models.Index(fields=['-trending_score', '-uploaded_at'], condition=models.Q(is_public=True), name='core_svg_pub_trending_idx'),
+            models.Index(fields=['price'], condition=models.Q(is_public=True), name='core_svg_pub_price_idx'),
+            models.Index(fields=['owner', '-uploaded_at'], name='core_svg_owner_recent_idx'),
+            # Filtros/ordenação por metadados no explore ("outline", "24×24", mais simples primeiro)
+            models.Index(fields=['paint_style', '-uploaded_at'], condition=models.Q(is_public=True), name='core_svg_pub_paint_idx'),
+            models.Index(fields=['width', 'height'], condition=models.Q(is_public=True), name='core_svg_pub_size_idx'),
+            models.Index(fields=['path_command_count', 'id'], condition=models.Q(is_public=True), name='core_svg_pub_complexity_idx'),
+            # Delta do autocomplete (updated_at >= última sincronização); sem condição: despublicar também conta
+            models.Index(fields=['updated_at'], name='core_svg_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title_name} ({self.uploaded_at.isoformat()})"
     
-    def get_thumbnail_url(self):
+    def get_thumbnail_url(self, user=None):
         """
         Retorna a URL protegida da thumbnail via guardian.
-        Para thumbnails existentes, usa a URL protegida.
+        Públicas (ou privadas com `user` autorizado) recebem URL assinada com
+        validade, servida sem consulta ao banco; as demais usam a view com checagem.
         """
         if self.thumbnail:
-            return reverse('guardian:protected_thumbnail', kwargs={'svg_id': self.pk})
+            from guardian.signing import signed_thumbnail_url
+            return signed_thumbnail_url(self, user) or reverse('guardian:protected_thumbnail', kwargs={'svg_id': self.pk})
         return None
     
     def user_access_type(self, user):
@@ -95,7 +143,47 @@ class SvgFile(models.Model):
         )
         return hashlib.sha256(base.encode('utf-8')).hexdigest()
 
+    def update_shape_fingerprint(self):
+        """Recalcula shape_hash e as faixas LSH a partir do conteúdo atual."""
+        from .utils.fingerprint import shape_fingerprint, split_bands, to_signed
+
+        fingerprint = shape_fingerprint(self.content)
+        bands = split_bands(fingerprint) if fingerprint is not None else (None,) * 4
+        self.shape_hash = to_signed(fingerprint) if fingerprint is not None else None
+        self.shape_band0, self.shape_band1, self.shape_band2, self.shape_band3 = bands
+
+    def update_metadata(self):
+        """Recalcula as colunas de metadados (viewBox, dimensões, contagens, estilo) a partir do conteúdo.
+
+        A paleta só é gravada em SvgColor depois do save (precisa do pk).
+        """
+        from .utils.svg_metadata import analyze_content
+
+        metadata, self._pending_colors = analyze_content(self.content)
+        for field, value in metadata.items():
+            setattr(self, field, value)
+
+    def _save_colors(self):
+        colors = getattr(self, '_pending_colors', None)
+        if colors is None:
+            return
+        self.colors.all().delete()
+        SvgColor.objects.bulk_create(
+            SvgColor.from_palette(self.pk, bucket, rgb, share) for bucket, rgb, share in colors
+        )
+        self._pending_colors = None
+
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.update_shape_fingerprint()
+            self.update_metadata()
+            if update_fields is not None:
+                from .utils.svg_metadata import METADATA_FIELDS
+
+                kwargs['update_fields'] = set(update_fields) | {
+                    'shape_hash', 'shape_band0', 'shape_band1', 'shape_band2', 'shape_band3',
+                } | set(METADATA_FIELDS)
         # Apenas gerar hash na criação (quando campo vazio)
         if not self.hash_value:
             # Tentar gerar um hash único; em caso de colisão, acrescenta um salt incremental
@@ -117,4 +205,66 @@ class SvgFile(models.Model):
                     extra = str(attempt)
                     # Continue loop to generate new hash and try saving
         else:
-            super().save(*args, **kwargs)
\ No newline at end of file
+            super().save(*args, **kwargs)
+        self._save_colors()
+
+
+class SvgColor(models.Model):
+    """Cor de fill/stroke de um SvgFile quantizada na paleta fixa (core.utils.palette).
+
+    Índice invertido (bucket, svg): o filtro ?color= é um lookup indexado, sem varrer o markup.
+    """
+    svg = models.ForeignKey(SvgFile, on_delete=models.CASCADE, related_name='colors')
+    bucket = models.PositiveSmallIntegerField()
+    rgb = models.PositiveIntegerField(help_text="Cor original como 0xRRGGBB")
+    share = models.FloatField(help_text="Fração das pinturas do SVG com esta cor")
+    # CIE Lab da cor (calculado na ingestão): chave da ordenação por proximidade de cor no SQL
+    lab_l = models.FloatField(blank=True, null=True)
+    lab_a = models.FloatField(blank=True, null=True)
+    lab_b = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket', 'svg'], name='core_svgcolor_bucket_svg_idx'),
+        ]
+
+    @classmethod
+    def from_palette(cls, svg_id, bucket: int, rgb: int, share: float) -> 'SvgColor':
+        """Linha de SvgColor a partir de uma entrada de extract_colors (com o Lab preenchido)."""
+        from .utils.palette import srgb_to_lab
+
+        lab_l, lab_a, lab_b = srgb_to_lab(((rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF))
+        return cls(svg_id=svg_id, bucket=bucket, rgb=rgb, share=share, lab_l=lab_l, lab_a=lab_a, lab_b=lab_b)
+
+
+class SvgFeatureVector(models.Model):
+    """Vetor de características pré-computado de um SvgFile (float32 serializado)."""
+    svg = models.OneToOneField(SvgFile, on_delete=models.CASCADE, primary_key=True, related_name='feature_vector')
+    signature = models.CharField(max_length=40)
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class SvgNeighbor(models.Model):
+    """Top-K vizinhos por similaridade de cosseno, gerados por `build_similar_svgs`."""
+    svg = models.ForeignKey(SvgFile, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(SvgFile, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['svg', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['svg', 'rank'], name='core_svgneighbor_svg_rank_uniq'),
+        ]
+
+
+class CatalogChange(models.Model):
+    """Log de alterações do catálogo; o maior id é a versão usada nas chaves de cache.
+
+    Fica no banco (e não no cache) para que todos os workers vejam a mesma versão mesmo
+    com cache local por processo. Remoções guardam o pk para a atualização incremental
+    do autocomplete.
+    """
+    deleted_svg_id = models.IntegerField(blank=True, null=True)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
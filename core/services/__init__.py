@@ -1,4 +1,4 @@
-from .models import SvgFile
+from ..models import SvgFile
 
 
 
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+
+from ..models import SvgFile
+from ..utils.prefix_index import PrefixIndex, normalize, terms_for
+from .catalog import catalog_version, deleted_since
+from .popularity import popularity_expression
+
+logger = logging.getLogger(__name__)
+
+# Atrasos maiores que isso (em versões) ou índices mais velhos que o intervalo abaixo
+# são reconstruídos do zero; o ranking de popularidade também é renovado nesse momento.
+MAX_DELTA_VERSIONS = 1000
+
+_lock = threading.Lock()
+_state = {
+    'index': None,
+    'version': 0,
+    'synced_at': None,
+    'built_at': 0.0,
+    'tag_members': defaultdict(dict),
+    'svg_tags': {},
+}
+
+
+def _svg_ref(pk) -> str:
+    return f'svg:{pk}'
+
+
+def _tag_ref(tag: str) -> str:
+    return f'tag:{tag}'
+
+
+def _split_tags(tags: str) -> List[str]:
+    return [t.strip() for t in (tags or '').split(',') if t.strip()]
+
+
+def _catalog_rows(queryset):
+    return queryset.annotate(popularity=popularity_expression()).values_list(
+        'pk', 'title_name', 'tags', 'is_public', 'updated_at', 'popularity'
+    )
+
+
+def _tag_suggestion(members: Dict[int, tuple]) -> dict:
+    # Texto exibido: a grafia mais comum entre os SVGs com a tag
+    spellings = defaultdict(int)
+    for text, _ in members.values():
+        spellings[text] += 1
+    text = max(spellings.items(), key=lambda item: (item[1], item[0]))[0]
+    return {'type': 'tag', 'text': text, 'score': sum(score for _, score in members.values()) + len(members)}
+
+
+def _full_rebuild(version: int) -> None:
+    index = PrefixIndex()
+    tag_members = defaultdict(dict)
+    svg_tags = {}
+    items = []
+    synced_at = None
+    for pk, title, tags, is_public, updated_at, popularity in _catalog_rows(SvgFile.objects.filter(is_public=True)).iterator(chunk_size=2000):
+        synced_at = updated_at if synced_at is None or (updated_at and updated_at > synced_at) else synced_at
+        if title:
+            items.append((_svg_ref(pk), {'type': 'title', 'text': title, 'id': pk, 'score': popularity or 0.0}, terms_for(title)))
+        svg_tags[pk] = set()
+        for tag in _split_tags(tags):
+            tag_members[normalize(tag)][pk] = (tag, popularity or 0.0)
+            svg_tags[pk].add(normalize(tag))
+    for tag_key, members in tag_members.items():
+        items.append((_tag_ref(tag_key), _tag_suggestion(members), [tag_key]))
+    index.bulk_load(items)
+    _state.update(index=index, version=version, synced_at=synced_at, built_at=time.monotonic(), tag_members=tag_members, svg_tags=svg_tags)
+    logger.info("Índice de autocomplete reconstruído: %s sugestões", len(index))
+
+
+def _remove_svg(index: PrefixIndex, pk, touched_tags) -> None:
+    index.remove(_svg_ref(pk))
+    for tag_key in _state['svg_tags'].pop(pk, ()):
+        _state['tag_members'][tag_key].pop(pk, None)
+        touched_tags.add(tag_key)
+
+
+def _apply_delta(version: int) -> None:
+    index: PrefixIndex = _state['index']
+    tag_members = _state['tag_members']
+    touched_tags = set()
+
+    for pk in deleted_since(_state['version'], version):
+        _remove_svg(index, pk, touched_tags)
+
+    synced_at = _state['synced_at']
+    changed = SvgFile.objects.all()
+    if synced_at is not None:
+        # >= para não perder gravações no mesmo instante da última sincronização
+        changed = changed.filter(updated_at__gte=synced_at)
+    for pk, title, tags, is_public, updated_at, popularity in _catalog_rows(changed):
+        if synced_at is None or (updated_at and updated_at > synced_at):
+            synced_at = updated_at
+        _remove_svg(index, pk, touched_tags)
+        if not is_public:
+            continue
+        if title:
+            index.upsert(_svg_ref(pk), {'type': 'title', 'text': title, 'id': pk, 'score': popularity or 0.0}, terms_for(title))
+        _state['svg_tags'][pk] = set()
+        for tag in _split_tags(tags):
+            tag_key = normalize(tag)
+            tag_members[tag_key][pk] = (tag, popularity or 0.0)
+            _state['svg_tags'][pk].add(tag_key)
+            touched_tags.add(tag_key)
+
+    for tag_key in touched_tags:
+        members = tag_members.get(tag_key)
+        if members:
+            index.upsert(_tag_ref(tag_key), _tag_suggestion(members), [tag_key])
+        else:
+            tag_members.pop(tag_key, None)
+            index.remove(_tag_ref(tag_key))
+    _state.update(version=version, synced_at=synced_at)
+
+
+def ensure_fresh() -> PrefixIndex:
+    """Sincroniza o índice local com a versão do catálogo (1 leitura indexada quando nada mudou)."""
+    version = catalog_version()
+    max_age = getattr(settings, 'AUTOCOMPLETE_REBUILD_SECONDS', 600)
+    if _state['index'] is not None and _state['version'] == version and time.monotonic() - _state['built_at'] <= max_age:
+        return _state['index']
+    with _lock:
+        stale = time.monotonic() - _state['built_at'] > max_age
+        if _state['index'] is not None and _state['version'] == version and not stale:
+            return _state['index']
+        if _state['index'] is None or stale or version - _state['version'] > MAX_DELTA_VERSIONS or version < _state['version']:
+            _full_rebuild(version)
+        else:
+            _apply_delta(version)
+        return _state['index']
+
+
+def suggest(query: str, limit: int = 8) -> List[dict]:
+    """Sugestões de títulos e tags para o prefixo digitado, ordenadas por popularidade."""
+    results = ensure_fresh().search(query, limit)
+    return [{key: value for key, value in item.items() if key != 'score'} for item in results]
+
+
+def reset_index() -> None:
+    with _lock:
+        _state.update(index=None, version=0, synced_at=None, built_at=0.0, tag_members=defaultdict(dict), svg_tags={})
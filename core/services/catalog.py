@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from ..models import CatalogChange, SvgColor, SvgFile
+from ..utils.palette import parse_color_query, query_target
+from .popularity import popularity_expression
+
+DEFAULT_SORT = '-uploaded_at'
+
+FIELD_SORTS = ['-uploaded_at', 'uploaded_at', 'title_name', '-title_name']
+RANKED_SORTS = ['popular', 'trending', 'simplest', 'color']
+VALID_SORTS = FIELD_SORTS + RANKED_SORTS
+
+
+def apply_sort(svgfiles, sort_by: str, filters: dict = None):
+    """Aplica a ordenação pedida pelo cliente; valores desconhecidos caem no padrão."""
+    if sort_by == 'color' and filters and filters.get('color'):
+        from .colors import order_by_color_distance
+        return order_by_color_distance(svgfiles, filters['color'])
+    if sort_by == 'popular':
+        return svgfiles.annotate(popularity=popularity_expression()).order_by('-popularity', '-uploaded_at')
+    if sort_by == 'trending':
+        return svgfiles.order_by('-trending_score', '-uploaded_at')
+    if sort_by == 'simplest':
+        # Menos comandos de path primeiro (core_svg_pub_complexity_idx)
+        return svgfiles.order_by('path_command_count', 'id')
+    if sort_by in FIELD_SORTS:
+        return svgfiles.order_by(sort_by)
+    return svgfiles.order_by(DEFAULT_SORT)
+
+
+# Grupos de faceta: cada valor mapeia para a condição aplicada ao queryset
+ACCESS_VALUES = {
+    'free': Q(price=0),
+    'paid': Q(price__gt=0),
+}
+PRICE_BANDS = {
+    'under_10': Q(price__gt=0, price__lt=10),
+    '10_50': Q(price__gte=10, price__lt=50),
+    '50_plus': Q(price__gte=50),
+}
+# Metadados extraídos na ingestão (core.utils.svg_metadata), consultados por índices parciais
+STYLE_VALUES = {
+    'outline': Q(paint_style='outline'),
+    'fill': Q(paint_style='fill'),
+    'mixed': Q(paint_style='mixed'),
+}
+SIZE_VALUES = {size: Q(width=int(size), height=int(size)) for size in ('16', '20', '24', '32', '48')}
+NEW_DAYS = 7
+TRUE_VALUES = ('1', 'true', 'on')
+
+
+def parse_filters(params) -> dict:
+    """Normaliza os filtros de explore/search_svg; valores desconhecidos são ignorados."""
+    access = params.get('access', '').strip()
+    band = params.get('band', '').strip()
+    style = params.get('style', '').strip()
+    size = params.get('size', '').strip()
+    return {
+        'q': params.get('q', '').strip(),
+        'tag': params.get('tag', '').strip(),
+        'access': access if access in ACCESS_VALUES else '',
+        'band': band if band in PRICE_BANDS else '',
+        'color': parse_color_query(params.get('color', '')) or '',
+        'style': style if style in STYLE_VALUES else '',
+        'size': size if size in SIZE_VALUES else '',
+        'owned': params.get('owned', '').lower() in TRUE_VALUES,
+        'new': params.get('new', '').lower() in TRUE_VALUES,
+    }
+
+
+def new_since():
+    return timezone.now() - timedelta(days=NEW_DAYS)
+
+
+def base_queryset(filters: dict, user):
+    """SVGs públicos casando com a busca textual (parte fixa do WHERE, comum a todas as facetas)."""
+    svgfiles = SvgFile.objects.filter(is_public=True)
+    if filters['q']:
+        svgfiles = svgfiles.filter(title_name__icontains=filters['q'])
+    if user is not None and user.is_authenticated:
+        from payment.models import Purchase
+        svgfiles = svgfiles.annotate(is_owned=Exists(Purchase.objects.filter(user=user, svg=OuterRef('pk'))))
+    return svgfiles
+
+
+def filter_conditions(filters: dict, user) -> dict:
+    """Condição de cada grupo de faceta ativo ({grupo: Q})."""
+    conditions = {}
+    if filters['tag']:
+        conditions['tag'] = Q(tags__icontains=filters['tag'])
+    if filters['access']:
+        conditions['access'] = ACCESS_VALUES[filters['access']]
+    if filters['band']:
+        conditions['band'] = PRICE_BANDS[filters['band']]
+    if filters['color']:
+        bucket, _ = query_target(filters['color'])
+        conditions['color'] = Q(Exists(SvgColor.objects.filter(svg=OuterRef('pk'), bucket=bucket)))
+    if filters['style']:
+        conditions['style'] = STYLE_VALUES[filters['style']]
+    if filters['size']:
+        conditions['size'] = SIZE_VALUES[filters['size']]
+    if filters['owned']:
+        authenticated = user is not None and user.is_authenticated
+        conditions['owned'] = Q(is_owned=True) if authenticated else Q(pk__in=[])
+    if filters['new']:
+        conditions['new'] = Q(uploaded_at__gte=new_since())
+    return conditions
+
+
+def accessible_queryset(user):
+    """SVGs públicos que o usuário pode copiar (mesma regra de SvgFile.user_access_type, em SQL)."""
+    svgfiles = SvgFile.objects.filter(is_public=True)
+    if getattr(user, 'is_vip', False):
+        return svgfiles
+    if user is None or not user.is_authenticated:
+        return svgfiles.filter(price=0)
+    from payment.models import Purchase
+    return svgfiles.filter(Q(price=0) | Exists(Purchase.objects.filter(user=user, svg=OuterRef('pk'))))
+
+
+def apply_filters(filters: dict, user):
+    svgfiles = base_queryset(filters, user)
+    for condition in filter_conditions(filters, user).values():
+        svgfiles = svgfiles.filter(condition)
+    return svgfiles
+
+
+# Remoções ficam registradas por versão; índices mais atrasados que isso são reconstruídos do zero
+CATALOG_LOG_TTL = 60 * 60 * 24
+# A cada quantas versões o log antigo é podado
+CATALOG_PRUNE_EVERY = 1000
+
+
+def catalog_version() -> int:
+    """Contador global de alterações do catálogo: MAX(id) do CatalogChange (leitura só do índice)."""
+    version = CatalogChange.objects.aggregate(version=Max('id'))['version']
+    return version or 0
+
+
+def bump_catalog_version(deleted_pk=None) -> int:
+    """Registra uma alteração do catálogo e devolve a nova versão; remoções guardam o pk."""
+    version = CatalogChange.objects.create(deleted_svg_id=deleted_pk).pk
+    if version % CATALOG_PRUNE_EVERY == 0:
+        cutoff = timezone.now() - timedelta(seconds=CATALOG_LOG_TTL)
+        # A última linha fica sempre: é ela que guarda a versão atual
+        CatalogChange.objects.filter(changed_at__lt=cutoff, id__lt=version).delete()
+    return version
+
+
+def log_covers(version: int, current: int) -> bool:
+    """True se o log ainda tem todas as versões entre `version` (exclusivo) e `current`."""
+    if current <= version:
+        return current == version
+    present = CatalogChange.objects.filter(id__gt=version, id__lte=current).count()
+    return present == current - version
+
+
+def deleted_since(version: int, current: int):
+    """pks removidos entre `version` (exclusivo) e `current`."""
+    return list(
+        CatalogChange.objects.filter(id__gt=version, id__lte=current, deleted_svg_id__isnull=False)
+        .values_list('deleted_svg_id', flat=True)
+    )
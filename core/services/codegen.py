@@ -0,0 +1,218 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import zipfile
+from functools import partial
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+
+from ..utils.codegen import (
+    COMPONENT_FORMATS, FONT_AVAILABLE, FONT_FORMAT, GENERATOR_VERSION, build_font, component_name, font_css,
+    generate_batch, slug,
+)
+from ..utils.workers import map_batches
+from .exports import ExportUnavailable
+from .recolor import content_digest
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_EXTENSIONS = {'jsx': 'jsx', 'tsx': 'tsx', 'vue': 'vue', FONT_FORMAT: 'json'}
+CONTENT_TYPES = {'jsx': 'text/javascript', 'tsx': 'text/plain', 'vue': 'text/plain'}
+
+
+def codegen_dir() -> str:
+    # Relativo ao MEDIA_ROOT, dentro de private/: downloads saem via guardian
+    return getattr(settings, 'CODEGEN_CACHE_DIR', 'private/codegen')
+
+
+def _absolute(relative: str) -> Path:
+    return Path(settings.MEDIA_ROOT) / relative
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def max_sync_items() -> int:
+    """Máximo de artefatos gerados dentro da requisição; acima disso a exportação espera o build_code_exports."""
+    return getattr(settings, 'CODEGEN_MAX_ITEMS', 500)
+
+
+def max_bundle_bytes() -> int:
+    return getattr(settings, 'CODEGEN_BUNDLE_MAX_BYTES', 256 * 1024 * 1024)
+
+
+def artifact_key(fmt: str, digest: str, name: str) -> str:
+    # O contorno do glifo não depende do nome do componente
+    base = f"{GENERATOR_VERSION}|{fmt}|{digest}|{'' if fmt == FONT_FORMAT else name}"
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+
+def artifact_path(fmt: str, key: str) -> str:
+    return f'{codegen_dir()}/{fmt}/{key[:2]}/{key}.{ARTIFACT_EXTENSIONS[fmt]}'
+
+
+def plan_items(svgs: Iterable, fmt: str) -> List[dict]:
+    """Nome único de componente e chave de artefato (hash do conteúdo) para cada SVG."""
+    items, used = [], set()
+    for svg in svgs:
+        name = component_name(svg.title_name, f'Icon{svg.pk}')
+        if name in used:
+            name = f'{name}{svg.pk}'
+        used.add(name)
+        key = artifact_key(fmt, content_digest(svg), name)
+        items.append({'svg': svg, 'name': name, 'key': key, 'path': artifact_path(fmt, key)})
+    return items
+
+
+def ensure_artifacts(items: List[dict], fmt: str, workers: int = 1, batch_size: int = 100) -> dict:
+    """Gera só os artefatos ausentes do cache (em lotes no pool de processos); os demais são reaproveitados."""
+    if fmt == FONT_FORMAT and not FONT_AVAILABLE:
+        raise ExportUnavailable('fontTools não instalado')
+    missing = [item for item in items if not _absolute(item['path']).exists()]
+    paths = {item['key']: item['path'] for item in missing}
+
+    def batches():
+        for start in range(0, len(missing), batch_size):
+            yield [(item['key'], item['svg'].get_sanitized_content(), item['name']) for item in missing[start:start + batch_size]]
+
+    invalid = 0
+    for results in map_batches(partial(generate_batch, fmt), batches(), workers):
+        for key, artifact in results:
+            # Vazio = SVG inválido; fica gravado para não ser regenerado a cada exportação
+            invalid += not artifact
+            _write_atomic(_absolute(paths[key]), artifact.encode('utf-8'))
+    stats = {'total': len(items), 'reused': len(items) - len(missing), 'generated': len(missing), 'invalid': invalid}
+    logger.info("Artefatos %s: %s", fmt, stats)
+    return stats
+
+
+def _read(item: dict) -> str:
+    with open(_absolute(item['path']), encoding='utf-8') as fh:
+        return fh.read()
+
+
+def _component_bundle(items: List[dict], fmt: str) -> bytes:
+    extension = COMPONENT_FORMATS[fmt]
+    index_name = 'index.ts' if fmt == 'tsx' else 'index.js'
+    buffer = io.BytesIO()
+    exports = []
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for item in items:
+            source = _read(item)
+            if not source:
+                continue
+            archive.writestr(f"{item['name']}.{extension}", source)
+            target = f"./{item['name']}.vue" if fmt == 'vue' else f"./{item['name']}"
+            exports.append(f"export {{ default as {item['name']} }} from '{target}';")
+        archive.writestr(index_name, '\n'.join(exports) + '\n')
+    return buffer.getvalue()
+
+
+def _font_bundle(items: List[dict]) -> bytes:
+    glyphs = []
+    for item in items:
+        source = _read(item)
+        if source:
+            glyphs.append((slug(item['name']), json.loads(source)))
+    font, extension, codepoints = build_font(glyphs)
+    font_file = f'akka-icons.{extension}'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(font_file, font)
+        archive.writestr('akka-icons.css', font_css(codepoints, font_file))
+        archive.writestr('codepoints.json', json.dumps(codepoints, indent=2))
+    return buffer.getvalue()
+
+
+def bundle_path(items: List[dict], fmt: str) -> str:
+    """O ZIP é chaveado pelas chaves dos artefatos: mesma seleção e mesmo conteúdo, mesmo arquivo."""
+    bundle_key = hashlib.sha1('|'.join([fmt] + [item['key'] for item in items]).encode('utf-8')).hexdigest()
+    return f'{codegen_dir()}/bundles/{bundle_key}.zip'
+
+
+def pending_artifacts(items: List[dict], fmt: str) -> int:
+    """Quantos artefatos a exportação teria de gerar (0 se o ZIP já está pronto)."""
+    if _absolute(bundle_path(items, fmt)).exists():
+        return 0
+    return sum(1 for item in items if not _absolute(item['path']).exists())
+
+
+def library_selections() -> dict:
+    """Bibliotecas compartilhadas pré-montadas pelo build_code_exports (mesma ordem da view)."""
+    from ..models import SvgFile
+
+    public = SvgFile.objects.filter(is_public=True).order_by('id')
+    # 'all': assinantes (accessible_queryset devolve todos os públicos); 'free': anônimos e sem compras
+    return {'all': public, 'free': public.filter(price=0)}
+
+
+def build_bundle(svgs: Iterable, fmt: str, workers: int = None, items: List[dict] = None) -> Tuple[str, dict]:
+    """ZIP com os componentes (+ index) ou a fonte (+ CSS); retorna (caminho relativo ao MEDIA_ROOT, stats)."""
+    workers = workers or getattr(settings, 'CODEGEN_WORKERS', 1)
+    items = plan_items(svgs, fmt) if items is None else items
+    stats = ensure_artifacts(items, fmt, workers)
+    relative = bundle_path(items, fmt)
+    path = _absolute(relative)
+    if path.exists():
+        # mtime marca o último uso: é a ordem da evicção LRU
+        os.utime(path)
+    else:
+        data = _font_bundle(items) if fmt == FONT_FORMAT else _component_bundle(items, fmt)
+        _write_atomic(path, data)
+        prune_bundles(keep=path)
+    return relative, stats
+
+
+def prune_bundles(limit: int = None, keep: Path = None) -> int:
+    """Remove os ZIPs usados há mais tempo até o total caber em `limit` bytes. Retorna quantos removeu.
+
+    Os artefatos individuais ficam: são pequenos, chaveados pelo conteúdo e reaproveitados.
+    """
+    limit = max_bundle_bytes() if limit is None else limit
+    root = _absolute(f'{codegen_dir()}/bundles')
+    files = []
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.name.endswith('.zip') and entry.is_file():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, full in sorted(files):
+        if total <= limit:
+            break
+        if keep is not None and full == str(keep):
+            continue
+        try:
+            os.remove(full)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    if removed:
+        logger.info("Bundles de código: %s arquivos removidos, %s bytes restantes", removed, total)
+    return removed
+
+
+def single_artifact(svg, fmt: str) -> Tuple[str, str]:
+    """Componente de um único SVG: (caminho relativo, nome do arquivo)."""
+    item = plan_items([svg], fmt)[0]
+    ensure_artifacts([item], fmt)
+    if not _read(item):
+        raise ValueError('SVG inválido')
+    return item['path'], f"{item['name']}.{COMPONENT_FORMATS[fmt]}"
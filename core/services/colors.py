@@ -0,0 +1,39 @@
+from django.db.models import F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from ..models import SvgColor
+from ..utils.palette import query_target, srgb_to_lab
+
+# SVGs ainda sem Lab (antes do backfill_svg_metadata) vão para o fim
+MISSING_DISTANCE = 1e9
+
+
+def lab_distance_expression(lab):
+    """Distância euclidiana ao quadrado entre as colunas lab_* de SvgColor e o alvo (monótona com a distância)."""
+    terms = []
+    for field, target in zip(('lab_l', 'lab_a', 'lab_b'), lab):
+        diff = F(field) - Value(target)
+        terms.append(diff * diff)
+    return terms[0] + terms[1] + terms[2]
+
+
+def order_by_color_distance(queryset, color: str):
+    """Ordena pela cor do SVG mais próxima do alvo (em Lab), dentro do tom filtrado.
+
+    A distância é uma subconsulta correlacionada sobre SvgColor (índice bucket, svg), então
+    o conjunto inteiro é ordenado e paginado no banco, sem limite de candidatos.
+    Empates na mesma cor favorecem quem usa mais a cor e, depois, os mais recentes.
+    """
+    bucket, rgb = query_target(color)
+    nearest = (
+        SvgColor.objects.filter(svg=OuterRef('pk'), bucket=bucket, lab_l__isnull=False)
+        .annotate(distance=lab_distance_expression(srgb_to_lab(rgb)))
+        .order_by('distance', '-share')
+    )
+    return queryset.annotate(
+        color_distance=Coalesce(
+            Subquery(nearest.values('distance')[:1], output_field=FloatField()),
+            Value(MISSING_DISTANCE),
+        ),
+        color_share=Coalesce(Subquery(nearest.values('share')[:1], output_field=FloatField()), Value(0.0)),
+    ).order_by('color_distance', '-color_share', '-uploaded_at')
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Q
+
+from ..models import SvgFile
+from ..utils.fingerprint import BANDS, hamming_distance, shape_fingerprint, split_bands, to_unsigned
+
+BAND_FIELDS = [f'shape_band{band}' for band in range(BANDS)]
+
+
+def max_distance() -> int:
+    # Acima de BANDS - 1 a busca por faixas deixa de garantir recall total
+    return min(getattr(settings, 'SVG_DUPLICATE_MAX_DISTANCE', 3), BANDS - 1)
+
+
+def find_near_duplicates(content: str = None, fingerprint: Optional[int] = None, exclude_pk=None, distance: int = None) -> List[dict]:
+    """Busca SVGs com geometria quase idêntica usando só as faixas LSH indexadas.
+
+    Retorna [{'id', 'title_name', 'distance'}] ordenado pela distância de Hamming.
+    """
+    if fingerprint is None:
+        fingerprint = shape_fingerprint(content)
+    if fingerprint is None:
+        return []
+    distance = max_distance() if distance is None else distance
+
+    lookup = Q()
+    for field, band in zip(BAND_FIELDS, split_bands(fingerprint)):
+        lookup |= Q(**{field: band})
+    candidates = SvgFile.objects.filter(lookup)
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+
+    matches = []
+    for pk, title_name, shape_hash in candidates.values_list('pk', 'title_name', 'shape_hash'):
+        d = hamming_distance(fingerprint, to_unsigned(shape_hash))
+        if d <= distance:
+            matches.append({'id': pk, 'title_name': title_name, 'distance': d})
+    matches.sort(key=lambda match: (match['distance'], match['id']))
+    return matches
+
+
+def backfill_fingerprints(batch_size: int = 500) -> int:
+    """Calcula o fingerprint de SVGs antigos que ainda não o têm."""
+    pending = SvgFile.objects.filter(shape_hash__isnull=True).exclude(content='').only('pk', 'content')
+    updated = []
+    total = 0
+    for svg in pending.iterator(chunk_size=batch_size):
+        svg.update_shape_fingerprint()
+        if svg.shape_hash is None:
+            continue
+        updated.append(svg)
+        if len(updated) >= batch_size:
+            SvgFile.objects.bulk_update(updated, ['shape_hash'] + BAND_FIELDS)
+            total += len(updated)
+            updated = []
+    if updated:
+        SvgFile.objects.bulk_update(updated, ['shape_hash'] + BAND_FIELDS)
+        total += len(updated)
+    return total
+
+
+def duplicate_clusters(distance: int = None, public_only: bool = False) -> List[List[int]]:
+    """Agrupa o catálogo em clusters de quase-duplicatas (union-find sobre pares de mesma faixa)."""
+    distance = max_distance() if distance is None else distance
+    queryset = SvgFile.objects.filter(shape_hash__isnull=False)
+    if public_only:
+        queryset = queryset.filter(is_public=True)
+
+    hashes: Dict[int, int] = {}
+    buckets = defaultdict(list)
+    for pk, shape_hash in queryset.values_list('pk', 'shape_hash').iterator():
+        fingerprint = to_unsigned(shape_hash)
+        hashes[pk] = fingerprint
+        for band, value in enumerate(split_bands(fingerprint)):
+            buckets[(band, value)].append(pk)
+
+    parent = {pk: pk for pk in hashes}
+
+    def find(pk):
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    checked = set()
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                if hamming_distance(hashes[a], hashes[b]) <= distance:
+                    parent[find(b)] = find(a)
+
+    clusters = defaultdict(list)
+    for pk in hashes:
+        clusters[find(pk)].append(pk)
+    return sorted((sorted(members) for members in clusters.values() if len(members) > 1), key=lambda c: (-len(c), c[0]))
+
@@ -0,0 +1,125 @@
+import logging
+import os
+from pathlib import Path
+from typing import Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .recolor import content_digest
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MIN_SIZE = 16
+EXPORT_MAX_SIZE = 1024
+EXPORT_SCALES = (1, 2, 3)
+EXPORT_BYTES_KEY = 'core:export_cache_bytes'
+
+
+class ExportUnavailable(Exception):
+    """Rasterização indisponível (CairoSVG/libcairo não instalados)."""
+
+
+def export_dir() -> str:
+    # Relativo ao MEDIA_ROOT, dentro de private/: só sai via guardian (X-Accel-Redirect)
+    return getattr(settings, 'EXPORT_CACHE_DIR', 'private/exports')
+
+
+def max_cache_bytes() -> int:
+    return getattr(settings, 'EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+
+
+def parse_export_params(params) -> Tuple[int, int]:
+    """(size, scale) validados; levanta ValueError fora dos limites."""
+    try:
+        size = int(params.get('size', 256))
+        scale = int(params.get('scale', 1))
+    except (TypeError, ValueError):
+        raise ValueError('size e scale devem ser inteiros')
+    if not EXPORT_MIN_SIZE <= size <= EXPORT_MAX_SIZE:
+        raise ValueError(f'size deve estar entre {EXPORT_MIN_SIZE} e {EXPORT_MAX_SIZE}')
+    if scale not in EXPORT_SCALES:
+        raise ValueError('scale deve ser 1, 2 ou 3')
+    return size, scale
+
+
+def export_path(digest: str, pixels: int) -> str:
+    """Caminho relativo ao MEDIA_ROOT, chaveado por hash do conteúdo e largura em pixels."""
+    return f'{export_dir()}/{digest[:2]}/{digest}-{pixels}.png'
+
+
+def render_png(markup: str, pixels: int) -> bytes:
+    try:
+        import cairosvg
+    except (ImportError, OSError) as exc:  # OSError: libcairo ausente no sistema
+        raise ExportUnavailable(str(exc))
+    return cairosvg.svg2png(bytestring=markup.encode('utf-8'), output_width=pixels)
+
+
+def get_or_render_png(svg, size: int, scale: int = 1) -> str:
+    """Retorna o caminho (relativo ao MEDIA_ROOT) do PNG, renderizando só em cache miss."""
+    pixels = size * scale
+    relative = export_path(content_digest(svg), pixels)
+    path = Path(settings.MEDIA_ROOT) / relative
+    if path.exists():
+        # mtime marca o último uso: é a ordem da evicção LRU
+        os.utime(path)
+        return relative
+
+    data = render_png(svg.get_sanitized_content(), pixels)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    _account(len(data))
+    return relative
+
+
+def _account(added: int) -> None:
+    # Total aproximado no cache; a varredura do diretório só roda quando passa do limite
+    cache.add(EXPORT_BYTES_KEY, 0, timeout=None)
+    try:
+        total = cache.incr(EXPORT_BYTES_KEY, added)
+    except ValueError:
+        total = added
+        cache.set(EXPORT_BYTES_KEY, total, timeout=None)
+    if total > max_cache_bytes():
+        prune_export_cache()
+
+
+def prune_export_cache(limit: int = None) -> int:
+    """Remove os PNGs usados há mais tempo até o total caber em `limit` bytes. Retorna quantos removeu."""
+    limit = max_cache_bytes() if limit is None else limit
+    root = Path(settings.MEDIA_ROOT) / export_dir()
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith('.png'):
+                full = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, full))
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, full in sorted(files):
+        if total <= limit:
+            break
+        try:
+            os.remove(full)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    cache.set(EXPORT_BYTES_KEY, total, timeout=None)
+    if removed:
+        logger.info("Cache de exportação PNG: %s arquivos removidos, %s bytes restantes", removed, total)
+    return removed
+
+
+def export_filename(svg, pixels: int) -> str:
+    base = (svg.filename or svg.title_name or f'svg-{svg.pk}').rsplit('.', 1)[0]
+    safe = ''.join(ch if ch.isalnum() or ch in '-_' else '-' for ch in base).strip('-') or f'svg-{svg.pk}'
+    return f'{safe}-{pixels}px.png'
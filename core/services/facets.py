@@ -0,0 +1,100 @@
+import hashlib
+import json
+from collections import Counter
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from ..models import SvgFile
+from .catalog import ACCESS_VALUES, PRICE_BANDS, SIZE_VALUES, STYLE_VALUES, base_queryset, catalog_version, filter_conditions, new_since
+
+FACET_TAG_LIMIT = 30
+
+
+def tag_vocabulary(version: int = None) -> List[Tuple[str, int]]:
+    """Tags dos SVGs públicos com sua frequência, em cache por versão do catálogo."""
+    version = catalog_version() if version is None else version
+    key = f'core:tag_vocabulary:{version}'
+    vocabulary = cache.get(key)
+    if vocabulary is None:
+        counter = Counter()
+        for tags in SvgFile.objects.filter(is_public=True).exclude(tags='').values_list('tags', flat=True).iterator():
+            counter.update({t.strip() for t in tags.split(',') if t.strip()})
+        vocabulary = sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+        cache.set(key, vocabulary, getattr(settings, 'FACETS_CACHE_TIMEOUT', 300))
+    return vocabulary
+
+
+def filter_signature(filters: dict) -> str:
+    return hashlib.sha1(json.dumps(filters, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _facet_cache_key(filters: dict, user, version: int) -> str:
+    # "Meus" depende do usuário; anônimos compartilham a mesma entrada
+    user_part = user.pk if user is not None and user.is_authenticated else 0
+    return f'core:facets:{version}:{user_part}:{filter_signature(filters)}'
+
+
+def _combine(*conditions):
+    combined = Q()
+    for condition in conditions:
+        combined &= condition
+    return combined or None
+
+
+def compute_facets(filters: dict, user) -> dict:
+    """Contagens de todas as facetas para o conjunto de filtros atual em um único aggregate.
+
+    Cada faceta é contada com os filtros dos *outros* grupos (COUNT(*) FILTER (WHERE ...)),
+    para que as opções do próprio grupo continuem mostrando quantos itens trariam.
+    """
+    version = catalog_version()
+    key = _facet_cache_key(filters, user, version)
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    conditions = filter_conditions(filters, user)
+    authenticated = user is not None and user.is_authenticated
+
+    def others(group):
+        return [condition for name, condition in conditions.items() if name != group]
+
+    tags = [tag for tag, _ in tag_vocabulary(version)[:FACET_TAG_LIMIT]]
+    if filters['tag'] and filters['tag'] not in tags:
+        tags.append(filters['tag'])
+
+    aggregates = {'total': Count('pk', filter=_combine(*conditions.values()))}
+    for value, condition in ACCESS_VALUES.items():
+        aggregates[f'access_{value}'] = Count('pk', filter=_combine(*others('access'), condition))
+    for value, condition in PRICE_BANDS.items():
+        aggregates[f'band_{value}'] = Count('pk', filter=_combine(*others('band'), condition))
+    for value, condition in STYLE_VALUES.items():
+        aggregates[f'style_{value}'] = Count('pk', filter=_combine(*others('style'), condition))
+    for value, condition in SIZE_VALUES.items():
+        aggregates[f'size_{value}'] = Count('pk', filter=_combine(*others('size'), condition))
+    aggregates['new'] = Count('pk', filter=_combine(*others('new'), Q(uploaded_at__gte=new_since())))
+    if authenticated:
+        aggregates['owned'] = Count('pk', filter=_combine(*others('owned'), Q(is_owned=True)))
+    for i, tag in enumerate(tags):
+        aggregates[f'tag_{i}'] = Count('pk', filter=_combine(*others('tag'), Q(tags__icontains=tag)))
+
+    row = base_queryset(filters, user).aggregate(**aggregates)
+
+    facets = {
+        'total': row['total'],
+        'access': [{'value': value, 'count': row[f'access_{value}']} for value in ACCESS_VALUES],
+        'bands': [{'value': value, 'count': row[f'band_{value}']} for value in PRICE_BANDS],
+        'styles': [{'value': value, 'count': row[f'style_{value}']} for value in STYLE_VALUES],
+        'sizes': [{'value': value, 'count': row[f'size_{value}']} for value in SIZE_VALUES],
+        'new': row['new'],
+        'owned': row['owned'] if authenticated else None,
+        'tags': sorted(
+            ({'value': tag, 'count': row[f'tag_{i}']} for i, tag in enumerate(tags)),
+            key=lambda item: (-item['count'], item['value']),
+        ),
+    }
+    cache.set(key, facets, getattr(settings, 'FACETS_CACHE_TIMEOUT', 300))
+    return facets
@@ -0,0 +1,54 @@
+import logging
+import os
+from typing import Iterator, List, Tuple
+
+from django.db import transaction
+
+from ..models import SvgColor, SvgFile
+from ..utils.svg_metadata import METADATA_FIELDS, METADATA_VERSION, analyze_batch
+from ..utils.workers import map_batches
+
+logger = logging.getLogger(__name__)
+
+
+def _pending_batches(batch_size: int, force: bool) -> Iterator[List[Tuple[int, str]]]:
+    queryset = SvgFile.objects.all() if force else SvgFile.objects.filter(metadata_version__lt=METADATA_VERSION)
+    batch = []
+    for row in queryset.order_by('pk').values_list('pk', 'content').iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _save(results: List[Tuple[int, dict, list]]) -> int:
+    objs = []
+    colors = []
+    for pk, metadata, palette in results:
+        svg = SvgFile(pk=pk)
+        for field, value in metadata.items():
+            setattr(svg, field, value)
+        objs.append(svg)
+        colors.extend(SvgColor.from_palette(pk, bucket, rgb, share) for bucket, rgb, share in palette)
+    # bulk_update não chama save(): não reescreve fingerprint nem dispara sinais do catálogo
+    with transaction.atomic():
+        SvgFile.objects.bulk_update(objs, METADATA_FIELDS)
+        SvgColor.objects.filter(svg_id__in=[obj.pk for obj in objs]).delete()
+        SvgColor.objects.bulk_create(colors)
+    return len(objs)
+
+
+def backfill_metadata(batch_size: int = 500, workers: int = None, force: bool = False) -> int:
+    """Preenche metadados e paleta de linhas antigas (ou de versão anterior do analisador).
+
+    O parse roda em paralelo (um lote por processo); a escrita fica no processo
+    principal, em um bulk_update por lote. workers=1 processa tudo inline.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = 0
+    for results in map_batches(analyze_batch, _pending_batches(batch_size, force), workers):
+        total += _save(results)
+    logger.info("Metadados: %s SVGs atualizados", total)
+    return total
@@ -0,0 +1,115 @@
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.db.models import Case, ExpressionWrapper, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import SvgFile
+from ..utils.buffering import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = {
+    'impression': 'impression_count',
+    'view': 'view_count',
+    'copy': 'copy_count',
+    'favorite': 'favorite_count',
+}
+
+EVENT_WEIGHTS = {
+    'impression': 0.05,
+    'view': 1.0,
+    'copy': 3.0,
+    'favorite': 5.0,
+}
+
+# Época fixa do score de trending. Com meia-vida de 7 dias o fator 2**(t/meia-vida)
+# só estoura o float após ~19 anos; basta reancorar a época antes disso.
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+UPDATE_CHUNK_SIZE = 500
+
+
+def trending_weight(now: datetime = None) -> float:
+    """Fator multiplicativo aplicado aos eventos de `now`.
+
+    Em vez de decair todos os scores periodicamente, inflamos os eventos novos:
+    a ordem entre itens é a mesma de um decaimento exponencial com a meia-vida configurada.
+    """
+    now = now or timezone.now()
+    half_life_days = getattr(settings, 'TRENDING_HALF_LIFE_DAYS', 7)
+    age_days = (now - TRENDING_EPOCH).total_seconds() / 86400
+    return math.pow(2.0, age_days / half_life_days)
+
+
+def _aggregate(items: Iterable[Tuple[int, str, int]]) -> Dict[int, Dict[str, int]]:
+    deltas: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for svg_id, event, delta in items:
+        deltas[svg_id][event] += delta
+    return deltas
+
+
+def flush_counters(items: List[Tuple[int, str, int]]) -> None:
+    """Aplica os deltas acumulados com um UPDATE ... SET n = GREATEST(n + CASE ..., 0) por bloco de IDs.
+
+    Os contadores recebem deltas negativos (desfavoritar); o trending só soma eventos positivos.
+    """
+    deltas = _aggregate(items)
+    weight = trending_weight()
+    svg_ids = list(deltas.keys())
+    for start in range(0, len(svg_ids), UPDATE_CHUNK_SIZE):
+        chunk = svg_ids[start:start + UPDATE_CHUNK_SIZE]
+        updates = {}
+        for event, field in EVENT_FIELDS.items():
+            whens = [When(pk=svg_id, then=Value(deltas[svg_id][event])) for svg_id in chunk if deltas[svg_id].get(event)]
+            if whens:
+                updates[field] = Greatest(F(field) + Case(*whens, default=Value(0), output_field=IntegerField()), Value(0))
+        score_whens = []
+        for svg_id in chunk:
+            # Só eventos positivos entram no trending: um desfavorito teria de subtrair o peso
+            # da época do favorito, que não guardamos; com o peso de hoje apagaria o score inteiro
+            score = sum(EVENT_WEIGHTS[event] * delta for event, delta in deltas[svg_id].items() if delta > 0)
+            if score:
+                score_whens.append(When(pk=svg_id, then=Value(score * weight)))
+        if score_whens:
+            updates['trending_score'] = F('trending_score') + Case(*score_whens, default=Value(0.0), output_field=FloatField())
+        if updates:
+            SvgFile.objects.filter(pk__in=chunk).update(**updates)
+
+
+_buffer = WriteBehindBuffer(
+    flush_counters,
+    max_items=getattr(settings, 'POPULARITY_FLUSH_MAX_EVENTS', 1000),
+    flush_interval=getattr(settings, 'POPULARITY_FLUSH_INTERVAL', 30.0),
+    background=getattr(settings, 'WRITE_BEHIND_BACKGROUND', True),
+)
+
+
+def record_event(svg_id, event: str, delta: int = 1) -> None:
+    """Registra um evento de popularidade no buffer em memória (sem escrita imediata)."""
+    if event not in EVENT_FIELDS:
+        raise ValueError(f"Evento de popularidade desconhecido: {event}")
+    _buffer.add((int(svg_id), event, delta))
+
+
+def record_impressions(svg_ids: Iterable[int]) -> None:
+    _buffer.add_many((int(svg_id), 'impression', 1) for svg_id in svg_ids)
+
+
+def flush_popularity() -> int:
+    """Força o descarregamento do buffer deste processo. Retorna o número de eventos."""
+    return _buffer.flush()
+
+
+def popularity_expression():
+    """Score de popularidade acumulada (sem decaimento) usado em sort=popular."""
+    expression = None
+    for event, field in EVENT_FIELDS.items():
+        term = F(field) * Value(EVENT_WEIGHTS[event])
+        expression = term if expression is None else expression + term
+    return ExpressionWrapper(expression, output_field=FloatField())
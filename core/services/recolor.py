@@ -0,0 +1,38 @@
+import hashlib
+
+from django.conf import settings
+
+from ..utils.recolor import LRUCache, Mapping, recolor_tree, serialize
+from ..utils.svg_features import parse_svg
+
+# Árvores parseadas por content_hash e resultados por (content_hash, mapeamento), por processo
+_trees = LRUCache(getattr(settings, 'RECOLOR_TREE_CACHE_SIZE', 256))
+_results = LRUCache(getattr(settings, 'RECOLOR_RESULT_CACHE_SIZE', 2048))
+
+
+def content_digest(svg) -> str:
+    # Linhas ainda sem backfill (backfill_svg_metadata) não têm content_hash gravado
+    return svg.content_hash or hashlib.sha256((svg.content or '').encode('utf-8')).hexdigest()
+
+
+def recolor_svg(svg, mapping: Mapping) -> str:
+    """Markup recolorido; recolorações populares saem do cache sem novo parse."""
+    digest = content_digest(svg)
+    key = (digest, mapping)
+    markup = _results.get(key)
+    if markup is not None:
+        return markup
+    root = _trees.get(digest)
+    if root is None:
+        root = parse_svg(svg.get_sanitized_content())
+        if root is None:
+            raise ValueError('SVG inválido')
+        _trees.set(digest, root)
+    markup = serialize(recolor_tree(root, mapping))
+    _results.set(key, markup)
+    return markup
+
+
+def clear_caches() -> None:
+    _trees.clear()
+    _results.clear()
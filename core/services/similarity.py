@@ -0,0 +1,172 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+from django.db import transaction
+
+from ..models import SvgFeatureVector, SvgFile, SvgNeighbor
+from ..utils.svg_features import FEATURE_DIM, build_feature_vector, feature_signature
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 12
+MAX_BLOCK_SIZE = 1024
+# Memória de trabalho por bloco: scores float32 + índices int64 do argpartition (~12 bytes por par)
+BLOCK_MEMORY_BYTES = 64 * 1024 * 1024
+BYTES_PER_SCORE = 12
+MIN_SCORE = 0.0
+
+
+def block_size_for(n: int, memory_bytes: int = BLOCK_MEMORY_BYTES) -> int:
+    """Linhas por bloco para caber em `memory_bytes` com n colunas (100k SVGs: ~55 linhas)."""
+    return max(1, min(MAX_BLOCK_SIZE, memory_bytes // (BYTES_PER_SCORE * max(n, 1))))
+
+
+def sync_feature_vectors() -> Tuple[List[int], np.ndarray, Set[int], Set[int]]:
+    """Recalcula só os vetores cuja assinatura mudou.
+
+    Retorna (ids, matriz n x FEATURE_DIM, ids alterados, ids removidos do catálogo público).
+    """
+    stored = {
+        svg_id: (signature, vector)
+        for svg_id, signature, vector in SvgFeatureVector.objects.values_list('svg_id', 'signature', 'vector').iterator()
+    }
+    ids: List[int] = []
+    rows: List[np.ndarray] = []
+    changed: Dict[int, Tuple[str, np.ndarray]] = {}
+
+    public_rows = SvgFile.objects.filter(is_public=True).order_by('pk').values_list('pk', 'tags', 'content')
+    for svg_id, tags, content in public_rows.iterator(chunk_size=500):
+        signature = feature_signature(content, tags)
+        previous = stored.get(svg_id)
+        if previous and previous[0] == signature:
+            vector = np.frombuffer(bytes(previous[1]), dtype=np.float32)
+        else:
+            vector = np.asarray(build_feature_vector(content, tags), dtype=np.float32)
+            changed[svg_id] = (signature, vector)
+        ids.append(svg_id)
+        rows.append(vector)
+
+    removed = set(stored) - set(ids)
+    with transaction.atomic():
+        SvgFeatureVector.objects.filter(svg_id__in=list(removed) + list(changed)).delete()
+        SvgFeatureVector.objects.bulk_create(
+            [SvgFeatureVector(svg_id=svg_id, signature=sig, vector=vec.tobytes()) for svg_id, (sig, vec) in changed.items()],
+            batch_size=500,
+        )
+
+    matrix = np.vstack(rows) if rows else np.zeros((0, FEATURE_DIM), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return ids, matrix / norms, set(changed), removed
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Índices e valores dos k maiores scores de cada linha, em ordem decrescente."""
+    n = scores.shape[1]
+    k = min(k, n)
+    # Partição direta (maiores no fim): sem a cópia negada da matriz de scores
+    idx = np.argpartition(scores, kth=n - k, axis=1)[:, n - k:]
+    vals = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-vals, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+def compute_neighbors(matrix: np.ndarray, rows: Iterable[int], top_k: int,
+                      block_size: int = None) -> Dict[int, List[Tuple[int, float]]]:
+    """Top-K por similaridade de cosseno para as linhas pedidas, em blocos de `block_size` (padrão: pela memória)."""
+    block_size = block_size or block_size_for(matrix.shape[0])
+    rows = np.asarray(sorted(rows), dtype=np.int64)
+    result: Dict[int, List[Tuple[int, float]]] = {}
+    if matrix.shape[0] < 2:
+        return {int(row): [] for row in rows}
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        scores = matrix[block] @ matrix.T
+        scores[np.arange(len(block)), block] = -np.inf
+        idx, vals = _top_k(scores, top_k)
+        for offset, row in enumerate(block):
+            result[int(row)] = [(int(j), float(s)) for j, s in zip(idx[offset], vals[offset]) if s > MIN_SCORE]
+    return result
+
+
+def _load_previous() -> Dict[int, List[Tuple[int, float]]]:
+    previous: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+    queryset = SvgNeighbor.objects.order_by('svg_id', 'rank').values_list('svg_id', 'neighbor_id', 'score')
+    for svg_id, neighbor_id, score in queryset.iterator(chunk_size=5000):
+        previous[svg_id].append((neighbor_id, score))
+    return previous
+
+
+def build_neighbors(full: bool = False, top_k: int = DEFAULT_TOP_K, block_size: int = None) -> dict:
+    """Atualiza a tabela SvgNeighbor.
+
+    No modo incremental só recalcula (a) os SVGs alterados, (b) quem tinha um
+    vizinho alterado/removido, e mescla nos demais os alterados que superam o
+    k-ésimo score atual. Itens inalterados e não afetados não são tocados.
+    """
+    ids, matrix, changed, removed = sync_feature_vectors()
+    block_size = block_size or block_size_for(len(ids))
+    position = {svg_id: i for i, svg_id in enumerate(ids)}
+    has_previous = SvgNeighbor.objects.exists()
+
+    updates: Dict[int, List[Tuple[int, float]]] = {}
+    if full or not has_previous:
+        recompute_rows = set(range(len(ids)))
+    else:
+        previous = _load_previous()
+        stale = changed | removed
+        recompute_rows = {position[svg_id] for svg_id in changed}
+        for svg_id in ids:
+            if svg_id not in changed and any(neighbor_id in stale for neighbor_id, _ in previous.get(svg_id, [])):
+                recompute_rows.add(position[svg_id])
+
+        changed_rows = np.asarray(sorted(position[svg_id] for svg_id in changed), dtype=np.int64)
+        if len(changed_rows):
+            kth = np.full(len(ids), -np.inf, dtype=np.float32)
+            for svg_id, neighbors in previous.items():
+                if svg_id in position and len(neighbors) >= top_k:
+                    kth[position[svg_id]] = neighbors[top_k - 1][1]
+            additions: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+            for start in range(0, len(changed_rows), block_size):
+                block = changed_rows[start:start + block_size]
+                scores = matrix[block] @ matrix.T
+                hits = np.argwhere((scores > kth[None, :]) & (scores > MIN_SCORE))
+                for block_offset, column in hits:
+                    if int(column) != int(block[block_offset]):
+                        additions[int(column)].append((ids[block[block_offset]], float(scores[block_offset, column])))
+            for row, extra in additions.items():
+                if row in recompute_rows:
+                    continue
+                svg_id = ids[row]
+                merged = dict(previous.get(svg_id, []))
+                merged.update(extra)
+                updates[svg_id] = sorted(merged.items(), key=lambda item: -item[1])[:top_k]
+
+    for row, neighbors in compute_neighbors(matrix, recompute_rows, top_k, block_size).items():
+        updates[ids[row]] = [(ids[j], score) for j, score in neighbors]
+
+    with transaction.atomic():
+        SvgNeighbor.objects.filter(svg_id__in=list(removed)).delete()
+        touched = list(updates)
+        for start in range(0, len(touched), 1000):
+            SvgNeighbor.objects.filter(svg_id__in=touched[start:start + 1000]).delete()
+        SvgNeighbor.objects.bulk_create(
+            [
+                SvgNeighbor(svg_id=svg_id, neighbor_id=neighbor_id, rank=rank, score=score)
+                for svg_id, neighbors in updates.items()
+                for rank, (neighbor_id, score) in enumerate(neighbors)
+            ],
+            batch_size=1000,
+        )
+
+    stats = {
+        'items': len(ids),
+        'changed': len(changed),
+        'removed': len(removed),
+        'recomputed': len(recompute_rows),
+        'merged': len(updates) - len(recompute_rows),
+    }
+    logger.info("Vizinhos de SVG atualizados: %s", stats)
+    return stats
@@ -0,0 +1,242 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Set
+
+from django.conf import settings
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import SvgFile
+from ..utils.search_index import build_index
+from ..utils.serialization import dumps
+from .catalog import catalog_version, deleted_since, log_covers
+from .popularity import popularity_expression
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+SNAPSHOT_FORMAT = 2
+# Folga sobre synced_at para gravações em transações que terminaram depois da leitura
+SNAPSHOT_SYNC_MARGIN = 60
+SNAPSHOT_FIELDS = ('id', 'title_name', 'tags', 'price', 'thumbnail', 'uploaded_at', 'updated_at')
+
+
+def snapshot_root() -> Path:
+    return Path(getattr(settings, 'CATALOG_SNAPSHOT_ROOT', Path(settings.STATIC_ROOT) / 'catalog'))
+
+
+def snapshot_url(name: str = MANIFEST_NAME) -> str:
+    base = getattr(settings, 'CATALOG_SNAPSHOT_URL', settings.STATIC_URL + 'catalog/')
+    return base + name
+
+
+def shard_size() -> int:
+    # Shards por faixa de id: uma alteração só reescreve o shard do item
+    return getattr(settings, 'CATALOG_SNAPSHOT_SHARD_SIZE', 1000)
+
+
+def search_index_max_age() -> int:
+    # A ordem do índice segue a popularidade, que muda sem alterar a versão do catálogo
+    return getattr(settings, 'CATALOG_SEARCH_INDEX_MAX_AGE', 60 * 60)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def load_manifest() -> Optional[dict]:
+    try:
+        with open(snapshot_root() / MANIFEST_NAME, 'rb') as fh:
+            return json.loads(fh.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _public():
+    return SvgFile.objects.filter(is_public=True)
+
+
+def _public_shards() -> Set[int]:
+    return set(_public().annotate(shard=F('id') / shard_size()).order_by().values_list('shard', flat=True).distinct())
+
+
+def changed_shards(previous: dict, version: int) -> Optional[Set[int]]:
+    """Shards tocados desde o manifest anterior; None quando é preciso refazer todos.
+
+    Alterações vêm de updated_at >= synced_at anterior (core_svg_updated_idx) e
+    remoções do log do CatalogChange; se o log já foi podado além da versão
+    anterior, não dá para saber o que saiu.
+    """
+    since = previous.get('synced_at')
+    prev_version = previous.get('catalog_version')
+    if not since or prev_version is None or not log_covers(prev_version, version):
+        return None
+    size = shard_size()
+    since = datetime.fromisoformat(since) - timedelta(seconds=SNAPSHOT_SYNC_MARGIN)
+    ids = SvgFile.objects.filter(updated_at__gte=since).values_list('id', flat=True)
+    shards = {pk // size for pk in ids.iterator()}
+    shards |= {pk // size for pk in deleted_since(prev_version, version)}
+    return shards
+
+
+def _serialize_row(row: dict) -> dict:
+    return {
+        'id': row['id'],
+        'title': row['title_name'],
+        'tags': [t.strip() for t in (row['tags'] or '').split(',') if t.strip()],
+        'price': row['price'],
+        'preview_url': reverse('guardian:protected_thumbnail', kwargs={'svg_id': row['id']}) if row['thumbnail'] else None,
+        'uploaded_at': row['uploaded_at'],
+    }
+
+
+def build_shard(shard: int) -> Optional[dict]:
+    """Gera o NDJSON gzip de um shard, com nome derivado do hash do conteúdo."""
+    size = shard_size()
+    rows = _public().filter(id__gte=shard * size, id__lt=(shard + 1) * size).order_by('id').values(*SNAPSHOT_FIELDS)
+    lines = [dumps(_serialize_row(row)) for row in rows]
+    if not lines:
+        return None
+    payload = b'\n'.join(lines) + b'\n'
+    digest = hashlib.sha256(payload).hexdigest()[:16]
+    name = f'shard-{shard:05d}.{digest}.ndjson.gz'
+    path = snapshot_root() / name
+    if not path.exists():
+        # mtime=0 deixa o gzip determinístico: mesmo conteúdo, mesmos bytes
+        _write_atomic(path, gzip.compress(payload, compresslevel=9, mtime=0))
+    return {'shard': shard, 'file': name, 'count': len(lines), 'bytes': path.stat().st_size}
+
+
+def build_search_index() -> dict:
+    """Gera o índice binário da busca instantânea (static/core/instant-search.js).
+
+    Documentos em ordem de popularidade: a posição no índice já é o ranking,
+    então o cliente só precisa intersectar postings crescentes.
+    """
+    rows = (
+        _public()
+        .annotate(popularity=popularity_expression())
+        .order_by('-popularity', '-uploaded_at', 'id')
+        .values('id', 'title_name', 'tags', 'price', 'thumbnail')
+    )
+    docs = [
+        {
+            'id': row['id'],
+            'title': row['title_name'],
+            'price_cents': int((row['price'] or 0) * 100),
+            'has_thumbnail': bool(row['thumbnail']),
+            'tags': [t.strip() for t in (row['tags'] or '').split(',') if t.strip()],
+        }
+        for row in rows.iterator()
+    ]
+    payload = build_index(docs)
+    name = f'search-index.{hashlib.sha256(payload).hexdigest()[:16]}.bin'
+    path = snapshot_root() / name
+    if not path.exists():
+        _write_atomic(path, payload)
+    return {'file': name, 'bytes': len(payload), 'docs': len(docs)}
+
+
+def build_snapshot(force: bool = False) -> dict:
+    """Atualiza o snapshot estático do catálogo público.
+
+    A versão do catálogo decide se há algo a fazer; quando muda, só os shards
+    com itens alterados ou removidos são regenerados. O índice de busca segue a
+    popularidade e é refeito também quando passa de search_index_max_age().
+    Arquivos são imutáveis (hash no nome) e o manifest é trocado por último.
+    """
+    root = snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    started = timezone.now()
+    version = catalog_version()
+    previous = load_manifest() or {}
+    previous_shards = {}
+    if previous.get('format') == SNAPSHOT_FORMAT and previous.get('shard_size') == shard_size():
+        previous_shards = {entry['shard']: entry for entry in previous.get('shards', [])}
+
+    generation = previous.get('generation', 0)
+    index_entry = previous.get('search_index') if previous_shards else None
+    index_ok = bool(index_entry) and (root / index_entry['file']).exists()
+    index_built_at = previous.get('search_index_built_at')
+    index_fresh = index_ok and bool(index_built_at) and (
+        (started - datetime.fromisoformat(index_built_at)).total_seconds() < search_index_max_age()
+    )
+    missing = {shard for shard, entry in previous_shards.items() if not (root / entry['file']).exists()}
+
+    if force or not previous_shards:
+        changed = None
+    elif previous.get('catalog_version') == version:
+        changed = set()
+    else:
+        changed = changed_shards(previous, version)
+    if changed is not None:
+        changed |= missing
+        if not changed and index_fresh:
+            return {'skipped': True, 'generation': generation, 'rebuilt': 0, 'shards': len(previous_shards), 'removed': 0}
+    else:
+        changed = _public_shards() | set(previous_shards)
+
+    shards = {shard: entry for shard, entry in previous_shards.items() if shard not in changed}
+    for shard in changed:
+        entry = build_shard(shard)
+        if entry:
+            shards[shard] = entry
+    shards = [shards[shard] for shard in sorted(shards)]
+
+    # O ranking do índice muda com a popularidade: refeito a cada execução que chega aqui
+    index_entry = build_search_index()
+
+    if shards != list(previous_shards.values()) or index_entry['file'] != (previous.get('search_index') or {}).get('file'):
+        generation += 1
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'generation': generation,
+        'catalog_version': version,
+        'generated_at': timezone.now().isoformat(),
+        # Início da execução: alterações gravadas durante o build entram na próxima
+        'synced_at': started.isoformat(),
+        'shard_size': shard_size(),
+        'count': sum(entry['count'] for entry in shards),
+        'shards': shards,
+        'search_index': index_entry,
+        'search_index_built_at': started.isoformat(),
+    }
+    _write_atomic(root / f'manifest.{generation}.json', dumps(manifest))
+    _write_atomic(root / MANIFEST_NAME, dumps(manifest))
+
+    removed = prune_snapshot_files(root, keep=[manifest, previous])
+    logger.info("Snapshot do catálogo g%s: %s shards regenerados, %s arquivos removidos", generation, len(changed), removed)
+    return {'skipped': False, 'generation': generation, 'rebuilt': len(changed), 'shards': len(shards), 'removed': removed}
+
+
+def _referenced_files(manifest: dict) -> set:
+    files = {entry['file'] for entry in manifest.get('shards', [])}
+    if manifest.get('search_index'):
+        files.add(manifest['search_index']['file'])
+    if manifest.get('generation') is not None:
+        files.add(f"manifest.{manifest['generation']}.json")
+    return files
+
+
+def prune_snapshot_files(root: Path, keep: List[dict]) -> int:
+    """Remove arquivos não referenciados pelo manifest atual nem pelo anterior
+    (clientes que ainda leem a geração anterior continuam funcionando)."""
+    referenced = {MANIFEST_NAME}
+    for manifest in keep:
+        referenced |= _referenced_files(manifest or {})
+    removed = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name not in referenced and not entry.name.endswith('.tmp'):
+                os.remove(entry.path)
+                removed += 1
+    return removed
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import SvgFile
+from .services.catalog import bump_catalog_version
+
+
+@receiver(post_save, sender=SvgFile)
+def catalog_changed(sender, instance, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=SvgFile)
+def catalog_item_deleted(sender, instance, **kwargs):
+    bump_catalog_version(deleted_pk=instance.pk)
@@ -1,4 +1,7 @@
-from django.test import TestCase, Client
+import unittest
+
+from django.db import connection
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
 
@@ -326,3 +329,706 @@ class MinhabibliotecaViewTests(TestCase):
         self.assertContains(response, 'Acesso VIP')
         self.assertContains(response, 'Paid SVG')
 
+
+
+class PopularityCounterTests(TestCase):
+    """Contadores de popularidade com escrita em lote."""
+
+    def setUp(self):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+        from core.services.popularity import flush_popularity
+
+        flush_popularity()
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='pop', email='pop@test.com', password='test123')
+        svg_content = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><path d="M0 0h24v24H0z"/></svg>'
+        self.svg_a = SvgFile.objects.create(title_name='Alpha', content=svg_content, owner=self.user, is_public=True)
+        self.svg_b = SvgFile.objects.create(title_name='Beta', content=svg_content, owner=self.user, is_public=True)
+
+    def test_copy_is_buffered_until_flush(self):
+        from core.services.popularity import flush_popularity
+
+        self.client.get(reverse('core:copy_svg'), {'id': self.svg_a.pk})
+        self.client.get(reverse('core:copy_svg'), {'id': self.svg_a.pk})
+        self.svg_a.refresh_from_db()
+        self.assertEqual(self.svg_a.copy_count, 0)
+
+        flush_popularity()
+        self.svg_a.refresh_from_db()
+        self.assertEqual(self.svg_a.copy_count, 2)
+        self.assertGreater(self.svg_a.trending_score, 0)
+
+    def test_track_view_endpoint(self):
+        from core.services.popularity import flush_popularity
+
+        response = self.client.post(reverse('core:track_svg_event'), {'id': self.svg_b.pk, 'event': 'view'})
+        self.assertEqual(response.status_code, 202)
+        response = self.client.post(reverse('core:track_svg_event'), {'id': self.svg_b.pk, 'event': 'copy'})
+        self.assertEqual(response.status_code, 400)
+
+        flush_popularity()
+        self.svg_b.refresh_from_db()
+        self.assertEqual(self.svg_b.view_count, 1)
+
+    def test_sort_popular_and_trending(self):
+        from core.services.popularity import record_event, flush_popularity
+
+        record_event(self.svg_a.pk, 'view')
+        record_event(self.svg_b.pk, 'favorite')
+        flush_popularity()
+
+        for sort in ('popular', 'trending'):
+            response = self.client.get(reverse('core:search_svg'), {'sort': sort})
+            titles = [row['title_name'] for row in response.json()['results']]
+            self.assertEqual(titles, ['Beta', 'Alpha'])
+
+    def test_unfavorite_cycles_do_not_push_score_below_zero(self):
+        from core.services.popularity import record_event, flush_popularity
+
+        for _ in range(3):
+            record_event(self.svg_a.pk, 'favorite', 1)
+            flush_popularity()
+            record_event(self.svg_a.pk, 'favorite', -1)
+            record_event(self.svg_a.pk, 'favorite', -1)
+            flush_popularity()
+        self.svg_a.refresh_from_db()
+        self.assertEqual(self.svg_a.favorite_count, 0)
+        self.assertGreaterEqual(self.svg_a.trending_score, 0)
+
+    def test_unfavorite_does_not_wipe_trending(self):
+        from unittest import mock
+        from core.services import popularity
+
+        record = lambda event, delta: popularity.flush_counters([(self.svg_a.pk, event, delta)])
+        with mock.patch.object(popularity, 'trending_weight', return_value=1.0):
+            record('view', 4)
+            record('favorite', 1)
+        with mock.patch.object(popularity, 'trending_weight', return_value=100.0):
+            record('favorite', -1)
+        self.svg_a.refresh_from_db()
+        self.assertEqual(self.svg_a.favorite_count, 0)
+        self.assertAlmostEqual(self.svg_a.trending_score, 4 * 1.0 + 5 * 1.0)
+
+    def test_background_buffer_flushes_without_new_events(self):
+        import threading
+        from core.utils.buffering import WriteBehindBuffer
+
+        flushed = threading.Event()
+        batches = []
+        buffer = WriteBehindBuffer(lambda items: (batches.append(items), flushed.set()),
+                                   max_items=100, flush_interval=0.05, background=True)
+        buffer.add('evento')
+        self.assertTrue(flushed.wait(2))
+        self.assertEqual(batches, [['evento']])
+
+    def test_track_view_rejects_unknown_svg(self):
+        response = self.client.post(reverse('core:track_svg_event'), {'id': 999999, 'event': 'view'})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(EXPLORE_PAGE_SIZE=1)
+    def test_impressions_only_for_rendered_page(self):
+        from core.services.popularity import flush_popularity
+
+        response = self.client.get(reverse('core:explore'), {'sort': 'title_name'})
+        self.assertContains(response, 'Alpha')
+        self.assertNotContains(response, 'Beta')
+        flush_popularity()
+        self.svg_a.refresh_from_db()
+        self.svg_b.refresh_from_db()
+        self.assertEqual((self.svg_a.impression_count, self.svg_b.impression_count), (1, 0))
+
+        response = self.client.get(reverse('core:explore'), {'sort': 'title_name', 'page': 2})
+        self.assertContains(response, 'Beta')
+
+
+class SimilarSvgTests(TestCase):
+    """Vizinhos similares pré-computados (build_similar_svgs)."""
+
+    def setUp(self):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='sim', email='sim@test.com', password='test123')
+        circle = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><circle cx="12" cy="12" r="10" fill="#ff0000"/></svg>'
+        path = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><path d="M0 0L24 24L0 24Z" fill="#0000ff"/></svg>'
+        self.circle_a = SvgFile.objects.create(title_name='Circle A', tags='shape,round', content=circle, owner=self.user, is_public=True)
+        self.circle_b = SvgFile.objects.create(title_name='Circle B', tags='shape,round', content=circle, owner=self.user, is_public=True)
+        self.arrow = SvgFile.objects.create(title_name='Arrow', tags='arrow', content=path, owner=self.user, is_public=True)
+
+    def test_build_and_serve_neighbors(self):
+        from core.services.similarity import build_neighbors
+
+        stats = build_neighbors(top_k=2)
+        self.assertEqual(stats['items'], 3)
+        self.assertEqual(stats['recomputed'], 3)
+
+        response = self.client.get(reverse('core:similar_svgs'), {'id': self.circle_a.pk})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results[0]['id'], self.circle_b.pk)
+        self.assertTrue(results[0]['preview'].startswith('data:image/svg+xml;base64,'))
+
+    def test_incremental_run_only_touches_changed_items(self):
+        from core.models import SvgNeighbor
+        from core.services.similarity import build_neighbors
+
+        build_neighbors(top_k=2)
+        stats = build_neighbors(top_k=2)
+        self.assertEqual(stats['changed'], 0)
+        self.assertEqual(stats['recomputed'], 0)
+
+        self.arrow.is_public = False
+        self.arrow.save()
+        stats = build_neighbors(top_k=2)
+        self.assertEqual(stats['removed'], 1)
+        self.assertFalse(SvgNeighbor.objects.filter(neighbor=self.arrow).exists())
+        self.assertFalse(SvgNeighbor.objects.filter(svg=self.arrow).exists())
+
+    def test_block_size_follows_memory_budget(self):
+        import numpy as np
+        from core.services.similarity import BLOCK_MEMORY_BYTES, BYTES_PER_SCORE, _top_k, block_size_for
+
+        self.assertEqual(block_size_for(100), 1024)
+        rows = block_size_for(100_000)
+        self.assertLessEqual(rows * 100_000 * BYTES_PER_SCORE, BLOCK_MEMORY_BYTES)
+        self.assertGreaterEqual(rows, 1)
+
+        scores = np.random.default_rng(0).random((5, 40), dtype=np.float32)
+        idx, vals = _top_k(scores, 3)
+        np.testing.assert_array_equal(idx, np.argsort(-scores, axis=1)[:, :3])
+
+
+class NearDuplicateTests(TestCase):
+    """Fingerprint estrutural e índice LSH de quase-duplicatas."""
+
+    ORIGINAL = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><path id="a" fill="#000" d="M12 2L2 7l10 5 10-5-10-5zM2 17l10 5 10-5M2 12l10 5 10-5"/></svg>'
+    RECOLORED = '<svg xmlns="http://www.w3.org/2000/svg"  viewBox="0 0 24 24">\n  <path id="icon-1" class="x" fill="red" d="M12 2 L2 7 l10 5 10-5 -10-5z M2 17 l10 5 10-5 M2 12 l10 5 10-5" />\n</svg>'
+    OTHER = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><circle cx="12" cy="12" r="10"/><rect x="4" y="4" width="6" height="6"/></svg>'
+
+    def setUp(self):
+        from usuario.models import CustomUser
+
+        self.user = CustomUser.objects.create_user(username='dup', email='dup@test.com', password='test123')
+
+    def test_fingerprint_ignores_ids_colors_and_whitespace(self):
+        from core.utils.fingerprint import hamming_distance, shape_fingerprint
+
+        a = shape_fingerprint(self.ORIGINAL)
+        self.assertIsNotNone(a)
+        self.assertEqual(hamming_distance(a, shape_fingerprint(self.RECOLORED)), 0)
+        self.assertGreater(hamming_distance(a, shape_fingerprint(self.OTHER)), 3)
+
+    def test_find_near_duplicates_and_clusters(self):
+        from core.models import SvgFile
+        from core.services.duplicates import duplicate_clusters, find_near_duplicates
+
+        original = SvgFile.objects.create(title_name='Layers', content=self.ORIGINAL, owner=self.user)
+        copy = SvgFile.objects.create(title_name='Layers red', content=self.RECOLORED, owner=self.user)
+        SvgFile.objects.create(title_name='Shapes', content=self.OTHER, owner=self.user)
+
+        self.assertIsNotNone(original.shape_band0)
+        matches = find_near_duplicates(content=self.ORIGINAL, exclude_pk=original.pk)
+        self.assertEqual([m['id'] for m in matches], [copy.pk])
+        self.assertEqual(duplicate_clusters(), [[original.pk, copy.pk]])
+
+
+class AutocompleteTests(TestCase):
+    """Autocomplete servido do índice de prefixos em memória."""
+
+    def setUp(self):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+        from core.services.autocomplete import reset_index
+
+        reset_index()
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='auto', email='auto@test.com', password='test123')
+        content = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><path d="M0 0h24v24H0z"/></svg>'
+        self.arrow = SvgFile.objects.create(title_name='Arrow Left', tags='Arrows,navigation', content=content, owner=self.user, is_public=True)
+        self.arrow_up = SvgFile.objects.create(title_name='Arrow Up', tags='arrows', content=content, owner=self.user, is_public=True, view_count=50)
+        SvgFile.objects.create(title_name='Archive', content=content, owner=self.user, is_public=False)
+
+    def test_suggestions_ranked_by_popularity(self):
+        response = self.client.get(reverse('core:autocomplete'), {'q': 'ar'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        titles = [r['text'] for r in results if r['type'] == 'title']
+        self.assertEqual(titles, ['Arrow Up', 'Arrow Left'])
+        self.assertIn({'type': 'tag', 'text': 'arrows'}, results)
+
+        # Palavras no meio do título também casam
+        self.assertEqual([r['id'] for r in self.client.get(reverse('core:autocomplete'), {'q': 'lef'}).json()['results']], [self.arrow.pk])
+
+    def test_index_updates_incrementally_and_only_checks_version_when_unchanged(self):
+        from core.models import SvgFile
+        from core.services.autocomplete import suggest
+
+        suggest('ar')
+        with self.assertNumQueries(1):  # só a versão do catálogo (MAX(id) indexado)
+            suggest('arr')
+
+        SvgFile.objects.create(title_name='Arrow Down', content='<svg/>', owner=self.user, is_public=True)
+        self.arrow.delete()
+        texts = [r['text'] for r in suggest('arrow')]
+        self.assertIn('Arrow Down', texts)
+        self.assertNotIn('Arrow Left', texts)
+
+
+class FacetTests(TestCase):
+    """Facetas do explore calculadas em um único aggregate."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+        from payment.models import Purchase
+
+        cache.clear()
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='facet', email='facet@test.com', password='test123')
+        content = '<svg xmlns="http://www.w3.org/2000/svg"/>'
+        SvgFile.objects.create(title_name='Free icon', tags='ui', content=content, owner=self.user, is_public=True)
+        SvgFile.objects.create(title_name='Cheap icon', tags='ui,arrows', content=content, owner=self.user, is_public=True, price=5)
+        self.premium = SvgFile.objects.create(title_name='Premium icon', tags='arrows', content=content, owner=self.user, is_public=True, price=80)
+        Purchase.objects.create(user=self.user, svg=self.premium, price=80)
+
+    def test_counts_exclude_own_group(self):
+        from core.services.catalog import parse_filters
+        from core.services.facets import compute_facets
+
+        filters = parse_filters({'access': 'paid'})
+        with self.assertNumQueries(3):  # versão do catálogo + vocabulário de tags + aggregate
+            facets = compute_facets(filters, self.user)
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual({o['value']: o['count'] for o in facets['access']}, {'free': 1, 'paid': 2})
+        self.assertEqual({o['value']: o['count'] for o in facets['bands']}, {'under_10': 1, '10_50': 0, '50_plus': 1})
+        self.assertEqual(facets['owned'], 1)
+        self.assertEqual(facets['new'], 2)
+        self.assertEqual({o['value']: o['count'] for o in facets['tags']}, {'ui': 1, 'arrows': 2})
+
+        with self.assertNumQueries(1):  # só a versão do catálogo
+            compute_facets(filters, self.user)
+
+    def test_change_in_other_process_invalidates_facets(self):
+        from core.models import CatalogChange, SvgFile
+        from core.services.catalog import parse_filters
+        from core.services.facets import compute_facets
+
+        filters = parse_filters({})
+        self.assertEqual(compute_facets(filters, self.user)['total'], 3)
+        # Outro worker publica um SVG: só o banco muda, o cache deste processo não é tocado
+        SvgFile.objects.filter(pk=self.premium.pk).update(is_public=False)
+        CatalogChange.objects.create()
+        self.assertEqual(compute_facets(filters, self.user)['total'], 2)
+
+    def test_search_api_applies_filters_and_returns_facets(self):
+        self.client.login(username='facet', password='test123')
+        response = self.client.get(reverse('core:search_svg'), {'owned': '1'})
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual([r['title_name'] for r in data['results']], ['Premium icon'])
+        self.assertEqual(data['facets']['owned'], 1)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'EXPLAIN com enable_seqscan só faz sentido no Postgres')
+class IndexUsageTests(TestCase):
+    """Consultas quentes do catálogo devem ser atendidas por índice."""
+
+    SEED_SIZE = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+        from payment.models import Purchase
+
+        cls.user = CustomUser.objects.create_user(username='idx', email='idx@test.com', password='test123')
+        SvgFile.objects.bulk_create(
+            [
+                SvgFile(
+                    title_name=f'Icon {i:05d}', content='<svg/>', owner=cls.user, hash_value=f'seed-{i}',
+                    is_public=i % 4 != 0, price=(i % 3) * 10, trending_score=i % 97,
+                )
+                for i in range(cls.SEED_SIZE)
+            ],
+            batch_size=1000,
+        )
+        Purchase.objects.bulk_create(
+            [Purchase(user=cls.user, svg=svg, price=svg.price) for svg in SvgFile.objects.filter(price__gt=0)[:500]]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_svgfile')
+            cursor.execute('ANALYZE payment_purchase')
+
+    def assertUsesIndex(self, queryset, index_name):
+        # Com seqscan desabilitado qualquer índice passaria num "não é Seq Scan";
+        # o plano precisa citar o índice criado para esse formato de consulta
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_hot_queries_use_indexes(self):
+        from core.models import SvgFile
+        from payment.models import Purchase
+
+        public = SvgFile.objects.filter(is_public=True)
+        self.assertUsesIndex(public.order_by('-uploaded_at')[:24], 'core_svg_pub_recent_idx')
+        self.assertUsesIndex(public.order_by('title_name')[:24], 'core_svg_pub_title_idx')
+        self.assertUsesIndex(public.order_by('-trending_score', '-uploaded_at')[:24], 'core_svg_pub_trending_idx')
+        self.assertUsesIndex(public.filter(price__gt=0).values('pk'), 'core_svg_pub_price_idx')
+        self.assertUsesIndex(public.order_by('path_command_count', 'id')[:24], 'core_svg_pub_complexity_idx')
+        self.assertUsesIndex(SvgFile.objects.filter(owner=self.user).order_by('-uploaded_at')[:24], 'core_svg_owner_recent_idx')
+        self.assertUsesIndex(SvgFile.objects.filter(updated_at__gte=public.latest('updated_at').updated_at).values('pk'), 'core_svg_updated_idx')
+        self.assertUsesIndex(Purchase.objects.filter(user=self.user).order_by('-purchased_at')[:24], 'payment_purchase_user_at_idx')
+
+
+class ExplorePartialTests(TestCase):
+    """Explore com htmx devolve só o fragmento de resultados."""
+
+    def setUp(self):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='hx', email='hx@test.com', password='test123')
+        SvgFile.objects.create(title_name='Partial icon', content='<svg xmlns="http://www.w3.org/2000/svg"/>', owner=self.user, is_public=True)
+
+    def test_htmx_request_returns_fragment_with_oob_facets(self):
+        full = self.client.get(reverse('core:explore'))
+        partial = self.client.get(reverse('core:explore'), {'access': 'free'}, HTTP_HX_REQUEST='true')
+
+        self.assertEqual(partial.status_code, 200)
+        self.assertContains(partial, 'id="explore-results"')
+        self.assertContains(partial, 'hx-swap-oob="true"')
+        self.assertContains(partial, 'Partial icon')
+        self.assertNotContains(partial, '<html')
+        self.assertLess(len(partial.content), len(full.content))
+        self.assertIn('HX-Request', partial['Vary'])
+
+    def test_history_restore_gets_full_page(self):
+        response = self.client.get(reverse('core:explore'), HTTP_HX_REQUEST='true', HTTP_HX_HISTORY_RESTORE_REQUEST='true')
+        self.assertContains(response, '<html')
+        self.assertNotContains(response, 'hx-swap-oob')
+
+
+class FastSerializationTests(TestCase):
+    """Camada de serialização rápida (values() + FastJsonResponse)."""
+
+    def test_response_handles_decimal_and_datetime(self):
+        import json
+        from datetime import date
+        from decimal import Decimal
+        from core.utils.serialization import FastJsonResponse
+
+        response = FastJsonResponse({'price': Decimal('9.90'), 'day': date(2025, 1, 2)})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), {'price': '9.90', 'day': '2025-01-02'})
+
+    def test_search_paginates_with_window_count(self):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+
+        user = CustomUser.objects.create_user(username='ser', email='ser@test.com', password='test123')
+        for i in range(5):
+            SvgFile.objects.create(title_name=f'Page {i}', content='<svg/>', owner=user, is_public=True)
+
+        response = self.client.get(reverse('core:search_svg'), {'page': 2, 'page_size': 2, 'sort': 'title_name'})
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual([r['title_name'] for r in data['results']], ['Page 2', 'Page 3'])
+        self.assertEqual(set(data['results'][0]), {'id', 'title_name', 'uploaded_at'})
+
+        data = self.client.get(reverse('core:search_svg'), {'page': 9, 'page_size': 2}).json()
+        self.assertEqual((data['count'], data['results']), (5, []))
+
+
+class CatalogSnapshotTests(TestCase):
+    """Snapshot estático do catálogo em shards NDJSON gzip."""
+
+    def setUp(self):
+        import tempfile
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.user = CustomUser.objects.create_user(username='snap', email='snap@test.com', password='test123')
+        self.items = [
+            SvgFile.objects.create(title_name=f'Snap {i}', tags='a, b', content='<svg/>', owner=self.user, is_public=True, price=i)
+            for i in range(4)
+        ]
+        # Fora da folga de SNAPSHOT_SYNC_MARGIN: só o que for salvo no teste conta como alterado
+        from datetime import timedelta
+        from django.utils import timezone
+
+        SvgFile.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def _build(self, **kwargs):
+        from django.test import override_settings
+        from core.services.snapshot import build_snapshot
+
+        with override_settings(CATALOG_SNAPSHOT_ROOT=self.tmp.name, CATALOG_SNAPSHOT_SHARD_SIZE=2):
+            return build_snapshot(**kwargs)
+
+    def test_snapshot_contents_and_incremental_rebuild(self):
+        import gzip
+        import json
+        import os
+        from datetime import timedelta
+        from django.utils import timezone
+        from core.models import SvgFile
+
+        first = self._build()
+        self.assertFalse(first['skipped'])
+        with open(os.path.join(self.tmp.name, 'manifest.json')) as fh:
+            manifest = json.load(fh)
+        self.assertEqual(manifest['count'], 4)
+        with gzip.open(os.path.join(self.tmp.name, manifest['shards'][0]['file'])) as fh:
+            row = json.loads(fh.readline())
+        self.assertEqual(row['tags'], ['a', 'b'])
+        self.assertIn('price', row)
+
+        # Sem mudança de versão: só a leitura do catalog_version
+        with self.assertNumQueries(1):
+            self.assertTrue(self._build()['skipped'])
+
+        self.items[-1].title_name = 'Renamed'
+        self.items[-1].save()
+        second = self._build()
+        self.assertEqual(second['rebuilt'], 1)
+        self.assertEqual(second['shards'], first['shards'])
+
+        SvgFile.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.items[0].delete()
+        third = self._build()
+        self.assertEqual(third['rebuilt'], 1)
+        with open(os.path.join(self.tmp.name, 'manifest.json')) as fh:
+            self.assertEqual(json.load(fh)['count'], 3)
+
+    def test_search_index_in_manifest(self):
+        import json
+        import os
+        from core.utils.search_index import decode_index
+
+        self._build()
+        with open(os.path.join(self.tmp.name, 'manifest.json')) as fh:
+            entry = json.load(fh)['search_index']
+        self.assertEqual(entry['docs'], 4)
+        with open(os.path.join(self.tmp.name, entry['file']), 'rb') as fh:
+            docs, tags, postings = decode_index(fh.read())
+        self.assertEqual(tags, ['a', 'b'])
+        self.assertEqual({doc['id'] for doc in docs}, {svg.pk for svg in self.items})
+
+        # Índice ausente força a regeração mesmo sem mudança nos shards
+        os.remove(os.path.join(self.tmp.name, entry['file']))
+        self.assertFalse(self._build()['skipped'])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, entry['file'])))
+
+    def test_search_index_follows_popularity_after_max_age(self):
+        import json
+        import os
+        from django.test import override_settings
+        from core.models import SvgFile
+        from core.utils.search_index import decode_index
+
+        self._build()
+        SvgFile.objects.filter(pk=self.items[0].pk).update(view_count=100)
+        # Contadores não mudam a versão do catálogo: o índice espera a idade máxima
+        self.assertTrue(self._build()['skipped'])
+        with override_settings(CATALOG_SEARCH_INDEX_MAX_AGE=0):
+            result = self._build()
+        self.assertFalse(result['skipped'])
+        self.assertEqual(result['rebuilt'], 0)
+        with open(os.path.join(self.tmp.name, 'manifest.json')) as fh:
+            entry = json.load(fh)['search_index']
+        with open(os.path.join(self.tmp.name, entry['file']), 'rb') as fh:
+            docs = decode_index(fh.read())[0]
+        self.assertEqual(docs[0]['id'], self.items[0].pk)
+
+
+class SearchIndexTests(TestCase):
+    """Codificação do índice binário da busca instantânea."""
+
+    def test_normalize_strips_every_combining_mark(self):
+        from core.utils.search_index import tokenize
+
+        # "ि" (U+093F) é marca de classe 0: precisa sair como no /\p{M}/gu do cliente
+        self.assertEqual(tokenize('Ícone कि'), ['icone', 'क'])
+
+    def test_roundtrip_and_prefix_search(self):
+        from core.utils.search_index import build_index, decode_index, search
+
+        data = build_index([
+            {'id': 7, 'title': 'Ícone Casa', 'price_cents': 990, 'has_thumbnail': True, 'tags': ['home']},
+            {'id': 3, 'title': 'Casa de praia', 'price_cents': 0, 'has_thumbnail': False, 'tags': ['beach', 'home']},
+            {'id': 300, 'title': 'Carro', 'price_cents': 0, 'has_thumbnail': False, 'tags': []},
+        ])
+        docs, tags, postings = decode_index(data)
+        self.assertEqual([doc['id'] for doc in docs], [7, 3, 300])
+        self.assertEqual(docs[0]['price_cents'], 990)
+        self.assertEqual(tags, ['home', 'beach'])
+        tokens = sorted(postings)
+        self.assertEqual(search(postings, tokens, 'ca'), [0, 1, 2])
+        self.assertEqual(search(postings, tokens, 'icone'), [0])
+        self.assertEqual(search(postings, tokens, 'casa beach'), [1])
+        self.assertEqual(search(postings, tokens, 'xyz'), [])
+
+
+class SvgMetadataTests(TestCase):
+    """Metadados extraídos na ingestão e filtros do explore sobre eles."""
+
+    OUTLINE = (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor">'
+        '<path d="M3 12h18M12 3v18"/><circle cx="12" cy="12" r="9"/></svg>'
+    )
+    FILLED = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 48 48"><path d="M0 0h48v48H0z"/></svg>'
+
+    def setUp(self):
+        from usuario.models import CustomUser
+
+        self.user = CustomUser.objects.create_user(username='meta', email='meta@test.com', password='test123')
+
+    def test_analyze_svg(self):
+        from core.utils.svg_metadata import analyze_svg
+
+        outline = analyze_svg(self.OUTLINE)
+        self.assertEqual(outline['viewbox'], '0 0 24 24')
+        self.assertEqual((outline['width'], outline['height']), (24.0, 24.0))
+        self.assertEqual((outline['element_count'], outline['path_count'], outline['path_command_count']), (3, 1, 4))
+        self.assertEqual(outline['paint_style'], 'outline')
+        filled = analyze_svg(self.FILLED)
+        self.assertEqual((filled['width'], filled['paint_style']), (48.0, 'fill'))
+        self.assertEqual(analyze_svg('not svg')['paint_style'], '')
+
+    def test_ingest_backfill_and_filters(self):
+        from core.models import SvgFile
+        from core.services.catalog import apply_filters, parse_filters
+        from core.services.metadata import backfill_metadata
+
+        outline = SvgFile.objects.create(title_name='Outline', content=self.OUTLINE, owner=self.user, is_public=True)
+        filled = SvgFile.objects.create(title_name='Filled', content=self.FILLED, owner=self.user, is_public=True)
+        self.assertEqual(outline.paint_style, 'outline')
+
+        # Linhas antigas (sem metadados) são preenchidas pelo backfill
+        SvgFile.objects.filter(pk=filled.pk).update(metadata_version=0, paint_style='', width=None, height=None)
+        self.assertEqual(backfill_metadata(workers=1), 1)
+        filled.refresh_from_db()
+        self.assertEqual((filled.paint_style, filled.width), ('fill', 48.0))
+
+        def titles(params):
+            return list(apply_filters(parse_filters(params), None).values_list('title_name', flat=True))
+
+        self.assertEqual(titles({'style': 'outline'}), ['Outline'])
+        self.assertEqual(titles({'size': '48'}), ['Filled'])
+        self.assertEqual(titles({'style': 'outline', 'size': '48'}), [])
+
+
+class ColorSearchTests(TestCase):
+    """Paleta extraída na ingestão, filtro ?color= e ordenação por distância de cor."""
+
+    def setUp(self):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+
+        user = CustomUser.objects.create_user(username='color', email='color@test.com', password='test123')
+
+        def make(title, fill, stroke='none'):
+            content = f'<svg xmlns="http://www.w3.org/2000/svg"><path fill="{fill}" stroke="{stroke}" d="M0 0h1"/></svg>'
+            return SvgFile.objects.create(title_name=title, content=content, owner=user, is_public=True)
+
+        self.violet = make('Violet', '#8b5cf6')
+        self.brand = make('Brand', '#7c3aed', stroke='#000')
+        self.red = make('Red', 'red')
+
+    def test_palette_rows_and_filter(self):
+        from core.services.catalog import apply_filters, parse_filters
+
+        self.assertEqual(
+            sorted(self.brand.colors.values_list('rgb', flat=True)),
+            [0x000000, 0x7c3aed],
+        )
+        filters = parse_filters({'color': 'purple'})
+        self.assertEqual(set(apply_filters(filters, None).values_list('title_name', flat=True)), {'Violet', 'Brand'})
+        self.assertEqual(parse_filters({'color': 'nope'})['color'], '')
+
+    def test_color_distance_sort(self):
+        response = self.client.get(reverse('core:search_svg'), {'color': '#7c3aed', 'sort': 'color'})
+        self.assertEqual([r['title_name'] for r in response.json()['results']], ['Brand', 'Violet'])
+
+    def test_color_sort_uses_stored_lab_and_keeps_rows_without_it(self):
+        from core.models import SvgColor
+        from core.services.catalog import apply_filters, apply_sort, parse_filters
+
+        self.assertAlmostEqual(self.brand.colors.get(rgb=0x7c3aed).lab_l, 43.4, places=1)
+        # Linha ainda sem backfill do Lab: continua no resultado, no fim
+        SvgColor.objects.filter(svg=self.brand).update(lab_l=None, lab_a=None, lab_b=None)
+        filters = parse_filters({'color': '#7c3aed'})
+        queryset = apply_sort(apply_filters(filters, None), 'color', filters)
+        self.assertNotIn('CASE', str(queryset.query))
+        self.assertEqual(list(queryset.values_list('title_name', flat=True)), ['Violet', 'Brand'])
+
+
+class RecolorTests(TestCase):
+    """Recoloração sob demanda com cache LRU e regra de acesso do SvgFile."""
+
+    CONTENT = (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">'
+        '<path fill="#000" d="M0 0h1"/><circle style="stroke:red;fill:none" r="2"/></svg>'
+    )
+
+    def setUp(self):
+        from usuario.models import CustomUser
+        from core.models import SvgFile
+        from core.services.recolor import clear_caches
+
+        clear_caches()
+        owner = CustomUser.objects.create_user(username='tint', email='tint@test.com', password='test123')
+        self.free = SvgFile.objects.create(title_name='Free', content=self.CONTENT, owner=owner, is_public=True)
+        self.paid = SvgFile.objects.create(title_name='Paid', content=self.CONTENT, owner=owner, is_public=True, price=10)
+
+    def test_mapping_and_cache(self):
+        from unittest import mock
+        from core.services import recolor
+        from core.utils.recolor import parse_mapping
+
+        self.assertEqual(parse_mapping('RED:#7C3AED, *:#111'), (('#ff0000', '#7c3aed'), ('*', '#111111')))
+        with self.assertRaises(ValueError):
+            parse_mapping('red')
+
+        markup = recolor.recolor_svg(self.free, parse_mapping('red:#00ff00', normalize_current=True))
+        self.assertIn('fill="currentColor"', markup)
+        self.assertIn('stroke:#00ff00;fill:none', markup)
+        self.assertNotIn('ns0:', markup)
+
+        with mock.patch.object(recolor, 'parse_svg') as parse:
+            recolor.recolor_svg(self.free, parse_mapping('*:#123456'))
+            recolor.recolor_svg(self.paid, parse_mapping('*:#123456'))
+        parse.assert_not_called()  # mesma árvore (mesmo content_hash) reaproveitada
+
+    def test_wildcard_recolors_current_color_and_implicit_fill(self):
+        from core.utils.recolor import parse_mapping, recolor_tree, serialize
+        from xml.etree import ElementTree as ET
+
+        current = ET.fromstring('<svg xmlns="http://www.w3.org/2000/svg"><path fill="currentColor" d="M0 0"/></svg>')
+        markup = serialize(recolor_tree(current, parse_mapping('*:#7c3aed')))
+        self.assertIn('fill="#7c3aed"', markup)
+        self.assertNotIn('currentColor', markup)
+        self.assertIn('fill="#00ff00"', serialize(recolor_tree(current, parse_mapping('currentColor:#00ff00'))))
+
+        implicit = ET.fromstring('<svg xmlns="http://www.w3.org/2000/svg"><path d="M0 0"/><rect fill="red"/></svg>')
+        markup = serialize(recolor_tree(implicit, parse_mapping('*:#7c3aed')))
+        self.assertTrue(markup.startswith('<svg xmlns="http://www.w3.org/2000/svg" fill="#7c3aed"'), markup)
+        self.assertEqual(markup.count('#7c3aed'), 2)
+        # Só o vermelho explícito: o fill implícito (preto) não é tocado
+        self.assertNotIn('fill="#', serialize(recolor_tree(implicit, parse_mapping('#ff0000:#7c3aed'))).split('<path')[0])
+
+    def test_endpoint_follows_access_type(self):
+        url = reverse('core:recolor_svg')
+        response = self.client.get(url, {'id': self.free.pk, 'map': '*:#7c3aed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('#7c3aed', response.json()['svg_text'])
+        self.assertEqual(self.client.get(url, {'id': self.paid.pk, 'map': '*:#7c3aed'}).status_code, 403)
+        self.assertEqual(self.client.get(url, {'id': self.free.pk, 'map': 'bogus'}).status_code, 400)
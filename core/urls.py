@@ -14,8 +14,12 @@ urlpatterns = [
     path('checkout/', checkout, name='checkout'),
     path('minha-biblioteca/', minha_biblioteca, name='minha_biblioteca'),
     path('api/copy_svg/', copy_svg, name='copy_svg'),
+    path('api/recolor_svg/', recolor_svg, name='recolor_svg'),
     path('api/paste_svg/', paste_svg, name='paste_svg'),
     path('api/search_svg/', search_svg, name='search_svg'),
+    path('api/track_svg/', track_svg_event, name='track_svg_event'),
+    path('api/autocomplete/', autocomplete, name='autocomplete'),
+    path('api/similar_svg/', similar_svgs, name='similar_svgs'),
     path('manage/svg/', admin_svg, name='admin_svg'),
     path('manage/svg/create/', admin_create_svg, name='admin_create_svg'),
     path('manage/svg/update/', admin_update_svg, name='admin_update_svg'),
@@ -0,0 +1,85 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Acumula itens em memória e os entrega em lote para `flush_func`.
+
+    O descarregamento acontece quando o buffer atinge `max_items` ou quando
+    `flush_interval` segundos se passaram desde o último flush. Com `background`,
+    uma thread daemon por processo (iniciada no primeiro item, também depois de um
+    fork) faz os dois: a requisição só enfileira, e contadores de pouco tráfego são
+    gravados mesmo sem novos eventos. Sem ela, quem adiciona o item que cruza o
+    limite executa o flush.
+    """
+
+    def __init__(self, flush_func: Callable[[List], None], max_items: int = 500, flush_interval: float = 30.0,
+                 background: bool = False):
+        self.flush_func = flush_func
+        self.max_items = max_items
+        self.flush_interval = flush_interval
+        self.background = background
+        self._items: List = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wake = threading.Event()
+        self._thread_pid = None
+        atexit.register(self.flush)
+
+    def add(self, item) -> None:
+        self.add_many((item,))
+
+    def add_many(self, items: Iterable) -> None:
+        with self._lock:
+            self._items.extend(items)
+            full = len(self._items) >= self.max_items
+            due = full or time.monotonic() - self._last_flush >= self.flush_interval
+        if self.background:
+            self._ensure_thread()
+            if full:
+                self._wake.set()
+        elif due:
+            self.flush()
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._thread_pid = pid
+            self._wake = threading.Event()
+        threading.Thread(target=self._run, name='write-behind', daemon=True).start()
+
+    def _run(self) -> None:
+        from django.db import close_old_connections
+
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            # A thread vive o processo inteiro: não deixa conexão velha aberta entre flushes
+            close_old_connections()
+
+    def flush(self) -> int:
+        with self._lock:
+            items, self._items = self._items, []
+            self._last_flush = time.monotonic()
+        if not items:
+            return 0
+        try:
+            self.flush_func(items)
+        except Exception:
+            # Contadores/eventos são best-effort: perder um lote é preferível a derrubar a requisição
+            logger.exception("Falha ao descarregar %s itens do buffer", len(items))
+        return len(items)
+
+    def __len__(self) -> int:
+        return len(self._items)
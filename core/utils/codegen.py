@@ -0,0 +1,260 @@
+"""
+Geradores de código a partir do markup SVG: componentes React (JSX/TSX), Vue SFC e contornos de glifo para fonte de ícones.
+
+Funções puras (sem ORM): rodam nos processos de trabalho de core.services.codegen.
+"""
+import io
+import json
+import re
+from typing import Dict, List, Tuple
+from xml.etree import ElementTree as ET
+from xml.etree.ElementTree import Element
+
+from .prefix_index import normalize
+from .svg_features import parse_svg
+from .svg_metadata import parse_viewbox
+
+try:
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.cu2quPen import Cu2QuPen
+    from fontTools.pens.recordingPen import RecordingPen
+    from fontTools.pens.transformPen import TransformPen
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    from fontTools.svgLib.path import SVGPath
+except ImportError:  # pragma: no cover - depende do ambiente
+    FontBuilder = None
+
+FONT_AVAILABLE = FontBuilder is not None
+
+# Incrementar quando a saída mudar: invalida os artefatos em cache
+GENERATOR_VERSION = 1
+
+COMPONENT_FORMATS = {'jsx': 'jsx', 'tsx': 'tsx', 'vue': 'vue'}
+FONT_FORMAT = 'font'
+FORMATS = list(COMPONENT_FORMATS) + [FONT_FORMAT]
+
+UNITS_PER_EM = 1024
+FIRST_CODEPOINT = 0xE000  # Private Use Area
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+XLINK_NS = '{http://www.w3.org/1999/xlink}'
+XML_NS = '{http://www.w3.org/XML/1998/namespace}'
+JSX_RENAMES = {'class': 'className', 'for': 'htmlFor', 'tabindex': 'tabIndex'}
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def component_name(title: str, fallback: str) -> str:
+    """"Seta p/ direita" -> "SetaPDireita"; títulos vazios ou iniciados por dígito ganham prefixo."""
+    words = WORD_RE.findall(normalize(title))
+    name = ''.join(word.capitalize() for word in words) or fallback
+    return name if name[0].isalpha() else f'Icon{name}'
+
+
+def _tag(element: Element) -> str:
+    return element.tag.rsplit('}', 1)[-1] if isinstance(element.tag, str) else ''
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split('-')
+    return head + ''.join(part.capitalize() for part in rest)
+
+
+def _foreign(name: str) -> bool:
+    """Nome em namespace que não é SVG, xlink nem xml (inkscape:, sodipodi:, rdf:...)."""
+    return name.startswith('{') and not name.startswith((SVG_NS, XLINK_NS, XML_NS))
+
+
+def _jsx_attr(name: str) -> str:
+    if name.startswith(XLINK_NS):
+        return 'xlink' + name[len(XLINK_NS):].capitalize()
+    if name.startswith(XML_NS):
+        return 'xml' + name[len(XML_NS):].capitalize()
+    if name in JSX_RENAMES:
+        return JSX_RENAMES[name]
+    if name.startswith(('data-', 'aria-')):
+        return name
+    return _camel(name.replace(':', '-'))
+
+
+def _xml_attr(name: str) -> str:
+    if name.startswith(XLINK_NS):
+        return 'xlink:' + name[len(XLINK_NS):]
+    if name.startswith(XML_NS):
+        return 'xml:' + name[len(XML_NS):]
+    return name
+
+
+def _escape_attr(value: str) -> str:
+    return value.replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;')
+
+
+def _escape_jsx_text(text: str) -> str:
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('{', '&#123;').replace('}', '&#125;'))
+
+
+def _escape_xml_text(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _jsx_style(style: str) -> str:
+    pairs = []
+    for declaration in style.split(';'):
+        prop, sep, value = declaration.partition(':')
+        if sep and prop.strip():
+            pairs.append(f'{_camel(prop.strip())}: {json.dumps(value.strip())}')
+    return '{{ ' + ', '.join(pairs) + ' }}'
+
+
+def _render(element: Element, jsx: bool, depth: int, root_extra: str) -> List[str]:
+    indent = '  ' * depth
+    attrs = []
+    for name, value in element.attrib.items():
+        # Eventos e metadados de editor (inkscape:label, sodipodi:docname) não entram no componente
+        if name.lower().startswith('on') or _foreign(name):
+            continue
+        if jsx and name == 'style':
+            attrs.append(f'style={_jsx_style(value)}')
+        else:
+            attr = _jsx_attr(name) if jsx else _xml_attr(name)
+            attrs.append(f'{attr}="{_escape_attr(value)}"')
+    if root_extra:
+        attrs.append(root_extra)
+    opening = f"{indent}<{_tag(element)}{''.join(' ' + a for a in attrs)}"
+    escape = _escape_jsx_text if jsx else _escape_xml_text
+    text = (element.text or '').strip()
+    # <sodipodi:namedview>, <rdf:RDF>...: não são SVG e não compilam como componente
+    children = [child for child in element if isinstance(child.tag, str) and not _foreign(child.tag)]
+    if not children and not text:
+        return [opening + ' />']
+    lines = [opening + '>']
+    if text:
+        lines.append('  ' * (depth + 1) + escape(text))
+    for child in children:
+        lines.extend(_render(child, jsx, depth + 1, ''))
+        if (child.tail or '').strip():
+            lines.append('  ' * (depth + 1) + escape(child.tail.strip()))
+    lines.append(f'{indent}</{_tag(element)}>')
+    return lines
+
+
+def _parse(markup: str) -> Element:
+    root = parse_svg(markup)
+    if root is None or _tag(root) != 'svg':
+        raise ValueError('SVG inválido')
+    return root
+
+
+def to_jsx(markup: str, name: str, typescript: bool = False) -> str:
+    """Componente React: atributos em camelCase, style como objeto e props repassadas ao <svg>."""
+    body = '\n'.join(_render(_parse(markup), True, 2, '{...props}'))
+    if typescript:
+        return (
+            "import type { SVGProps } from 'react';\n\n"
+            f"export default function {name}(props: SVGProps<SVGSVGElement>) {{\n"
+            f"  return (\n{body}\n  );\n}}\n"
+        )
+    return f"export default function {name}(props) {{\n  return (\n{body}\n  );\n}}\n"
+
+
+def to_vue(markup: str, name: str) -> str:
+    """Vue SFC; atributos do componente caem no <svg> raiz (inheritAttrs padrão).
+
+    v-pre: o markup é estático, o compilador não precisa percorrê-lo (nem interpretar "{{" em <text>).
+    """
+    body = '\n'.join(_render(_parse(markup), False, 1, 'v-pre'))
+    return f"<template>\n{body}\n</template>\n\n<script>\nexport default {{ name: '{name}' }};\n</script>\n"
+
+
+def glyph_outline(markup: str) -> List:
+    """Contornos do SVG em unidades da fonte (y para cima, viewBox ajustado ao em), como lista JSON.
+
+    Fontes de ícone só têm preenchimento: traços (stroke) viram o contorno do próprio path.
+    """
+    if FontBuilder is None:
+        raise RuntimeError('fontTools não instalado')
+    root = _parse(markup)
+    box = parse_viewbox(root.get('viewBox')) or (0.0, 0.0, float(root.get('width') or 24), float(root.get('height') or 24))
+    min_x, min_y, width, height = box
+    scale = UNITS_PER_EM / max(width, height)
+    recording = RecordingPen()
+    pen = TransformPen(recording, (scale, 0, 0, -scale, -min_x * scale, (min_y + height) * scale))
+    SVGPath.fromstring(ET.tostring(root)).draw(pen)
+    return json.loads(json.dumps(recording.value))
+
+
+GENERATORS = {
+    'jsx': lambda markup, name: to_jsx(markup, name),
+    'tsx': lambda markup, name: to_jsx(markup, name, typescript=True),
+    'vue': to_vue,
+    FONT_FORMAT: lambda markup, name: json.dumps(glyph_outline(markup)),
+}
+
+
+def slug(name: str) -> str:
+    """"SetaPDireita" -> "seta-p-direita" (classe CSS / nome de glifo)."""
+    return re.sub(r'(?<!^)(?=[A-Z])', '-', name).lower()
+
+
+def generate_batch(fmt: str, batch: List[Tuple[str, str, str]]) -> List[Tuple[str, str]]:
+    """Lote (chave, markup, nome) -> (chave, artefato ou '' se inválido); alvo do pool de processos."""
+    generate = GENERATORS[fmt]
+    results = []
+    for key, markup, name in batch:
+        try:
+            results.append((key, generate(markup, name)))
+        except Exception:  # markup inválido ou path que o fontTools não entende
+            results.append((key, ''))
+    return results
+
+
+def build_font(glyphs: List[Tuple[str, List]], family: str = 'AkkaIcons') -> Tuple[bytes, str, Dict[str, int]]:
+    """Monta a fonte a partir de contornos já calculados: (bytes, extensão, {nome: codepoint}).
+
+    WOFF2 exige o módulo brotli; sem ele a fonte sai como WOFF (zlib).
+    """
+    if FontBuilder is None:
+        raise RuntimeError('fontTools não instalado')
+    names = ['.notdef'] + [name for name, _ in glyphs]
+    codepoints = {name: FIRST_CODEPOINT + i for i, (name, _) in enumerate(glyphs)}
+
+    builder = FontBuilder(UNITS_PER_EM, isTTF=True)
+    builder.setupGlyphOrder(names)
+    builder.setupCharacterMap({codepoint: name for name, codepoint in codepoints.items()})
+    outlines = {'.notdef': TTGlyphPen(None).glyph()}
+    for name, recording in glyphs:
+        pen = TTGlyphPen(None)
+        replay = Cu2QuPen(pen, max_err=1.0, reverse_direction=True)
+        for operator, operands in recording:
+            getattr(replay, operator)(*[tuple(point) for point in operands])
+        outlines[name] = pen.glyph()
+    builder.setupGlyf(outlines)
+    builder.setupHorizontalMetrics({name: (UNITS_PER_EM, 0) for name in names})
+    builder.setupHorizontalHeader(ascent=UNITS_PER_EM, descent=0)
+    builder.setupNameTable({'familyName': family, 'styleName': 'Regular'})
+    builder.setupOS2(sTypoAscender=UNITS_PER_EM, sTypoDescender=0, usWinAscent=UNITS_PER_EM, usWinDescent=0)
+    builder.setupPost()
+
+    try:
+        import brotli  # noqa: F401
+        builder.font.flavor, extension = 'woff2', 'woff2'
+    except ImportError:
+        builder.font.flavor, extension = 'woff', 'woff'
+    buffer = io.BytesIO()
+    builder.save(buffer)
+    return buffer.getvalue(), extension, codepoints
+
+
+def font_css(codepoints: Dict[str, int], font_file: str, family: str = 'AkkaIcons') -> str:
+    fmt = 'woff2' if font_file.endswith('.woff2') else 'woff'
+    lines = [
+        '@font-face {',
+        f"  font-family: '{family}';",
+        f"  src: url('{font_file}') format('{fmt}');",
+        '  font-display: block;',
+        '}',
+        f".icon {{ font-family: '{family}'; font-style: normal; line-height: 1; speak: never; }}",
+    ]
+    for name, codepoint in codepoints.items():
+        lines.append(f'.icon-{name}::before {{ content: "\\{codepoint:04x}"; }}')
+    return '\n'.join(lines) + '\n'
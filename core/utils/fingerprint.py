@@ -0,0 +1,113 @@
+"""
+Fingerprint estrutural (SimHash 64 bits) de SVGs para detecção de quase-duplicatas.
+
+Ignora ids, classes, cores e espaços: só a geometria (comandos de path e
+atributos geométricos das formas básicas, quantizados pelo viewBox) entra no hash.
+"""
+import hashlib
+import re
+from typing import Iterator, List, Optional, Tuple
+
+from .svg_features import local_name, parse_svg
+
+HASH_BITS = 64
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+SHINGLE_SIZE = 4
+QUANTIZATION = 64  # passos por lado do viewBox
+
+PATH_TOKEN_RE = re.compile(r'[MLHVCSQTAZmlhvcsqtaz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+SHAPE_ATTRS = {
+    'circle': ('cx', 'cy', 'r'),
+    'ellipse': ('cx', 'cy', 'rx', 'ry'),
+    'rect': ('x', 'y', 'width', 'height', 'rx', 'ry'),
+    'line': ('x1', 'y1', 'x2', 'y2'),
+}
+
+
+def _viewbox_scale(root) -> float:
+    parts = (root.get('viewBox') or '').replace(',', ' ').split()
+    try:
+        scale = max(float(parts[2]), float(parts[3]))
+    except (IndexError, ValueError):
+        scale = 0.0
+    return scale if scale > 0 else 24.0
+
+
+def _quantize(number: str, scale: float) -> str:
+    try:
+        return str(round(float(number) / scale * QUANTIZATION))
+    except ValueError:
+        return '0'
+
+
+def iter_geometry_tokens(root) -> Iterator[List[str]]:
+    """Sequência de tokens normalizados por elemento geométrico."""
+    scale = _viewbox_scale(root)
+    for element in root.iter():
+        name = local_name(element.tag)
+        if name == 'path':
+            tokens = []
+            for token in PATH_TOKEN_RE.findall(element.get('d', '')):
+                tokens.append(token.upper() if token.isalpha() else _quantize(token, scale))
+            if tokens:
+                yield tokens
+        elif name in ('polygon', 'polyline'):
+            points = NUMBER_RE.findall(element.get('points', ''))
+            if points:
+                yield [name] + [_quantize(p, scale) for p in points]
+        elif name in SHAPE_ATTRS:
+            yield [name] + [_quantize(element.get(attr, '0'), scale) for attr in SHAPE_ATTRS[name]]
+
+
+def _shingles(tokens: List[str]) -> Iterator[str]:
+    if len(tokens) <= SHINGLE_SIZE:
+        yield ' '.join(tokens)
+        return
+    for i in range(len(tokens) - SHINGLE_SIZE + 1):
+        yield ' '.join(tokens[i:i + SHINGLE_SIZE])
+
+
+def simhash(features: Iterator[str]) -> Optional[int]:
+    weights = [0] * HASH_BITS
+    seen = False
+    for feature in features:
+        seen = True
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(HASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    if not seen:
+        return None
+    return sum(1 << bit for bit in range(HASH_BITS) if weights[bit] > 0)
+
+
+def shape_fingerprint(content: str) -> Optional[int]:
+    """SimHash (inteiro sem sinal de 64 bits) da geometria do SVG; None se não houver geometria."""
+    root = parse_svg(content)
+    if root is None:
+        return None
+    return simhash(shingle for tokens in iter_geometry_tokens(root) for shingle in _shingles(tokens))
+
+
+def split_bands(fingerprint: int) -> Tuple[int, ...]:
+    """Divide o hash em BANDS faixas de BAND_BITS bits (chaves do índice LSH).
+
+    Com distância de Hamming <= BANDS - 1, pelo menos uma faixa é idêntica.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return tuple(fingerprint >> (band * BAND_BITS) & mask for band in range(BANDS))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value: int) -> int:
+    """Converte para o intervalo de BigIntegerField (int64 com sinal)."""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << HASH_BITS) if value < 0 else value
@@ -0,0 +1,118 @@
+"""
+Paleta fixa para busca por cor: cores de fill/stroke quantizadas para o tom mais próximo.
+"""
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+from xml.etree.ElementTree import Element
+
+import numpy as np
+
+from .svg_features import iter_paint_values, parse_color
+
+PALETTE: List[Tuple[str, Tuple[int, int, int]]] = [
+    ('black', (17, 17, 17)),
+    ('gray', (128, 128, 128)),
+    ('white', (245, 245, 245)),
+    ('red', (220, 38, 38)),
+    ('orange', (234, 88, 12)),
+    ('yellow', (234, 179, 8)),
+    ('green', (22, 163, 74)),
+    ('teal', (13, 148, 136)),
+    ('cyan', (6, 182, 212)),
+    ('blue', (37, 99, 235)),
+    ('indigo', (79, 70, 229)),
+    ('purple', (124, 58, 237)),
+    ('pink', (219, 39, 119)),
+    ('brown', (120, 53, 15)),
+]
+PALETTE_NAMES = [name for name, _ in PALETTE]
+PALETTE_HEX = [(name, '#%02x%02x%02x' % rgb) for name, rgb in PALETTE]
+PALETTE_RGB = np.array([rgb for _, rgb in PALETTE], dtype=np.float32)
+
+# Cores guardadas por SVG (as mais frequentes)
+MAX_COLORS = 8
+
+HEX_QUERY_RE = re.compile(r'^#?([0-9a-fA-F]{6}|[0-9a-fA-F]{3})$')
+
+
+def pack_rgb(rgb: Tuple[int, int, int]) -> int:
+    return (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
+
+
+def unpack_rgb(values) -> np.ndarray:
+    """Inteiros 0xRRGGBB -> matriz (n, 3) float32."""
+    values = np.asarray(values, dtype=np.int64)
+    return np.stack([(values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF], axis=-1).astype(np.float32)
+
+
+def color_distance(colors: np.ndarray, target) -> np.ndarray:
+    """Distância "redmean" (aproximação perceptual barata) entre linhas RGB e um alvo, vetorizada."""
+    target = np.asarray(target, dtype=np.float32)
+    mean_red = (colors[..., 0] + target[..., 0]) / 2
+    diff = colors - target
+    return np.sqrt(
+        (2 + mean_red / 256) * diff[..., 0] ** 2
+        + 4 * diff[..., 1] ** 2
+        + (2 + (255 - mean_red) / 256) * diff[..., 2] ** 2
+    )
+
+
+def srgb_to_lab(rgb) -> Tuple[float, float, float]:
+    """sRGB (0-255) -> CIE L*a*b* (D65). Distância euclidiana em Lab é a ordenação por cor no banco."""
+    linear = []
+    for channel in rgb:
+        c = channel / 255
+        linear.append(c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4)
+    r, g, b = linear
+    xyz = (
+        (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047,
+        0.2126 * r + 0.7152 * g + 0.0722 * b,
+        (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883,
+    )
+    fx, fy, fz = (t ** (1 / 3) if t > 0.008856 else 7.787 * t + 16 / 116 for t in xyz)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+def quantize(rgb) -> int:
+    """Índice da cor mais próxima na paleta."""
+    return int(np.argmin(color_distance(PALETTE_RGB, rgb)))
+
+
+def extract_colors(root: Optional[Element]) -> List[Tuple[int, int, float]]:
+    """Cores explícitas de fill/stroke/stop-color -> [(bucket, rgb empacotado, fração)], mais frequentes primeiro.
+
+    none, currentColor e url(#...) não têm cor fixa e são ignorados.
+    """
+    if root is None:
+        return []
+    counts = Counter()
+    for _, value in iter_paint_values(root):
+        rgb = parse_color(value)
+        if rgb is not None:
+            counts[rgb] += 1
+    total = sum(counts.values())
+    return [(quantize(rgb), pack_rgb(rgb), count / total) for rgb, count in counts.most_common(MAX_COLORS)]
+
+
+def parse_color_query(value: str) -> Optional[str]:
+    """Normaliza ?color=: nome da paleta ("purple") ou hex ("#7c3aed"/"7c3aed"); inválido -> None."""
+    value = (value or '').strip().lower()
+    if value in PALETTE_NAMES:
+        return value
+    match = HEX_QUERY_RE.match(value)
+    if not match:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = ''.join(ch * 2 for ch in digits)
+    return '#' + digits
+
+
+def query_target(value: str) -> Tuple[int, Tuple[int, int, int]]:
+    """(bucket, rgb alvo) de um valor já normalizado por parse_color_query."""
+    if value in PALETTE_NAMES:
+        index = PALETTE_NAMES.index(value)
+        return index, PALETTE[index][1]
+    rgb = parse_color(value)
+    return quantize(rgb), rgb
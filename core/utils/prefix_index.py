@@ -0,0 +1,107 @@
+"""
+Índice de prefixos em memória (array ordenado + bisect) para autocomplete.
+"""
+import heapq
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+# Prefixos curtos casam com muitos termos; o top-N deles é memorizado até a próxima alteração
+MEMO_PREFIX_LENGTH = 2
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos ("Ícone" -> "icone").
+
+    Remove toda a categoria M (igual a /\\p{M}/gu em static/core/instant-search.js);
+    unicodedata.combining deixaria marcas de classe 0, como o "ि" do devanágari.
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.category(ch).startswith('M')).lower().strip()
+
+
+def terms_for(text: str) -> List[str]:
+    """Texto completo normalizado + cada palavra, para casar prefixos no meio do título."""
+    normalized = normalize(text)
+    if not normalized:
+        return []
+    terms = {normalized}
+    terms.update(word for word in normalized.replace('-', ' ').replace('_', ' ').split() if word)
+    return sorted(terms)
+
+
+class PrefixIndex:
+    """Mapeia termos -> referências de sugestões, com ranking por score.
+
+    `_entries` é uma lista ordenada de (termo, ref); a busca por prefixo é um
+    bisect seguido de varredura contígua. Atualizações usam insort/remoção por
+    bisect, adequadas a deltas pequenos entre reconstruções completas.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str]] = []
+        self._suggestions: Dict[str, dict] = {}
+        self._terms: Dict[str, List[str]] = {}
+        self._memo: Dict[Tuple[str, int], List[dict]] = {}
+
+    def __len__(self):
+        return len(self._suggestions)
+
+    def bulk_load(self, items: Iterable[Tuple[str, dict, List[str]]]) -> None:
+        """Carga inicial: (ref, sugestão, termos). Ordena uma única vez."""
+        entries = []
+        for ref, suggestion, terms in items:
+            self._suggestions[ref] = suggestion
+            self._terms[ref] = terms
+            entries.extend((term, ref) for term in terms)
+        entries.sort()
+        self._entries = entries
+        self._memo.clear()
+
+    def upsert(self, ref: str, suggestion: dict, terms: List[str]) -> None:
+        old_terms = self._terms.get(ref, [])
+        if old_terms != terms:
+            self._remove_entries(ref, old_terms)
+            for term in terms:
+                insort(self._entries, (term, ref))
+            self._terms[ref] = terms
+        self._suggestions[ref] = suggestion
+        self._memo.clear()
+
+    def remove(self, ref: str) -> None:
+        if ref not in self._suggestions:
+            return
+        self._remove_entries(ref, self._terms.pop(ref, []))
+        del self._suggestions[ref]
+        self._memo.clear()
+
+    def get(self, ref: str):
+        return self._suggestions.get(ref)
+
+    def _remove_entries(self, ref: str, terms: List[str]) -> None:
+        for term in terms:
+            i = bisect_left(self._entries, (term, ref))
+            if i < len(self._entries) and self._entries[i] == (term, ref):
+                del self._entries[i]
+
+    def search(self, prefix: str, limit: int = 10) -> List[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit)
+        if len(prefix) <= MEMO_PREFIX_LENGTH and memo_key in self._memo:
+            return self._memo[memo_key]
+
+        refs = set()
+        i = bisect_left(self._entries, (prefix,))
+        entries = self._entries
+        while i < len(entries) and entries[i][0].startswith(prefix):
+            refs.add(entries[i][1])
+            i += 1
+        # Leitura sem lock: ignora refs removidas por uma atualização concorrente
+        candidates = [(ref, self._suggestions.get(ref)) for ref in refs]
+        best = heapq.nlargest(limit, (c for c in candidates if c[1] is not None), key=lambda c: (c[1]['score'], c[0]))
+        result = [suggestion for _, suggestion in best]
+        if len(prefix) <= MEMO_PREFIX_LENGTH:
+            self._memo[memo_key] = result
+        return result
@@ -0,0 +1,149 @@
+"""
+Recoloração de SVGs sobre a árvore já parseada (fill/stroke/stop-color em atributos e style inline).
+
+currentColor conta como cor: casa com `*` ou com uma regra `currentColor:...`. O fill implícito
+(preto, quando a raiz não declara fill) recebe a regra do preto ou `*` na própria raiz, e os
+elementos sem fill herdam. Regras CSS em <style> não são reescritas.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from xml.etree import ElementTree as ET
+from xml.etree.ElementTree import Element
+
+from .svg_features import STYLE_DECL_RE, parse_color
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+# Serializa sem prefixos ns0:/ns1:
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+WILDCARD = '*'
+CURRENT_COLOR = 'currentColor'
+MAX_MAPPINGS = 16
+PAINT_PROPERTIES = ('fill', 'stroke', 'stop-color')
+
+Mapping = Tuple[Tuple[str, str], ...]
+
+
+class LRUCache:
+    """LRU limitado por número de entradas, seguro entre threads."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def _hex(value: str) -> Optional[str]:
+    rgb = parse_color(value)
+    return '#%02x%02x%02x' % rgb if rgb else None
+
+
+def parse_mapping(value: str, normalize_current: bool = False) -> Mapping:
+    """"#000:#7c3aed,red:currentColor,*:#111" -> tupla ordenada (chave de cache estável).
+
+    `*` casa qualquer cor sem regra própria (inclusive currentColor e o fill preto implícito);
+    normalize_current equivale a `*:currentColor`.
+    Levanta ValueError para pares inválidos.
+    """
+    pairs = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        source, sep, target = item.partition(':')
+        if not sep:
+            raise ValueError(f'par inválido: {item}')
+        source = source.strip()
+        if source == WILDCARD:
+            pass
+        elif source.lower() == 'currentcolor':
+            source = CURRENT_COLOR
+        else:
+            source = _hex(source)
+        target = CURRENT_COLOR if target.strip().lower() == 'currentcolor' else _hex(target)
+        if not source or not target:
+            raise ValueError(f'cor inválida: {item}')
+        pairs[source] = target
+    if normalize_current:
+        pairs.setdefault(WILDCARD, CURRENT_COLOR)
+    if not pairs:
+        raise ValueError('nenhuma cor informada')
+    if len(pairs) > MAX_MAPPINGS:
+        raise ValueError(f'no máximo {MAX_MAPPINGS} cores')
+    return tuple(sorted(pairs.items()))
+
+
+IMPLICIT_FILL = '#000000'
+
+
+def _replacement(value: str, mapping: dict) -> Optional[str]:
+    lowered = value.strip().lower()
+    if lowered == 'currentcolor':
+        new = mapping.get(CURRENT_COLOR, mapping.get(WILDCARD))
+        return None if new == CURRENT_COLOR else new
+    if lowered in ('none', 'transparent', 'inherit') or lowered.startswith('url('):
+        return None
+    color = _hex(lowered)
+    if color is None:
+        return None
+    return mapping.get(color, mapping.get(WILDCARD))
+
+
+def _declares_fill(element: Element) -> bool:
+    if element.get('fill'):
+        return True
+    return any(match.group(1) == 'fill' for match in STYLE_DECL_RE.finditer(element.get('style') or ''))
+
+
+def recolor_tree(root: Element, mapping: Mapping) -> Element:
+    """Cópia da árvore com as cores trocadas; a árvore original (em cache) não é alterada."""
+    rules = dict(mapping)
+    result = copy.deepcopy(root)
+
+    def replace_decl(match):
+        new = _replacement(match.group(2), rules)
+        return f'{match.group(1)}:{new}' if new else match.group(0)
+
+    for element in result.iter():
+        for prop in PAINT_PROPERTIES:
+            value = element.get(prop)
+            if value:
+                new = _replacement(value, rules)
+                if new:
+                    element.set(prop, new)
+        style = element.get('style')
+        if style:
+            element.set('style', STYLE_DECL_RE.sub(replace_decl, style))
+    if not _declares_fill(result):
+        # Sem fill na raiz o padrão é preto: declara a cor nova ali e os filhos sem fill herdam
+        new = rules.get(IMPLICIT_FILL, rules.get(WILDCARD))
+        if new:
+            result.set('fill', new)
+    return result
+
+
+def serialize(root: Element) -> str:
+    return ET.tostring(root, encoding='unicode')
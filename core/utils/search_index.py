@@ -0,0 +1,145 @@
+"""
+Índice binário compacto para busca instantânea no navegador (static/core/instant-search.js).
+
+Formato (inteiros em varint LEB128, strings UTF-8 prefixadas pelo tamanho):
+
+    magic "AKIX", u8 versão
+    documentos: n, e para cada um (em ordem de ranking):
+        id, título, preço em centavos, flags (bit 0 = tem thumbnail), nº de tags, índices das tags
+    dicionário de tags: n, strings
+    tokens (ordenados): n, e para cada um:
+        prefixo compartilhado com o token anterior, sufixo, nº de postings,
+        posições de documento em delta (crescentes)
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from .prefix_index import normalize
+
+MAGIC = b'AKIX'
+FORMAT_VERSION = 1
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _encode_str(text: str, out: bytearray) -> None:
+    data = text.encode('utf-8')
+    encode_varint(len(data), out)
+    out += data
+
+
+def tokenize(text: str) -> List[str]:
+    normalized = normalize(text)
+    for ch in '-_,./':
+        normalized = normalized.replace(ch, ' ')
+    return [token for token in normalized.split() if token]
+
+
+def build_index(docs: Iterable[dict]) -> bytes:
+    """Serializa documentos {'id','title','price_cents','has_thumbnail','tags'} já na ordem de ranking."""
+    docs = list(docs)
+    tag_ids: Dict[str, int] = {}
+    postings: Dict[str, List[int]] = {}
+
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    encode_varint(len(docs), out)
+    for position, doc in enumerate(docs):
+        encode_varint(doc['id'], out)
+        _encode_str(doc['title'], out)
+        encode_varint(max(int(doc['price_cents']), 0), out)
+        encode_varint(1 if doc['has_thumbnail'] else 0, out)
+        encode_varint(len(doc['tags']), out)
+        for tag in doc['tags']:
+            encode_varint(tag_ids.setdefault(tag, len(tag_ids)), out)
+        for token in set(tokenize(doc['title']) + [t for tag in doc['tags'] for t in tokenize(tag)]):
+            postings.setdefault(token, []).append(position)
+
+    encode_varint(len(tag_ids), out)
+    for tag in tag_ids:  # dict preserva a ordem de inserção = índice
+        _encode_str(tag, out)
+
+    encode_varint(len(postings), out)
+    previous = ''
+    for token in sorted(postings):
+        shared = 0
+        limit = min(len(previous), len(token))
+        while shared < limit and previous[shared] == token[shared]:
+            shared += 1
+        encode_varint(shared, out)
+        _encode_str(token[shared:], out)
+        positions = postings[token]
+        encode_varint(len(positions), out)
+        last = 0
+        for position in positions:
+            encode_varint(position - last, out)
+            last = position
+        previous = token
+    return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def string(self) -> str:
+        length = self.varint()
+        text = self.data[self.pos:self.pos + length].decode('utf-8')
+        self.pos += length
+        return text
+
+
+def decode_index(data: bytes) -> Tuple[List[dict], List[str], Dict[str, List[int]]]:
+    """Decodificador de referência (mesma lógica do instant-search.js); usado em testes e benchmark."""
+    if data[:4] != MAGIC or data[4] != FORMAT_VERSION:
+        raise ValueError('índice de busca inválido')
+    reader = _Reader(data)
+    reader.pos = 5
+    docs = []
+    for _ in range(reader.varint()):
+        doc = {'id': reader.varint(), 'title': reader.string(), 'price_cents': reader.varint(), 'has_thumbnail': bool(reader.varint() & 1)}
+        doc['tag_ids'] = [reader.varint() for _ in range(reader.varint())]
+        docs.append(doc)
+    tags = [reader.string() for _ in range(reader.varint())]
+    postings: Dict[str, List[int]] = {}
+    previous = ''
+    for _ in range(reader.varint()):
+        token = previous[:reader.varint()] + reader.string()
+        positions, last = [], 0
+        for _ in range(reader.varint()):
+            last += reader.varint()
+            positions.append(last)
+        postings[token] = positions
+        previous = token
+    return docs, tags, postings
+
+
+def search(postings: Dict[str, List[int]], sorted_tokens: List[str], query: str, limit: int = 24) -> List[int]:
+    """Cada termo casa por prefixo; resultados são a interseção, na ordem de ranking."""
+    result = None
+    for term in tokenize(query):
+        matched = set()
+        i = bisect_left(sorted_tokens, term)
+        while i < len(sorted_tokens) and sorted_tokens[i].startswith(term):
+            matched.update(postings[sorted_tokens[i]])
+            i += 1
+        result = matched if result is None else result & matched
+        if not result:
+            return []
+    return sorted(result)[:limit] if result else []
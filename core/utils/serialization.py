@@ -0,0 +1,75 @@
+"""
+Serialização rápida para as APIs JSON: projeções via values() e resposta com orjson.
+
+orjson é opcional; sem ele caímos no json da stdlib com o DjangoJSONEncoder.
+"""
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Window
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+TOTAL_ANNOTATION = '_total_count'
+
+
+def _default(value):
+    # Decimal vira string ("10.00"), como no DecimalField do DRF
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+
+
+class FastJsonResponse(HttpResponse):
+    """Equivalente ao JsonResponse, com orjson e suporte a Decimal/datetime."""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def parse_page(params, default_size: int = None, max_size: int = None):
+    """Lê page/page_size da query string, com limites. Retorna (page, page_size)."""
+    default_size = default_size or getattr(settings, 'API_PAGE_SIZE', 100)
+    max_size = max_size or getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+    try:
+        page = max(int(params.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        page_size = min(max(int(params.get('page_size', default_size)), 1), max_size)
+    except (TypeError, ValueError):
+        page_size = default_size
+    return page, page_size
+
+
+def paginate_values(queryset, fields, expressions=None, page: int = 1, page_size: int = 100):
+    """Página de dicts via values() com o total vindo de COUNT(*) OVER () na mesma query.
+
+    Retorna (rows, total). Só uma página vazia (fora do intervalo) precisa de um COUNT extra.
+    """
+    expressions = dict(expressions or {})
+    expressions[TOTAL_ANNOTATION] = Window(expression=Count('*'))
+    start = (page - 1) * page_size
+    rows = list(queryset.values(*fields, **expressions)[start:start + page_size])
+    if rows:
+        total = rows[0][TOTAL_ANNOTATION]
+        for row in rows:
+            del row[TOTAL_ANNOTATION]
+    else:
+        total = queryset.count() if page > 1 else 0
+    return rows, total
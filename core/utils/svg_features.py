@@ -0,0 +1,180 @@
+"""
+Extração de características de SVGs (parse único, sem dependências de ORM).
+"""
+import hashlib
+import math
+import re
+from typing import Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import Element
+
+from defusedxml import ElementTree as SafeET
+
+ELEMENT_TYPES = [
+    'path', 'circle', 'rect', 'ellipse', 'line', 'polyline',
+    'polygon', 'g', 'text', 'use', 'lineargradient', 'radialgradient',
+]
+PATH_COMMANDS = 'MLHVCSQTAZ'
+TAG_BUCKETS = 64
+COLOR_LEVELS = 3  # 3 níveis por canal -> 27 bins
+COLOR_BUCKETS = COLOR_LEVELS ** 3 + 2  # + none + currentColor
+
+# Peso de cada grupo no vetor final (cada grupo é normalizado antes)
+GROUP_WEIGHTS = {'tags': 1.0, 'elements': 0.6, 'commands': 0.6, 'colors': 0.4}
+
+PATH_COMMAND_RE = re.compile(r'[MLHVCSQTAZmlhvcsqtaz]')
+HEX_COLOR_RE = re.compile(r'^#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$')
+RGB_COLOR_RE = re.compile(r'^rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)')
+STYLE_DECL_RE = re.compile(r'(fill|stroke|stop-color)\s*:\s*([^;]+)')
+
+NAMED_COLORS = {
+    'black': (0, 0, 0), 'white': (255, 255, 255), 'red': (255, 0, 0),
+    'green': (0, 128, 0), 'blue': (0, 0, 255), 'yellow': (255, 255, 0),
+    'orange': (255, 165, 0), 'purple': (128, 0, 128), 'gray': (128, 128, 128),
+    'grey': (128, 128, 128), 'pink': (255, 192, 203), 'brown': (165, 42, 42),
+    'cyan': (0, 255, 255), 'magenta': (255, 0, 255), 'lime': (0, 255, 0),
+    'navy': (0, 0, 128), 'teal': (0, 128, 128), 'silver': (192, 192, 192),
+}
+
+FEATURE_DIM = TAG_BUCKETS + len(ELEMENT_TYPES) + len(PATH_COMMANDS) + 2 + COLOR_BUCKETS
+
+
+def parse_svg(content: str) -> Optional[Element]:
+    """Faz o parse seguro (defusedxml) do markup; retorna None se inválido."""
+    if not content:
+        return None
+    try:
+        return SafeET.fromstring(content.encode('utf-8'))
+    except Exception:
+        return None
+
+
+def local_name(tag) -> str:
+    if not isinstance(tag, str):
+        return ''
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def parse_color(value: str) -> Optional[Tuple[int, int, int]]:
+    """Converte #rgb, #rrggbb, rgb() ou nomes básicos em tupla RGB."""
+    if not value:
+        return None
+    value = value.strip().lower()
+    match = HEX_COLOR_RE.match(value)
+    if match:
+        digits = match.group(1)
+        if len(digits) == 3:
+            digits = ''.join(ch * 2 for ch in digits)
+        return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16)
+    match = RGB_COLOR_RE.match(value)
+    if match:
+        return tuple(min(int(channel), 255) for channel in match.groups())
+    return NAMED_COLORS.get(value)
+
+
+def iter_paint_values(root: Element) -> Iterator[Tuple[str, str]]:
+    """Percorre (propriedade, valor) de fill/stroke/stop-color em atributos e style inline."""
+    for element in root.iter():
+        for prop in ('fill', 'stroke', 'stop-color'):
+            value = element.get(prop)
+            if value:
+                yield prop, value.strip()
+        style = element.get('style')
+        if style:
+            for prop, value in STYLE_DECL_RE.findall(style):
+                yield prop, value.strip()
+
+
+def count_path_commands(root: Element) -> List[int]:
+    counts = [0] * len(PATH_COMMANDS)
+    for element in root.iter():
+        if local_name(element.tag) != 'path':
+            continue
+        for command in PATH_COMMAND_RE.findall(element.get('d', '')):
+            counts[PATH_COMMANDS.index(command.upper())] += 1
+    return counts
+
+
+def _tag_bucket(tag: str) -> int:
+    digest = hashlib.md5(tag.encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'little') % TAG_BUCKETS
+
+
+def _color_bucket(value: str) -> Optional[int]:
+    lowered = value.lower()
+    if lowered == 'none':
+        return COLOR_BUCKETS - 2
+    if lowered == 'currentcolor':
+        return COLOR_BUCKETS - 1
+    rgb = parse_color(lowered)
+    if rgb is None:
+        return None
+    r, g, b = (min(channel * COLOR_LEVELS // 256, COLOR_LEVELS - 1) for channel in rgb)
+    return (r * COLOR_LEVELS + g) * COLOR_LEVELS + b
+
+
+def _normalized(values: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in values))
+    if not norm:
+        return values
+    return [v / norm for v in values]
+
+
+def split_tags(tags: str) -> List[str]:
+    return [t.strip().lower() for t in (tags or '').split(',') if t.strip()]
+
+
+def _viewbox_aspect(root: Element) -> float:
+    parts = (root.get('viewBox') or '').replace(',', ' ').split()
+    try:
+        width, height = float(parts[2]), float(parts[3])
+    except (IndexError, ValueError):
+        return 1.0
+    if width <= 0 or height <= 0:
+        return 1.0
+    return width / height
+
+
+def build_feature_vector(content: str, tags: str) -> List[float]:
+    """Vetor de dimensão fixa FEATURE_DIM: tags (hashing), elementos, comandos de path e cores.
+
+    Tags usam hashing trick para que a dimensão não dependa do vocabulário,
+    permitindo recomputação incremental sem reprocessar o catálogo inteiro.
+    """
+    tag_values = [0.0] * TAG_BUCKETS
+    for tag in split_tags(tags):
+        tag_values[_tag_bucket(tag)] = 1.0
+
+    element_values = [0.0] * len(ELEMENT_TYPES)
+    command_values = [0.0] * (len(PATH_COMMANDS) + 2)
+    color_values = [0.0] * COLOR_BUCKETS
+
+    root = parse_svg(content)
+    if root is not None:
+        for element in root.iter():
+            name = local_name(element.tag)
+            if name in ELEMENT_TYPES:
+                element_values[ELEMENT_TYPES.index(name)] += 1
+        element_values = [math.log1p(v) for v in element_values]
+
+        commands = count_path_commands(root)
+        total_commands = sum(commands)
+        if total_commands:
+            command_values[:len(PATH_COMMANDS)] = [c / total_commands for c in commands]
+        command_values[-2] = math.log1p(total_commands) / 10
+        command_values[-1] = math.log(_viewbox_aspect(root))
+
+        for _, value in iter_paint_values(root):
+            bucket = _color_bucket(value)
+            if bucket is not None:
+                color_values[bucket] += 1
+
+    vector = []
+    for name, values in (('tags', tag_values), ('elements', element_values), ('commands', command_values), ('colors', color_values)):
+        vector.extend(v * GROUP_WEIGHTS[name] for v in _normalized(values))
+    return vector
+
+
+def feature_signature(content: str, tags: str) -> str:
+    """Assinatura usada para detectar SVGs cujo vetor precisa ser recalculado."""
+    base = f"{FEATURE_DIM}|{tags or ''}|{content or ''}"
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
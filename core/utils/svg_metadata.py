@@ -0,0 +1,138 @@
+"""
+Metadados de um SVG extraídos na ingestão (viewBox, dimensões, contagens, estilo de pintura).
+
+Puro Python, sem ORM: pode rodar em processos de trabalho no backfill.
+"""
+import hashlib
+import re
+from typing import List, Optional, Tuple
+from xml.etree.ElementTree import Element
+
+from .palette import extract_colors
+from .svg_features import PATH_COMMAND_RE, STYLE_DECL_RE, local_name, parse_svg
+
+# Incrementar quando a extração mudar; o backfill reprocessa linhas com versão menor
+# (2: paleta de cores em SvgColor; 3: content_hash; 4: Lab em SvgColor)
+METADATA_VERSION = 4
+
+SHAPE_ELEMENTS = {'path', 'circle', 'rect', 'ellipse', 'line', 'polyline', 'polygon'}
+# Elementos sem área: só o contorno conta, independente do fill
+OPEN_ELEMENTS = {'line', 'polyline'}
+NON_RENDERED = {'defs', 'clippath', 'mask', 'symbol', 'lineargradient', 'radialgradient', 'pattern', 'title', 'desc', 'metadata', 'style'}
+
+METADATA_FIELDS = [
+    'viewbox', 'width', 'height', 'element_count', 'path_count',
+    'path_command_count', 'paint_style', 'byte_size', 'content_hash', 'metadata_version',
+]
+
+PAINT_OUTLINE = 'outline'
+PAINT_FILL = 'fill'
+PAINT_MIXED = 'mixed'
+
+LENGTH_RE = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*(px)?\s*$')
+
+
+def parse_viewbox(value: str) -> Optional[Tuple[float, float, float, float]]:
+    parts = (value or '').replace(',', ' ').split()
+    if len(parts) != 4:
+        return None
+    try:
+        box = tuple(float(part) for part in parts)
+    except ValueError:
+        return None
+    return box if box[2] > 0 and box[3] > 0 else None
+
+
+def parse_length(value: str) -> Optional[float]:
+    """Comprimento em unidades de usuário; unidades relativas (%, em) retornam None."""
+    match = LENGTH_RE.match(value or '')
+    return float(match.group(1)) if match else None
+
+
+def _paint(element: Element, prop: str, inherited: str) -> str:
+    value = element.get(prop)
+    style = element.get('style')
+    if style:
+        for name, declared in STYLE_DECL_RE.findall(style):
+            if name == prop:
+                value = declared
+    if value is None or value.strip().lower() == 'inherit':
+        return inherited
+    return value.strip().lower()
+
+
+def _classify(element: Element, fill: str, stroke: str, counts: dict) -> None:
+    name = local_name(element.tag)
+    if name in NON_RENDERED:
+        return
+    fill = _paint(element, 'fill', fill)
+    stroke = _paint(element, 'stroke', stroke)
+    if name in SHAPE_ELEMENTS:
+        filled = fill not in ('none', 'transparent') and name not in OPEN_ELEMENTS
+        stroked = stroke not in ('none', 'transparent')
+        if filled:
+            counts['fill'] += 1
+        if stroked:
+            counts['stroke'] += 1
+    for child in element:
+        _classify(child, fill, stroke, counts)
+
+
+def paint_style(root: Element) -> str:
+    """'outline' (só contorno), 'fill' (só preenchimento), 'mixed' ou '' sem formas."""
+    # Padrões do SVG: fill preto, stroke none
+    counts = {'fill': 0, 'stroke': 0}
+    _classify(root, 'black', 'none', counts)
+    if counts['stroke'] and not counts['fill']:
+        return PAINT_OUTLINE
+    if counts['fill'] and not counts['stroke']:
+        return PAINT_FILL
+    if counts['fill'] and counts['stroke']:
+        return PAINT_MIXED
+    return ''
+
+
+def analyze_content(content: str) -> Tuple[dict, List[Tuple[int, int, float]]]:
+    """(metadados para as colunas de SvgFile, cores da paleta) com um único parse.
+
+    Conteúdo inválido gera contagens zeradas e nenhuma cor.
+    """
+    metadata = {
+        'viewbox': '',
+        'width': None,
+        'height': None,
+        'element_count': 0,
+        'path_count': 0,
+        'path_command_count': 0,
+        'paint_style': '',
+        'byte_size': len((content or '').encode('utf-8')),
+        'content_hash': hashlib.sha256((content or '').encode('utf-8')).hexdigest(),
+        'metadata_version': METADATA_VERSION,
+    }
+    root = parse_svg(content)
+    if root is None:
+        return metadata, []
+
+    box = parse_viewbox(root.get('viewBox'))
+    if box:
+        metadata['viewbox'] = ' '.join(f'{v:g}' for v in box)
+    # Dimensão declarada; sem ela (ou em %/em), a do viewBox
+    metadata['width'] = parse_length(root.get('width')) or (box[2] if box else None)
+    metadata['height'] = parse_length(root.get('height')) or (box[3] if box else None)
+
+    for element in root.iter():
+        metadata['element_count'] += 1
+        if local_name(element.tag) == 'path':
+            metadata['path_count'] += 1
+            metadata['path_command_count'] += len(PATH_COMMAND_RE.findall(element.get('d', '')))
+    metadata['paint_style'] = paint_style(root)
+    return metadata, extract_colors(root)
+
+
+def analyze_svg(content: str) -> dict:
+    return analyze_content(content)[0]
+
+
+def analyze_batch(batch: List[Tuple[int, str]]) -> List[Tuple[int, dict, list]]:
+    """Lote (pk, conteúdo) -> (pk, metadados, cores); alvo dos processos de trabalho do backfill."""
+    return [(pk, *analyze_content(content)) for pk, content in batch]
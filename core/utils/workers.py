@@ -0,0 +1,27 @@
+"""
+Lotes em um pool de processos com janela limitada (backfills, geração de artefatos).
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+
+def map_batches(func: Callable, batches: Iterable, workers: int = 1) -> Iterator:
+    """Aplica `func` a cada lote e devolve os resultados na ordem dos lotes.
+
+    workers=1 roda inline. Com mais processos, no máximo 2 lotes por processo
+    ficam em voo (executor.map submeteria tudo de uma vez). `func` deve ser
+    importável sem o Django configurado (alvo dos processos de trabalho).
+    """
+    if workers <= 1:
+        for batch in batches:
+            yield func(batch)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(executor.submit(func, batch))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -2,19 +2,32 @@ from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_vary_headers
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.core.paginator import Paginator
 import json
 from django.core.exceptions import RequestDataTooBig
 from usuario.views.views_usuario import admin_required
+from guardian.ratelimit import rate_limited
 from ..services import *
+from ..services.catalog import apply_filters, apply_sort, parse_filters
+from ..services.facets import compute_facets, tag_vocabulary
+from ..services.popularity import record_event, record_impressions
+from ..services.snapshot import snapshot_url
 
-from ..models import SvgFile
+from ..models import SvgFile, SvgNeighbor
+from ..utils.palette import PALETTE_HEX
+from ..utils.serialization import FastJsonResponse, paginate_values, parse_page
 
 def home(request):
     """
     Home page with introduction to AkkaUi.
     """
-    svgfiles = SvgFile.objects.filter(is_public=True).order_by("-uploaded_at")
+    # Só os mais recentes: o catálogo completo fica no explore ("See more")
+    limit = getattr(settings, 'HOME_LATEST_LIMIT', 12)
+    svgfiles = list(SvgFile.objects.filter(is_public=True).order_by("-uploaded_at")[:limit])
+    record_impressions(svg.pk for svg in svgfiles)
     
     # Adicionar informação de acesso para cada SVG
     if request.user.is_authenticated:
@@ -29,38 +42,26 @@ def explore(request):
     """
     Explore page showing all SVG files from database with search and filters.
     """
-    svgfiles = SvgFile.objects.filter(is_public=True)
+    # Busca, tag, preço, "meus" e "novos" (ver catalog.parse_filters)
+    filters = parse_filters(request.GET)
+    svgfiles = apply_filters(filters, request.user)
     
-    # Pesquisa por título
-    search_query = request.GET.get('q', '').strip()
-    if search_query:
-        svgfiles = svgfiles.filter(title_name__icontains=search_query)
-    
-    # Filtro por tags
-    tag = request.GET.get('tag', '').strip()
-    if tag:
-        svgfiles = svgfiles.filter(tags__icontains=tag)
-    
-    # Ordenação
+    # Ordenação (inclui popular/trending)
     sort_by = request.GET.get('sort', '-uploaded_at')
-    valid_sorts = ['-uploaded_at', 'uploaded_at', 'title_name', '-title_name']
-    if sort_by in valid_sorts:
-        svgfiles = svgfiles.order_by(sort_by)
-    else:
-        svgfiles = svgfiles.order_by('-uploaded_at')
+    svgfiles = apply_sort(svgfiles, sort_by, filters)
     
-    # Obter tags únicas para os filtros
-    all_tags_raw = SvgFile.objects.filter(is_public=True).exclude(tags='').values_list('tags', flat=True)
-    
-    # Processar tags (separadas por vírgula)
-    all_tags = set()
-    for tags_str in all_tags_raw:
-        if tags_str:
-            for t in tags_str.split(','):
-                tag_clean = t.strip()
-                if tag_clean:
-                    all_tags.add(tag_clean)
-    all_tags = sorted(all_tags)
+    # Contagens de todas as facetas em um único aggregate (em cache por assinatura dos filtros)
+    facets = compute_facets(filters, request.user)
+    tag_counts = {item['value']: item['count'] for item in facets['tags']}
+    all_tags = sorted(tag for tag, _ in tag_vocabulary())
+
+    # Impressões contam só os cards renderizados nesta página
+    paginator = Paginator(svgfiles, getattr(settings, 'EXPLORE_PAGE_SIZE', 48))
+    page_obj = paginator.get_page(request.GET.get('page'))
+    svgfiles = list(page_obj.object_list)
+    record_impressions(svg.pk for svg in svgfiles)
+    page_query = request.GET.copy()
+    page_query.pop('page', None)
     
     # Adicionar informação de acesso para cada SVG
     if request.user.is_authenticated:
@@ -71,13 +72,27 @@ def explore(request):
     
     context = {
         'svgfiles': svgfiles,
-        'search_query': search_query,
-        'selected_tag': tag,
+        'page_obj': page_obj,
+        'page_query': page_query.urlencode(),
+        'search_query': filters['q'],
+        'selected_tag': filters['tag'],
         'selected_sort': sort_by,
         'all_tags': all_tags,
+        'tag_options': [(tag, tag_counts.get(tag)) for tag in all_tags],
+        'filters': filters,
+        'facets': facets,
+        'catalog_manifest_url': snapshot_url(),
+        'palette': PALETTE_HEX,
     }
     
-    return render(request, "core/explore.html", context)
+    # htmx: só o grid + facetas fora de banda (sem base.html); restauração de histórico pede a página inteira
+    if request.headers.get('HX-Request') and not request.headers.get('HX-History-Restore-Request'):
+        context['oob'] = True
+        response = render(request, "core/partials/explore_results.html", context)
+    else:
+        response = render(request, "core/explore.html", context)
+    patch_vary_headers(response, ('HX-Request',))
+    return response
 
 def pricing(request):
     """
@@ -91,6 +106,7 @@ def faq(request):
     """
     return render(request, "core/faq.html")
 
+@rate_limited('copy')
 def copy_svg(request):
     """
     GET ?id=<pk>
@@ -106,8 +122,111 @@ def copy_svg(request):
     svg = get_object_or_404(SvgFile, pk=pk)
     # Usamos o helper do modelo para obter conteúdo sanitizado
     content = svg.get_sanitized_content()
+    record_event(svg.pk, 'copy')
     return JsonResponse({"svg_text": content})
 
+
+@rate_limited('copy')
+def recolor_svg(request):
+    """
+    GET ?id=<pk>&map=<de:para,...>[&current=1]
+    Retorna JSON {"svg_text": "..."} com as cores trocadas (ex.: map=*:#7c3aed ou current=1 para currentColor).
+    Segue user_access_type: SVGs pagos exigem compra ou VIP.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        svg_id = int(request.GET.get("id", ""))
+    except ValueError:
+        return HttpResponseBadRequest(json.dumps({"error": "id must be an integer"}), content_type="application/json")
+
+    from ..services.recolor import recolor_svg as recolor
+    from ..utils.recolor import parse_mapping
+    try:
+        mapping = parse_mapping(request.GET.get("map", ""), request.GET.get("current", "").lower() in ("1", "true"))
+    except ValueError as exc:
+        return HttpResponseBadRequest(json.dumps({"error": str(exc)}), content_type="application/json")
+
+    svg = get_object_or_404(SvgFile, pk=svg_id)
+    if not svg.is_public and svg.owner_id != request.user.pk and not request.user.is_staff:
+        return JsonResponse({"error": "not found"}, status=404)
+    if svg.user_access_type(request.user) == 'locked':
+        return JsonResponse({"error": "purchase required"}, status=403)
+    try:
+        markup = recolor(svg, mapping)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=422)
+    return JsonResponse({"svg_text": markup})
+
+
+@require_POST
+def track_svg_event(request):
+    """
+    POST id=<pk>&event=view
+    Registra abertura de modal (enviado via navigator.sendBeacon). Contagem em lote, sem escrita imediata.
+    """
+    event = request.POST.get("event", "view")
+    # impressões e cópias são contadas no servidor; o cliente só reporta eventos de UI
+    if event != "view":
+        return HttpResponseBadRequest(json.dumps({"error": "invalid event"}), content_type="application/json")
+    try:
+        svg_id = int(request.POST.get("id", ""))
+    except ValueError:
+        return HttpResponseBadRequest(json.dumps({"error": "id must be an integer"}), content_type="application/json")
+    if not SvgFile.objects.filter(pk=svg_id).exists():
+        return JsonResponse({"error": "not found"}, status=404)
+    record_event(svg_id, event)
+    return JsonResponse({"success": True}, status=202)
+
+def autocomplete(request):
+    """
+    GET ?q=<prefixo>&limit=<n>
+    Sugestões de títulos e tags servidas do índice de prefixos em memória (sem query por tecla).
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    query = request.GET.get("q", "").strip()
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 8)), 20))
+    except ValueError:
+        limit = 8
+    from ..services.autocomplete import suggest
+    return JsonResponse({"query": query, "results": suggest(query, limit) if query else []})
+
+
+def similar_svgs(request):
+    """
+    GET ?id=<pk>
+    Retorna os vizinhos pré-computados por `build_similar_svgs` (uma leitura indexada em SvgNeighbor).
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        svg_id = int(request.GET.get("id", ""))
+    except ValueError:
+        return HttpResponseBadRequest(json.dumps({"error": "id must be an integer"}), content_type="application/json")
+
+    from ..templatetags.akka_filters import base64_encode
+    neighbors = (
+        SvgNeighbor.objects.filter(svg_id=svg_id, neighbor__is_public=True)
+        .select_related('neighbor')
+        .order_by('rank')
+    )
+    results = []
+    for row in neighbors:
+        svg = row.neighbor
+        thumbnail_url = svg.get_thumbnail_url()
+        results.append({
+            "id": svg.pk,
+            "title_name": svg.title_name,
+            "price": float(svg.price or 0),
+            "score": round(row.score, 4),
+            "thumbnail_url": thumbnail_url,
+            "preview": None if thumbnail_url else "data:image/svg+xml;base64," + base64_encode(svg.get_sanitized_content()),
+        })
+    return JsonResponse({"id": svg_id, "results": results})
+
+
 @csrf_exempt  # remova se quiser exigir CSRF
 @require_POST
 def paste_svg(request):
@@ -277,7 +396,14 @@ def admin_create_svg(request):
         price=price_decimal,
     )
 
-    return JsonResponse({"id": svg_file.pk, "title_name": svg_file.title_name, "success": True})
+    # Aviso (não bloqueante) de quase-duplicatas via índice LSH
+    from ..services.duplicates import find_near_duplicates
+    from ..utils.fingerprint import to_unsigned
+    near_duplicates = []
+    if svg_file.shape_hash is not None:
+        near_duplicates = find_near_duplicates(fingerprint=to_unsigned(svg_file.shape_hash), exclude_pk=svg_file.pk)
+
+    return JsonResponse({"id": svg_file.pk, "title_name": svg_file.title_name, "success": True, "near_duplicates": near_duplicates})
 
 
 @admin_required
@@ -358,42 +484,35 @@ def admin_update_svg(request):
     return JsonResponse({"id": svg_file.pk, "title_name": svg_file.title_name, "success": True})
 
 
+SEARCH_FIELDS = ('id', 'title_name', 'uploaded_at')
+
+
 def search_svg(request):
     """
     API endpoint for searching SVG files.
-    Supports query parameters: q (search), tag, sort
+    Supports query parameters: q (search), tag, color (palette name or hex), sort
     Returns JSON with matching SVG files.
     """
     if request.method != "GET":
         return HttpResponseNotAllowed(["GET"])
     
-    svgfiles = SvgFile.objects.filter(is_public=True)
-    
-    # Pesquisa por título
-    search_query = request.GET.get('q', '').strip()
-    if search_query:
-        svgfiles = svgfiles.filter(title_name__icontains=search_query)
+    filters = parse_filters(request.GET)
+    svgfiles = apply_filters(filters, request.user)
     
-    # Filtro por tags
-    tag = request.GET.get('tag', '').strip()
-    if tag:
-        svgfiles = svgfiles.filter(tags__icontains=tag)
-    
-    # Ordenação
+    # Ordenação (inclui popular/trending)
     sort_by = request.GET.get('sort', '-uploaded_at')
-    valid_sorts = ['-uploaded_at', 'uploaded_at', 'title_name', '-title_name']
-    if sort_by in valid_sorts:
-        svgfiles = svgfiles.order_by(sort_by)
-    else:
-        svgfiles = svgfiles.order_by('-uploaded_at')
+    svgfiles = apply_sort(svgfiles, sort_by, filters)
     
-    # Serializar dados
-    from ..serializers import SvgFileSerializer
-    serializer = SvgFileSerializer(svgfiles, many=True)
+    # Projeção via values() com o total na mesma query (COUNT(*) OVER ())
+    page, page_size = parse_page(request.GET)
+    results, total = paginate_values(svgfiles, SEARCH_FIELDS, page=page, page_size=page_size)
     
-    return JsonResponse({
-        'count': svgfiles.count(),
-        'results': serializer.data
+    return FastJsonResponse({
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'results': results,
+        'facets': compute_facets(filters, request.user),
     })
 
 
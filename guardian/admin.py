@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FileAsset
+from .models import FileAsset, MediaAccessDaily, MediaAccessEvent
 
 
 @admin.register(FileAsset)
@@ -8,3 +8,29 @@ class FileAssetAdmin(admin.ModelAdmin):
     list_filter = ('uploaded_at', 'owner')
     search_fields = ('name', 'file_path', 'owner__username')
     readonly_fields = ('uploaded_at',)
+
+
+@admin.register(MediaAccessDaily)
+class MediaAccessDailyAdmin(admin.ModelAdmin):
+    list_display = ('day', 'kind', 'svg', 'file_asset', 'hits', 'unique_users')
+    list_filter = ('kind', 'day')
+    search_fields = ('svg__title_name', 'file_asset__name')
+    date_hierarchy = 'day'
+    ordering = ('-day', '-hits')
+    list_select_related = ('svg', 'file_asset')
+
+
+@admin.register(MediaAccessEvent)
+class MediaAccessEventAdmin(admin.ModelAdmin):
+    list_display = ('occurred_at', 'kind', 'user', 'svg', 'file_asset', 'status', 'ip')
+    list_filter = ('kind', 'status')
+    search_fields = ('user__username', 'ip')
+    date_hierarchy = 'occurred_at'
+    ordering = ('-occurred_at',)
+    list_select_related = ('user', 'svg', 'file_asset')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,89 @@
+"""
+Log de acesso à mídia protegida, gravado em lote (write-behind) para não somar um INSERT
+a cada thumbnail servida. Eventos ficam MEDIA_ACCESS_RETENTION_DAYS dias em MediaAccessEvent
+e são consolidados por dia em MediaAccessDaily (`manage.py rollup_media_access`).
+"""
+import datetime
+import logging
+from typing import List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.utils.buffering import WriteBehindBuffer
+
+from .models import MediaAccessDaily, MediaAccessEvent
+from .utils import client_ip
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK_SIZE = 5000
+
+
+def _flush_events(events: List[dict]) -> None:
+    MediaAccessEvent.objects.bulk_create([MediaAccessEvent(**event) for event in events], batch_size=1000)
+
+
+_buffer = WriteBehindBuffer(
+    _flush_events,
+    max_items=getattr(settings, 'MEDIA_ACCESS_FLUSH_MAX_EVENTS', 500),
+    flush_interval=getattr(settings, 'MEDIA_ACCESS_FLUSH_INTERVAL', 30.0),
+    background=getattr(settings, 'WRITE_BEHIND_BACKGROUND', True),
+)
+
+
+def record_access(request, response, kind: str, svg_id=None, file_asset_id=None, user_id=None):
+    """Enfileira o acesso (só respostas servidas: 200/206/304). Retorna a própria resposta."""
+    if not getattr(settings, 'MEDIA_ACCESS_LOG_ENABLED', True) or response.status_code not in (200, 206, 304):
+        return response
+    if user_id is None and request.user.is_authenticated:
+        user_id = request.user.pk
+    _buffer.add({
+        'occurred_at': timezone.now(),
+        'kind': kind,
+        'user_id': user_id,
+        'svg_id': svg_id,
+        'file_asset_id': file_asset_id,
+        'status': response.status_code,
+        'ip': client_ip(request),
+        'user_agent': request.META.get('HTTP_USER_AGENT', '')[:200],
+    })
+    return response
+
+
+def flush_access_log() -> int:
+    """Força o descarregamento do buffer deste processo. Retorna o número de eventos."""
+    return _buffer.flush()
+
+
+def rollup_day(day: datetime.date) -> int:
+    """(Re)calcula MediaAccessDaily de um dia a partir dos eventos brutos; idempotente."""
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    rows = (
+        MediaAccessEvent.objects.filter(occurred_at__gte=start, occurred_at__lt=start + datetime.timedelta(days=1))
+        .values('kind', 'svg_id', 'file_asset_id')
+        .annotate(hits=Count('id'), unique_users=Count('user_id', distinct=True))
+        .order_by()
+    )
+    daily = [MediaAccessDaily(day=day, **row) for row in rows]
+    with transaction.atomic():
+        MediaAccessDaily.objects.filter(day=day).delete()
+        MediaAccessDaily.objects.bulk_create(daily, batch_size=1000)
+    return len(daily)
+
+
+def prune_events(retention_days: int = None) -> int:
+    """Apaga eventos brutos além da retenção, em blocos (sem travar a tabela inteira)."""
+    retention_days = retention_days if retention_days is not None else getattr(settings, 'MEDIA_ACCESS_RETENTION_DAYS', 30)
+    cutoff = timezone.now() - datetime.timedelta(days=retention_days)
+    removed = 0
+    while True:
+        ids = list(MediaAccessEvent.objects.filter(occurred_at__lt=cutoff).values_list('id', flat=True)[:DELETE_CHUNK_SIZE])
+        if not ids:
+            break
+        removed += MediaAccessEvent.objects.filter(id__in=ids).delete()[0]
+    if removed:
+        logger.info("Log de acesso: %s eventos anteriores a %s removidos", removed, cutoff.date())
+    return removed
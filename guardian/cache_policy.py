@@ -0,0 +1,137 @@
+"""
+Política de cache por classe de arquivo servido pelo guardian.
+
+Cada classe define o Cache-Control (navegador), o X-Accel-Expires (proxy_cache do Nginx
+sobre a resposta do Django) e o X-Accel-Buffering. O comando `nginx_cache_snippet` gera o
+trecho correspondente do nginx_protected_media.conf a partir de POLICIES.
+"""
+import mimetypes
+from typing import Optional
+
+# Tipos que o mimetypes do sistema nem sempre conhece
+mimetypes.add_type('image/svg+xml', '.svg')
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('font/woff2', '.woff2')
+
+POLICIES = {
+    # Igual para todos: navegador e cache compartilhado guardam por um dia
+    'public_thumbnail': {
+        'cache_control': 'public, max-age=86400, stale-while-revalidate=604800',
+        'accel_expires': 86400,
+        'buffering': 'yes',
+    },
+    # Depende do acesso do usuário (SVG privado ou compra): só o navegador guarda
+    'paid_thumbnail': {
+        'cache_control': 'private, max-age=3600',
+        'accel_expires': 0,
+        'buffering': 'yes',
+    },
+    # PNG exportado (plano pago): o navegador guarda um dia, o proxy nunca
+    'private_export': {
+        'cache_control': 'private, max-age=86400',
+        'accel_expires': 0,
+        'buffering': 'yes',
+    },
+    # Download do dono: revalida sempre (ETag) e sai sem buffer em disco no Nginx
+    'private_download': {
+        'cache_control': 'private, no-cache',
+        'accel_expires': 0,
+        'buffering': 'no',
+    },
+}
+
+CACHEABLE_STATUS = (200, 206, 304)
+
+
+def thumbnail_class(svg) -> str:
+    return 'public_thumbnail' if svg.is_public else 'paid_thumbnail'
+
+
+def content_type_for(name: str) -> str:
+    content_type, _ = mimetypes.guess_type(name)
+    return content_type or 'application/octet-stream'
+
+
+def apply_policy(response, asset_class: str, name: Optional[str] = None):
+    """Aplica os cabeçalhos da classe; o Content-Type vazio ou ausente é deduzido de `name`."""
+    if response.status_code not in CACHEABLE_STATUS:
+        # Erros e redirects para URLs pré-assinadas (curtas) não são cacheados
+        return response
+    policy = POLICIES[asset_class]
+    response['Cache-Control'] = policy['cache_control']
+    response['X-Accel-Expires'] = str(policy['accel_expires'])
+    response['X-Accel-Buffering'] = policy['buffering']
+    if policy['cache_control'].startswith('private'):
+        response['Vary'] = 'Cookie'
+    if name and response.status_code != 304 and not response.get('Content-Type'):
+        response['Content-Type'] = content_type_for(name)
+    return response
+
+
+SNIPPET_BEGIN = '# >>> guardian: política de cache (gerado por `manage.py nginx_cache_snippet`, não edite à mão)'
+SNIPPET_END = '# <<< guardian: política de cache'
+
+
+def nginx_snippet(upstream: str = 'http://127.0.0.1:8000', media_root: str = '/path/to/your/project/media',
+                  signing_secret: str = 'TROQUE_PELO_SEGREDO') -> str:
+    """Trecho do nginx_protected_media.conf que corresponde a POLICIES."""
+    public, paid, download = POLICIES['public_thumbnail'], POLICIES['paid_thumbnail'], POLICIES['private_download']
+    proxy = (
+        f'    proxy_pass {upstream};\n'
+        '    proxy_set_header Host $host;\n'
+        '    proxy_set_header X-Real-IP $remote_addr;\n'
+        '    proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;\n'
+        '    proxy_set_header X-Forwarded-Proto $scheme;\n'
+    )
+    return f'''{SNIPPET_BEGIN}
+#
+# No bloco http {{}}:
+#   proxy_cache_path /var/cache/nginx/guardian levels=1:2 keys_zone=guardian:10m max_size=1g inactive=7d use_temp_path=off;
+#
+# Thumbnails: o Django checa o acesso e responde X-Accel-Redirect com X-Accel-Expires.
+# Públicas ({public['accel_expires']}s) ficam no proxy_cache e as próximas visitas nem chegam ao Django;
+# privadas/pagas vêm com X-Accel-Expires: {paid['accel_expires']} e "{paid['cache_control']}" (só o navegador guarda).
+# Respostas com Set-Cookie nunca são cacheadas (padrão do Nginx).
+location /guardian/thumbnail/ {{
+{proxy}    proxy_cache guardian;
+    proxy_cache_key $scheme$host$request_uri;
+    proxy_cache_lock on;
+    proxy_cache_use_stale updating error timeout;
+}}
+
+# Downloads privados: "{download['cache_control']}" com ETag e X-Accel-Buffering: {download['buffering']}
+# (arquivos grandes seguem direto para o cliente, sem buffer em disco).
+location /guardian/download/ {{
+{proxy}    proxy_cache off;
+}}
+
+# Thumbnails por URL assinada (guardian/signing.py): o Nginx valida assinatura e validade
+# e serve o arquivo direto, sem passar pelo Django nem pelo banco.
+# O segredo deve ser o mesmo de settings.THUMBNAIL_SIGNING_KEY (nunca o SECRET_KEY).
+# Com MEDIA_STORAGE=s3, remova este bloco: a view signed_thumbnail (sem banco) redireciona
+# internamente para /internal_remote/.
+location ^~ /guardian/st/private/thumbnails/ {{
+    secure_link $arg_s,$arg_e;
+    secure_link_md5 "$secure_link_expires$uri$arg_u {signing_secret}";
+
+    # "" = assinatura inválida, "0" = expirada (mesma resposta da view signed_thumbnail)
+    if ($secure_link != "1") {{ return 403; }}
+
+    # Escopo 0 = thumbnail pública; demais escopos são de um usuário
+    set $guardian_cache_control "{paid['cache_control']}";
+    if ($arg_u = "0") {{ set $guardian_cache_control "{public['cache_control']}"; }}
+    add_header Cache-Control $guardian_cache_control;
+
+    alias {media_root.rstrip('/')}/private/thumbnails/;
+}}
+{SNIPPET_END}
+'''
+
+
+def replace_snippet(conf: str, snippet: str) -> str:
+    """Troca o trecho gerado em `conf` (ou o acrescenta no fim, se ainda não existir)."""
+    start, end = conf.find(SNIPPET_BEGIN), conf.find(SNIPPET_END)
+    if start == -1 or end == -1:
+        return conf.rstrip('\n') + '\n\n' + snippet
+    end = conf.index('\n', end) + 1 if '\n' in conf[end:] else len(conf)
+    return conf[:start] + snippet + conf[end:]
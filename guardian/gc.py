@@ -0,0 +1,130 @@
+"""
+Coleta de arquivos órfãos no MEDIA_ROOT (thumbnails substituídas, SVGs apagados, anexos de tickets).
+
+Varre os diretórios de upload dos FileField/ImageField com os.scandir (sem montar a lista inteira)
+e, a cada lote de arquivos, consulta quais caminhos ainda são referenciados no banco. A memória
+usada depende do tamanho do lote, não do número de arquivos.
+"""
+import logging
+import os
+import shutil
+import time
+from typing import Iterator, List, Set, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+QUERY_CHUNK_SIZE = 500
+
+
+def reference_sources() -> List[Tuple[type, str]]:
+    """(modelo, campo) que guardam caminhos relativos ao MEDIA_ROOT."""
+    from .models import FileAsset
+
+    sources = []
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField):
+                sources.append((model, field.name))
+    sources.append((FileAsset, 'file_path'))
+    return sources
+
+
+def upload_roots() -> List[str]:
+    """Diretórios varridos: os upload_to fixos dos FileField (caches têm limpeza própria)."""
+    roots = set()
+    for model, field_name in reference_sources():
+        field = model._meta.get_field(field_name)
+        upload_to = getattr(field, 'upload_to', None)
+        if isinstance(upload_to, str) and upload_to and '%' not in upload_to:
+            roots.add(upload_to.strip('/'))
+    return sorted(roots)
+
+
+def iter_files(media_root: str, relative_dir: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """(caminho relativo com '/', stat) de cada arquivo sob relative_dir, em streaming."""
+    stack = [os.path.join(media_root, relative_dir)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        relative = os.path.relpath(entry.path, media_root).replace(os.sep, '/')
+                        yield relative, entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+
+
+def referenced_among(paths: List[str], sources=None) -> Set[str]:
+    """Quais dos `paths` aparecem em algum campo de arquivo do banco (consultas em blocos)."""
+    sources = sources or reference_sources()
+    found = set()
+    for start in range(0, len(paths), QUERY_CHUNK_SIZE):
+        chunk = paths[start:start + QUERY_CHUNK_SIZE]
+        for model, field_name in sources:
+            found.update(
+                model._default_manager.filter(**{f'{field_name}__in': chunk}).values_list(field_name, flat=True)
+            )
+    return found
+
+
+def _dispose(media_root: str, relative: str, quarantine_dir: str = None) -> None:
+    source = os.path.join(media_root, relative)
+    if quarantine_dir:
+        target = os.path.join(quarantine_dir, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source, target)
+    else:
+        os.remove(source)
+
+
+def collect_garbage(roots: List[str] = None, batch_size: int = 1000, min_age: float = 86400,
+                    dry_run: bool = False, quarantine_dir: str = None, on_orphan=None) -> dict:
+    """
+    Remove (ou move para `quarantine_dir`) arquivos sem referência no banco.
+    Retorna {scanned, orphans, bytes_reclaimed, skipped_recent}.
+
+    Arquivos modificados há menos de `min_age` segundos são ignorados: o upload
+    pode ter sido gravado antes de a linha que o referencia ser salva.
+    """
+    media_root = str(settings.MEDIA_ROOT)
+    sources = reference_sources()
+    cutoff = time.time() - min_age
+    stats = {'scanned': 0, 'orphans': 0, 'bytes_reclaimed': 0, 'skipped_recent': 0}
+
+    def process(batch):
+        referenced = referenced_among([path for path, _ in batch], sources)
+        for path, size in batch:
+            if path in referenced:
+                continue
+            stats['orphans'] += 1
+            stats['bytes_reclaimed'] += size
+            if on_orphan:
+                on_orphan(path, size)
+            if not dry_run:
+                try:
+                    _dispose(media_root, path, quarantine_dir)
+                except FileNotFoundError:
+                    pass
+
+    for root in roots or upload_roots():
+        batch = []
+        for path, stat in iter_files(media_root, root):
+            stats['scanned'] += 1
+            if stat.st_mtime > cutoff:
+                stats['skipped_recent'] += 1
+                continue
+            batch.append((path, stat.st_size))
+            if len(batch) >= batch_size:
+                process(batch)
+                batch = []
+        if batch:
+            process(batch)
+    logger.info("gc_media: %s", stats)
+    return stats
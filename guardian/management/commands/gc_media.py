@@ -0,0 +1,56 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from guardian.gc import collect_garbage, upload_roots
+from guardian.storage import is_remote
+
+
+def _human(size: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.1f} {unit}' if unit != 'B' else f'{size} B'
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = 'Remove (ou coloca em quarentena) arquivos do MEDIA_ROOT que nenhum registro referencia.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Só lista os órfãos, sem apagar.')
+        parser.add_argument('--quarantine', action='store_true',
+                            help='Move os órfãos para MEDIA_ROOT/.quarantine/<data>/ em vez de apagar.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Arquivos conferidos no banco por lote.')
+        parser.add_argument('--min-age-hours', type=float, default=24, help='Ignora arquivos mais novos que isso.')
+        parser.add_argument('--root', action='append', dest='roots', help='Diretório relativo ao MEDIA_ROOT (padrão: upload_to dos modelos).')
+
+    def handle(self, *args, **options):
+        if is_remote(default_storage):
+            raise CommandError('gc_media varre o disco local; com MEDIA_STORAGE=s3 use as regras de ciclo de vida do bucket.')
+        roots = options['roots'] or upload_roots()
+        quarantine_dir = None
+        if options['quarantine'] and not options['dry_run']:
+            quarantine_dir = os.path.join(settings.MEDIA_ROOT, '.quarantine', timezone.now().strftime('%Y%m%d-%H%M%S'))
+        verbose = options['verbosity'] > 1 or options['dry_run']
+
+        def on_orphan(path, size):
+            if verbose:
+                self.stdout.write(f'  {path} ({_human(size)})')
+
+        self.stdout.write(f"Varrendo: {', '.join(roots)}")
+        stats = collect_garbage(
+            roots,
+            batch_size=options['batch_size'],
+            min_age=options['min_age_hours'] * 3600,
+            dry_run=options['dry_run'],
+            quarantine_dir=quarantine_dir,
+            on_orphan=on_orphan,
+        )
+        action = 'seriam liberados' if options['dry_run'] else ('movidos para ' + quarantine_dir if quarantine_dir else 'liberados')
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['scanned']} arquivos, {stats['orphans']} órfãos, "
+            f"{_human(stats['bytes_reclaimed'])} {action} ({stats['skipped_recent']} recentes ignorados)"
+        ))
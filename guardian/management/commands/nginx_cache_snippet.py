@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from guardian.cache_policy import nginx_snippet, replace_snippet
+
+
+class Command(BaseCommand):
+    help = 'Gera o trecho do Nginx que corresponde à política de cache do guardian (guardian/cache_policy.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--upstream', default='http://127.0.0.1:8000', help='Endereço do Django (proxy_pass).')
+        parser.add_argument('--media-root', default='/path/to/your/project/media')
+        parser.add_argument('--secret', default='TROQUE_PELO_SEGREDO', help='Mesmo valor de THUMBNAIL_SIGNING_KEY.')
+        parser.add_argument('--write', metavar='ARQUIVO', help='Atualiza o trecho gerado no arquivo (ex.: nginx_protected_media.conf).')
+
+    def handle(self, *args, **options):
+        snippet = nginx_snippet(options['upstream'], options['media_root'], options['secret'])
+        if not options['write']:
+            self.stdout.write(snippet)
+            return
+        with open(options['write'], encoding='utf-8') as fh:
+            conf = fh.read()
+        with open(options['write'], 'w', encoding='utf-8') as fh:
+            fh.write(replace_snippet(conf, snippet))
+        self.stdout.write(self.style.SUCCESS(f"Trecho atualizado em {options['write']}"))
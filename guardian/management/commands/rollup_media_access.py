@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from guardian.audit import flush_access_log, prune_events, rollup_day
+
+
+class Command(BaseCommand):
+    help = 'Consolida o log de acesso à mídia por dia (MediaAccessDaily) e apaga eventos fora da retenção.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Quantos dias recalcular, contando hoje (padrão: ontem e hoje).')
+        parser.add_argument('--retention', type=int, default=None, help='Dias de eventos brutos mantidos (padrão: MEDIA_ACCESS_RETENTION_DAYS).')
+
+    def handle(self, *args, **options):
+        flush_access_log()
+        today = timezone.localdate()
+        for offset in range(options['days'] - 1, -1, -1):
+            day = today - datetime.timedelta(days=offset)
+            self.stdout.write(f"{day}: {rollup_day(day)} linhas consolidadas")
+        self.stdout.write(f"{prune_events(options['retention'])} eventos antigos removidos")
@@ -0,0 +1,23 @@
+"""
+Middlewares do guardian.
+"""
+from django.utils.cache import cc_delim_re
+
+
+def language_neutral_media(get_response):
+    """
+    As rotas do guardian ficam fora do i18n_patterns (caminho fixo para o Nginx e para as
+    URLs assinadas), e o LocaleMiddleware acrescenta "Vary: Accept-Language" a toda resposta
+    sem prefixo de idioma. Mídia não muda com o idioma: o Vary só fragmentaria o cache do
+    navegador, do proxy_cache e da CDN. Precisa vir antes do LocaleMiddleware na lista.
+    """
+    def middleware(request):
+        response = get_response(request)
+        if request.path_info.startswith('/guardian/') and response.has_header('Vary'):
+            kept = [value for value in cc_delim_re.split(response['Vary']) if value.lower() != 'accept-language']
+            if kept:
+                response['Vary'] = ', '.join(kept)
+            else:
+                del response['Vary']
+        return response
+    return middleware
@@ -73,3 +73,54 @@ class FileAsset(models.Model):
     class Meta:
         verbose_name = "Arquivo Protegido"
         verbose_name_plural = "Arquivos Protegidos"
+
+
+class MediaAccessEvent(models.Model):
+    """
+    Acesso a mídia protegida (thumbnail ou download), gravado em lote por guardian.audit.
+    URLs assinadas (/guardian/st/) são atendidas pelo Nginx e ficam no access log dele.
+
+    Tabela rotativa: `rollup_media_access` consolida em MediaAccessDaily e apaga eventos
+    mais antigos que MEDIA_ACCESS_RETENTION_DAYS. Sem FK no banco: o log sobrevive à remoção
+    do usuário/arquivo e o insert em lote não depende de outras tabelas.
+    """
+    KIND_CHOICES = [
+        ('thumbnail', 'Thumbnail'),
+        ('download', 'Download'),
+    ]
+
+    occurred_at = models.DateTimeField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    svg = models.ForeignKey('core.SvgFile', null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    file_asset = models.ForeignKey(FileAsset, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    status = models.PositiveSmallIntegerField()
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        verbose_name = "Acesso a mídia"
+        verbose_name_plural = "Acessos a mídia"
+        indexes = [
+            models.Index(fields=['occurred_at'], name='guardian_access_time_idx'),
+            models.Index(fields=['user', 'occurred_at'], name='guardian_access_user_idx'),
+        ]
+
+
+class MediaAccessDaily(models.Model):
+    """Acessos por dia, SVG/arquivo e tipo (consolidado de MediaAccessEvent)."""
+    day = models.DateField()
+    kind = models.CharField(max_length=20, choices=MediaAccessEvent.KIND_CHOICES)
+    svg = models.ForeignKey('core.SvgFile', null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    file_asset = models.ForeignKey(FileAsset, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    hits = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Acessos por dia"
+        verbose_name_plural = "Acessos por dia"
+        # O rollup regrava o dia inteiro numa transação; não há upsert por chave
+        indexes = [
+            models.Index(fields=['day', 'kind'], name='guardian_daily_day_idx'),
+            models.Index(fields=['svg', 'day'], name='guardian_daily_svg_idx'),
+        ]
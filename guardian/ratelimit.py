@@ -0,0 +1,102 @@
+"""
+Limite de taxa por token bucket (por usuário ou IP e classe de endpoint) e descarte de carga.
+
+O estado dos buckets fica no cache do Django: com CACHE_URL configurado (Redis) o limite
+vale para todos os workers; sem ele cai no LocMemCache, por processo. Anônimos são
+identificados por guardian.utils.client_ip, que só aceita cabeçalhos de TRUSTED_PROXIES. A leitura e a
+escrita não são atômicas, então sob concorrência alta o limite é aproximado (alguns pedidos a mais).
+
+Antes do bucket, um contador de requisições em andamento no processo responde 503 barato
+(sem cache, sessão ou banco) quando passa de GUARDIAN_MAX_IN_FLIGHT.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .utils import client_ip
+
+# classe -> (tokens por segundo, rajada máxima)
+DEFAULT_LIMITS = {
+    'thumbnail': (20.0, 200),  # uma página do explore pede dezenas de uma vez
+    'copy': (2.0, 60),
+    'download': (1.0, 20),
+    'export': (0.5, 10),
+}
+
+_in_flight = defaultdict(int)
+_in_flight_lock = threading.Lock()
+
+
+def limits_for(endpoint_class: str):
+    return getattr(settings, 'RATE_LIMITS', {}).get(endpoint_class, DEFAULT_LIMITS[endpoint_class])
+
+
+def take_token(key: str, rate: float, burst: int, now: float = None) -> float:
+    """Consome um token do bucket `key`. Retorna 0 se permitido, senão os segundos até haver token."""
+    now = time.time() if now is None else now
+    tokens, updated_at = cache.get(key) or (float(burst), now)
+    tokens = min(float(burst), tokens + max(now - updated_at, 0.0) * rate)
+    wait = 0.0
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        wait = (1 - tokens) / rate
+    # Depois de encher de novo o bucket pode sumir do cache: ausente == cheio
+    cache.set(key, (tokens, now), timeout=math.ceil(burst / rate) + 1)
+    return wait
+
+
+def identity(request) -> str:
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'u{user.pk}'
+    return f'ip{client_ip(request)}'
+
+
+def check_rate(request, endpoint_class: str) -> float:
+    rate, burst = limits_for(endpoint_class)
+    return take_token(f'rl:{endpoint_class}:{identity(request)}', rate, burst)
+
+
+def _enter(endpoint_class: str) -> bool:
+    limit = getattr(settings, 'GUARDIAN_MAX_IN_FLIGHT', 32)
+    with _in_flight_lock:
+        if _in_flight[endpoint_class] >= limit:
+            return False
+        _in_flight[endpoint_class] += 1
+        return True
+
+
+def _leave(endpoint_class: str) -> None:
+    with _in_flight_lock:
+        _in_flight[endpoint_class] -= 1
+
+
+def rate_limited(endpoint_class: str):
+    """Decorator de view: 503 acima do limite de requisições em andamento, 429 + Retry-After sem token."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+                return view(request, *args, **kwargs)
+            if not _enter(endpoint_class):
+                response = HttpResponse("Servidor ocupado, tente novamente.", status=503, content_type='text/plain; charset=utf-8')
+                response['Retry-After'] = '1'
+                return response
+            try:
+                wait = check_rate(request, endpoint_class)
+                if wait:
+                    response = HttpResponse("Muitas requisições.", status=429, content_type='text/plain; charset=utf-8')
+                    response['Retry-After'] = str(math.ceil(wait))
+                    return response
+                return view(request, *args, **kwargs)
+            finally:
+                _leave(endpoint_class)
+        return wrapper
+    return decorator
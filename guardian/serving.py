@@ -0,0 +1,142 @@
+"""
+Entrega de arquivos pelo Django quando não há Nginx (USE_NGINX=False).
+
+ETag/Last-Modified, respostas 304 (If-None-Match / If-Modified-Since), um intervalo
+de bytes por requisição (Range / If-Range, 206/416) e corpo entregue ao `wsgi.file_wrapper`
+com o descritor do arquivo: no gunicorn isso vira os.sendfile (cópia zero, sem passar
+os bytes pelo Python).
+"""
+import os
+import re
+from typing import Optional, Tuple
+
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+ETAG_SPLIT_RE = re.compile(r'\s*,\s*')
+
+
+class RangeFile:
+    """
+    Arquivo limitado a `length` bytes a partir da posição atual.
+
+    Expõe fileno() para o file_wrapper do servidor usar sendfile (ele lê o offset
+    do descritor e envia Content-Length bytes); read() limitado cobre servidores sem sendfile.
+    Sem tell(): o FileResponse não recalcula o Content-Length.
+    """
+
+    def __init__(self, fh, length: int):
+        self._fh = fh
+        self._remaining = length
+        self.name = fh.name
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._fh.close()
+
+
+def file_etag(stat: os.stat_result) -> str:
+    # Validador forte no estilo do Nginx: mtime (ns) + tamanho + inode
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}-{stat.st_ino:x}')
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Comparação fraca (If-None-Match): ignora o prefixo W/
+    candidates = [tag[2:] if tag.startswith('W/') else tag for tag in ETAG_SPLIT_RE.split(header.strip())]
+    return '*' in candidates or etag in candidates
+
+
+def is_not_modified(request, etag: str, mtime: int) -> bool:
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        # Com If-None-Match, If-Modified-Since é ignorado (RFC 9110 13.2.2)
+        return _etag_matches(if_none_match, etag)
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and mtime <= since
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    "bytes=a-b" -> (início, fim inclusivo). Levanta ValueError se insatisfazível;
+    None para cabeçalho ausente, malformado ou com vários intervalos (serve o arquivo todo).
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError('intervalo vazio')
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError('intervalo fora do arquivo')
+    return start, end
+
+
+def _if_range_allows(request, etag: str, mtime: int) -> bool:
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag  # If-Range exige comparação forte
+    return parse_http_date_safe(if_range) == mtime
+
+
+def serve_file(request, full_path: str, content_type: str = None, filename: str = None):
+    """Resposta com validadores, 304 e Range para um caminho absoluto."""
+    try:
+        fh = open(full_path, 'rb')
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404("Arquivo não encontrado")
+    stat = os.fstat(fh.fileno())
+    etag = file_etag(stat)
+    mtime = int(stat.st_mtime)
+
+    if request.method in ('GET', 'HEAD') and is_not_modified(request, etag, mtime):
+        fh.close()
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if request.method == 'GET' and _if_range_allows(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            fh.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        fh.seek(start)
+        response = FileResponse(RangeFile(fh, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(fh, content_type=content_type)
+        response['Content-Length'] = str(size)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
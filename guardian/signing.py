@@ -0,0 +1,82 @@
+"""
+URLs assinadas e com validade para thumbnails.
+
+O formato segue o `secure_link_md5` do Nginx: md5(expira + uri + escopo + " " + segredo) em base64url.
+A validação não consulta o banco, então o Nginx serve a imagem sem passar pelo Django
+(ver nginx_protected_media.conf); a view `signed_thumbnail` faz a mesma checagem em desenvolvimento.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from typing import Optional
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+
+# Escopo das thumbnails públicas: a mesma URL serve todos os usuários (e o cache do navegador/CDN)
+PUBLIC_SCOPE = 0
+
+
+def signing_key() -> str:
+    """Segredo do secure_link_md5 do Nginx; precisa ser próprio, nunca o SECRET_KEY."""
+    key = getattr(settings, 'THUMBNAIL_SIGNING_KEY', '')
+    if not key:
+        raise ImproperlyConfigured("THUMBNAIL_SIGNING_KEY não configurado")
+    if key == settings.SECRET_KEY:
+        raise ImproperlyConfigured("THUMBNAIL_SIGNING_KEY não pode ser igual ao SECRET_KEY")
+    return key
+
+
+def url_ttl() -> int:
+    return getattr(settings, 'THUMBNAIL_URL_TTL', 3600)
+
+
+def expiry(now: float = None) -> int:
+    """Validade alinhada a janelas de TTL: renders na mesma janela geram a mesma URL (cacheável)."""
+    ttl = url_ttl()
+    now = int(time.time() if now is None else now)
+    return (now // ttl + 2) * ttl
+
+
+def signature(uri: str, scope: int, expires: int) -> str:
+    raw = f'{expires}{uri}{scope} {signing_key()}'.encode('utf-8')
+    return base64.urlsafe_b64encode(hashlib.md5(raw).digest()).decode('ascii').rstrip('=')
+
+
+def sign_path(file_name: str, scope: int = PUBLIC_SCOPE, expires: int = None) -> str:
+    """URL assinada para um arquivo de thumbnail (relativo ao MEDIA_ROOT)."""
+    url = reverse('guardian:signed_thumbnail', kwargs={'path': file_name})
+    expires = expiry() if expires is None else expires
+    # Assina o caminho decodificado: é o que a view (request.path) e o Nginx ($uri) comparam
+    return f'{url}?s={signature(unquote(url), scope, expires)}&e={expires}&u={scope}'
+
+
+def verify(uri: str, params) -> bool:
+    """Assinatura válida e não expirada; só compara strings, sem acesso ao banco."""
+    try:
+        expires = int(params.get('e', ''))
+        scope = int(params.get('u', ''))
+    except ValueError:
+        return False
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(signature(uri, scope, expires), params.get('s', ''))
+
+
+def signed_thumbnail_url(svg, user=None) -> Optional[str]:
+    """
+    URL emitida no render. Públicas usam escopo compartilhado; privadas só
+    são assinadas (com o id do usuário) se ele tem acesso agora, senão None.
+    """
+    if not svg.thumbnail:
+        return None
+    if svg.is_public:
+        return sign_path(svg.thumbnail.name)
+    if user is None or not user.is_authenticated:
+        return None
+    if user.pk != svg.owner_id and not user.is_staff and svg.user_access_type(user) == 'locked':
+        return None
+    return sign_path(svg.thumbnail.name, scope=user.pk)
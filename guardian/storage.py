@@ -0,0 +1,153 @@
+"""
+Armazenamento de mídia para o guardian: disco local (FileSystemStorage) ou objeto S3-compatível
+(AWS, MinIO, R2...), escolhido por STORAGES['default'] (ver server/settings.py, MEDIA_STORAGE=s3).
+
+O S3Storage fala a API por URLs pré-assinadas (SigV4, só stdlib): o Django continua fazendo a
+checagem de acesso e devolve X-Accel-Redirect para o proxy interno do Nginx, que busca o objeto
+no bucket. Assim os nós da aplicação não precisam de disco compartilhado.
+"""
+import datetime
+import hashlib
+import hmac
+import urllib.error
+import urllib.request
+from typing import Optional
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage, default_storage
+from django.utils.deconstruct import deconstructible
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _encode(value: str, safe: str = '-_.~') -> str:
+    return quote(value, safe=safe)
+
+
+def presign_url(method: str, url: str, access_key: str, secret_key: str, region: str,
+                expires: int = 300, now: datetime.datetime = None) -> str:
+    """URL pré-assinada (AWS Signature V4, parâmetros na query) para `url` sem query."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    day = amz_date[:8]
+    scope = f'{day}/{region}/s3/aws4_request'
+    parts = urlsplit(url)
+    canonical_uri = _encode(parts.path or '/', safe='/-_.~')
+    params = {
+        'X-Amz-Algorithm': ALGORITHM,
+        'X-Amz-Credential': f'{access_key}/{scope}',
+        'X-Amz-Date': amz_date,
+        'X-Amz-Expires': str(expires),
+        'X-Amz-SignedHeaders': 'host',
+    }
+    query = '&'.join(f'{_encode(k)}={_encode(v)}' for k, v in sorted(params.items()))
+    canonical_request = '\n'.join([method, canonical_uri, query, f'host:{parts.netloc}\n', 'host', UNSIGNED_PAYLOAD])
+    string_to_sign = '\n'.join([ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()])
+
+    key = _hmac(('AWS4' + secret_key).encode('utf-8'), day)
+    for part in (region, 's3', 'aws4_request'):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f'{parts.scheme}://{parts.netloc}{canonical_uri}?{query}&X-Amz-Signature={signature}'
+
+
+@deconstructible
+class S3Storage(Storage):
+    """
+    Storage S3-compatível sem dependências extras.
+
+    addressing='path' (MinIO, padrão): endpoint/bucket/chave; 'virtual': bucket.endpoint/chave.
+    """
+
+    def __init__(self, endpoint_url=None, bucket=None, access_key=None, secret_key=None,
+                 region='us-east-1', addressing='path', expires=300, timeout=10):
+        self.endpoint_url = (endpoint_url or '').rstrip('/')
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.addressing = addressing
+        self.expires = expires
+        self.timeout = timeout
+
+    def object_url(self, name: str) -> str:
+        parts = urlsplit(self.endpoint_url)
+        key = name.lstrip('/')
+        if self.addressing == 'virtual':
+            return f'{parts.scheme}://{self.bucket}.{parts.netloc}/{key}'
+        return f'{self.endpoint_url}/{self.bucket}/{key}'
+
+    def presigned_url(self, name: str, method: str = 'GET', expires: int = None) -> str:
+        return presign_url(method, self.object_url(name), self.access_key, self.secret_key,
+                           self.region, expires or self.expires)
+
+    def _request(self, method: str, name: str, data: bytes = None, content_type: str = None):
+        request = urllib.request.Request(self.presigned_url(name, method), data=data, method=method)
+        if content_type:
+            request.add_header('Content-Type', content_type)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _head(self, name: str) -> Optional[dict]:
+        try:
+            with self._request('HEAD', name) as response:
+                return dict(response.headers)
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                return None
+            raise
+
+    def _open(self, name, mode='rb'):
+        try:
+            with self._request('GET', name) as response:
+                return ContentFile(response.read(), name=name)
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                raise FileNotFoundError(name)
+            raise
+
+    def _save(self, name, content):
+        content.seek(0)
+        with self._request('PUT', name, content.read(), getattr(content, 'content_type', None)):
+            pass
+        return name
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def delete(self, name):
+        try:
+            with self._request('DELETE', name):
+                pass
+        except urllib.error.HTTPError as exc:
+            if exc.code != 404:
+                raise
+
+    def size(self, name):
+        headers = self._head(name)
+        if headers is None:
+            raise FileNotFoundError(name)
+        return int(headers.get('Content-Length', 0))
+
+    def url(self, name):
+        return self.presigned_url(name)
+
+
+def is_remote(storage=None) -> bool:
+    return hasattr(storage or default_storage, 'presigned_url')
+
+
+def internal_remote_url(presigned: str) -> str:
+    """
+    Caminho do X-Accel-Redirect para o proxy interno do Nginx:
+    /internal_remote/<esquema>/<host>/<caminho>?<query assinada> (ver nginx_protected_media.conf).
+    """
+    prefix = getattr(settings, 'INTERNAL_REMOTE_URL', '/internal_remote/')
+    parts = urlsplit(presigned)
+    return f"{prefix.rstrip('/')}/{parts.scheme}/{parts.netloc}{parts.path}?{parts.query}"
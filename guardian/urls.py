@@ -6,4 +6,7 @@ app_name = 'guardian'
 urlpatterns = [
     path('download/<int:file_id>/', views.protected_media, name='protected_media'),
     path('thumbnail/<int:svg_id>/', views.protected_thumbnail, name='protected_thumbnail'),
+    path('st/<path:path>', views.signed_thumbnail, name='signed_thumbnail'),
+    path('export/<int:svg_id>/', views.protected_export, name='protected_export'),
+    path('code-export/', views.protected_code_export, name='protected_code_export'),
 ]
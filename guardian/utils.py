@@ -2,6 +2,7 @@
 Utilitários para o app guardian
 """
 from django.conf import settings
+import ipaddress
 import os
 
 
@@ -34,3 +35,74 @@ def build_internal_media_url(file_path: str) -> str:
         raise ValueError("Caminho de arquivo inválido: tentativa de directory traversal")
     
     return f"{internal_url}{normalized_path}"
+
+
+def _trusted_proxy(address: str) -> bool:
+    """Endereço dentro de settings.TRUSTED_PROXIES (IPs ou redes CIDR)."""
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    for network in getattr(settings, 'TRUSTED_PROXIES', []):
+        try:
+            if ip in ipaddress.ip_network(network, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def client_ip(request):
+    """
+    IP do cliente. Cabeçalhos de proxy só valem quando a conexão vem de um
+    proxy confiável (TRUSTED_PROXIES); sem isso qualquer cliente forjaria o IP
+    e escaparia do limite de taxa. Usa X-Real-IP (Nginx, ver nginx_protected_media.conf)
+    ou o primeiro endereço não confiável da direita do X-Forwarded-For (Render).
+    """
+    remote = request.META.get('REMOTE_ADDR') or None
+    if not remote or not _trusted_proxy(remote):
+        return remote
+    real_ip = request.META.get('HTTP_X_REAL_IP', '').strip()
+    if real_ip:
+        return real_ip
+    forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+    for address in reversed(forwarded):
+        if not _trusted_proxy(address):
+            return address
+    return forwarded[0] if forwarded else remote
+
+
+def serve_media_file(request, file_path: str, content_type: str = None, filename: str = None,
+                     use_nginx: bool = None, local: bool = False):
+    """
+    Resposta para um arquivo do storage de mídia (chave relativa ao MEDIA_ROOT/bucket),
+    depois que a view já checou o acesso:
+
+    - local + Nginx: X-Accel-Redirect para /internal_media/
+    - remoto (S3) + Nginx: X-Accel-Redirect para o proxy /internal_remote/ com URL pré-assinada
+    - remoto sem Nginx: redirect para a URL pré-assinada (curta)
+    - local sem Nginx: guardian.serving (ETag/304/Range)
+
+    local=True força o disco do MEDIA_ROOT (caches regeneráveis, como as exportações).
+    """
+    from django.core.files.storage import default_storage
+    from django.http import HttpResponse, HttpResponseRedirect
+    from .serving import serve_file
+    from .storage import internal_remote_url, is_remote
+
+    if use_nginx is None:
+        use_nginx = getattr(settings, 'USE_NGINX', False)
+    remote = not local and is_remote(default_storage)
+    if remote and not use_nginx:
+        return HttpResponseRedirect(default_storage.presigned_url(file_path))
+    if not use_nginx:
+        return serve_file(request, os.path.join(settings.MEDIA_ROOT, file_path), content_type, filename)
+    response = HttpResponse()
+    if remote:
+        response['X-Accel-Redirect'] = internal_remote_url(default_storage.presigned_url(file_path))
+    else:
+        response['X-Accel-Redirect'] = build_internal_media_url(file_path)
+    response['Content-Type'] = content_type or ''
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,23 +1,27 @@
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, Http404, FileResponse
+from django.http import HttpResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.conf import settings
 import os
 from server.settings import USE_NGINX
 
+from .audit import record_access
+from .cache_policy import apply_policy, content_type_for, thumbnail_class
 from .models import FileAsset
-from .utils import build_internal_media_url
+from .ratelimit import rate_limited
+from .utils import serve_media_file
 
 
 def _use_nginx():
     """
     Verifica se deve usar X-Accel-Redirect (produção com Nginx).
-    Por padrão, serve arquivos diretamente via FileResponse.
+    Por padrão, serve arquivos diretamente via guardian.serving.
     """
     return os.getenv('USE_NGINX', 'false').lower() in ('true', '1', 'yes')
 
 
+@rate_limited('download')
 @login_required
 def protected_media(request, file_id):
     """
@@ -32,39 +36,22 @@ def protected_media(request, file_id):
     if file_asset.owner != request.user:
         raise PermissionDenied("Você não tem permissão para acessar este arquivo.")
     
-    # Verifica se está usando Nginx via variável de ambiente
-    use_nginx = USE_NGINX
-    
-    # Serve arquivo diretamente se não estiver usando Nginx
-    if not _use_nginx():
-        file_path = os.path.join(settings.MEDIA_ROOT, file_asset.file_path)
-        if os.path.exists(file_path):
-            return FileResponse(open(file_path, 'rb'))
-        raise Http404("Arquivo não encontrado")
-    
-    # Em produção com Nginx, usa X-Accel-Redirect para Nginx servir o arquivo
-    redirect_path = build_internal_media_url(file_asset.file_path)
-    response = HttpResponse()
-    response['X-Accel-Redirect'] = redirect_path
-    response['Content-Type'] = ''  # Deixa o Nginx determinar o tipo
-    
-    return response
+    # Nginx via variável de ambiente: X-Accel-Redirect (disco local ou bucket S3);
+    # sem Nginx, guardian.serving ou redirect para URL pré-assinada
+    response = serve_media_file(request, file_asset.file_path, content_type_for(file_asset.file_path), use_nginx=_use_nginx())
+    record_access(request, response, 'download', file_asset_id=file_asset.pk)
+    return apply_policy(response, 'private_download')
 
 
+@rate_limited('thumbnail')
 def protected_thumbnail(request, svg_id):
     """
     View que serve thumbnails de SVGs com controle de acesso.
     
-    Permite acesso quando requisitado através de navegadores no site,
-    bloqueando acesso direto via ferramentas como curl, wget, Postman.
-    
-    Verificação de acesso:
-    1. Verifica se é requisição de navegador (Accept header)
-    2. Valida permissões baseadas no tipo de SVG
+    Acesso baseado no tipo de SVG; scrapers são contidos pelo limite de
+    taxa por usuário/IP (guardian.ratelimit), não pelo User-Agent.
     """
     from core.models import SvgFile
-    from django.http import FileResponse
-    import mimetypes
     
     svg = get_object_or_404(SvgFile, id=svg_id)
     
@@ -72,25 +59,7 @@ def protected_thumbnail(request, svg_id):
     if not svg.thumbnail:
         raise Http404("Thumbnail não encontrada")
     
-    # Verifica se a requisição vem de um navegador legítimo
-    # Navegadores sempre têm User-Agent com "Mozilla"
-    user_agent = request.META.get('HTTP_USER_AGENT', '')
-    
-    # Considera navegador se User-Agent contém "Mozilla" (todos navegadores modernos)
-    # Ferramentas CLI (curl, wget, Postman) não têm "Mozilla" no User-Agent por padrão
-    is_browser = 'Mozilla' in user_agent
-    
-    # Bloqueia ferramentas de acesso direto (curl, wget, Postman)
-    if not is_browser:
-        # Acesso via ferramenta sem User-Agent de navegador
-        if not request.user.is_authenticated:
-            raise PermissionDenied("Acesso direto não permitido. Visualize através do site.")
-        
-        # Usuário autenticado via ferramenta - permite apenas para donos e VIPs
-        if not (request.user == svg.owner or (hasattr(request.user, 'is_vip') and request.user.is_vip)):
-            raise PermissionDenied("Acesso direto não permitido. Visualize através do site.")
-    
-    # Requisição válida - verifica permissões baseadas no SVG
+    # Verifica permissões baseadas no SVG
     if not svg.is_public:
         # SVG privado ou pago - exige autenticação para ver no site
         if not request.user.is_authenticated:
@@ -101,27 +70,127 @@ def protected_thumbnail(request, svg_id):
         if access_type == 'locked':
             raise PermissionDenied("Você não tem acesso a esta thumbnail.")
     
-    # Verifica se está usando Nginx via variável de ambiente
-    # Se USE_NGINX=true, usa X-Accel-Redirect. Caso contrário, serve diretamente.
-    use_nginx = USE_NGINX
-    
-    # Serve arquivo diretamente se não estiver usando Nginx (desenvolvimento ou runserver)
-    if not use_nginx:
-        # Usa o caminho do arquivo da thumbnail
-        file_path = svg.thumbnail.path
-        if os.path.exists(file_path):
-            # Detecta o tipo MIME do arquivo
-            content_type, _ = mimetypes.guess_type(file_path)
-            response = FileResponse(open(file_path, 'rb'))
-            if content_type:
-                response['Content-Type'] = content_type
+    # Se USE_NGINX=true, usa X-Accel-Redirect (disco local ou bucket S3).
+    # Caso contrário, serve diretamente (desenvolvimento ou runserver).
+    response = serve_media_file(request, svg.thumbnail.name, content_type_for(svg.thumbnail.name), use_nginx=USE_NGINX)
+    record_access(request, response, 'thumbnail', svg_id=svg.pk)
+    return apply_policy(response, thumbnail_class(svg))
+
+
+def signed_thumbnail(request, path):
+    """
+    Thumbnail por URL assinada (guardian/signing.py): valida assinatura e
+    validade sem tocar no banco. Em produção o Nginx (secure_link) atende
+    essa rota sozinho; esta view cobre desenvolvimento e servidores sem Nginx.
+    """
+    from core.models import SvgFile
+    from .signing import PUBLIC_SCOPE, verify
+
+    thumbnails_dir = SvgFile._meta.get_field('thumbnail').upload_to
+    if not path.startswith(thumbnails_dir) or '..' in path or not verify(request.path, request.GET):
+        raise PermissionDenied("Link inválido ou expirado.")
+    response = serve_media_file(request, path, content_type_for(path))
+    asset_class = 'public_thumbnail' if request.GET.get('u') == str(PUBLIC_SCOPE) else 'paid_thumbnail'
+    return apply_policy(response, asset_class)
+
+
+@rate_limited('export')
+@login_required
+def protected_export(request, svg_id):
+    """
+    Exportação PNG (16–1024 px, escala 1–3x) para planos pagos.
+
+    O PNG é renderizado uma vez por (hash do conteúdo, pixels) e fica em cache
+    no disco; repetições custam ao Django só a checagem de acesso, e o Nginx
+    entrega o arquivo via X-Accel-Redirect.
+    """
+    from core.models import SvgFile
+    from core.services.exports import (
+        ExportUnavailable, export_filename, get_or_render_png, parse_export_params,
+    )
+
+    svg = get_object_or_404(SvgFile, id=svg_id)
+    user = request.user
+    if not svg.is_public and svg.owner != user and not user.is_staff:
+        raise Http404("SVG não encontrado")
+    if not (getattr(user, 'is_vip', False) or user.is_staff):
+        raise PermissionDenied("Exportação PNG disponível apenas para planos pagos.")
+    if svg.user_access_type(user) == 'locked':
+        raise PermissionDenied("Você não tem acesso a este SVG.")
+
+    try:
+        size, scale = parse_export_params(request.GET)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400, content_type='text/plain; charset=utf-8')
+    try:
+        relative_path = get_or_render_png(svg, size, scale)
+    except ExportUnavailable:
+        return HttpResponse("Exportação PNG indisponível no momento.", status=503, content_type='text/plain; charset=utf-8')
+
+    response = serve_media_file(request, relative_path, 'image/png', export_filename(svg, size * scale), local=True)
+    return apply_policy(response, 'private_export')
+
+
+@rate_limited('export')
+@login_required
+def protected_code_export(request):
+    """
+    GET ?format=jsx|tsx|vue|font e um de: id=<pk>, tag=<tag>, library=1
+
+    Componentes React/Vue ou fonte de ícones gerados a partir dos SVGs que o
+    usuário pode copiar. Cada artefato fica em cache pelo hash do conteúdo;
+    exportar uma biblioteca inteira só gera o que mudou.
+    """
+    from core.models import SvgFile
+    from core.services.catalog import accessible_queryset
+    from core.services.codegen import (
+        CONTENT_TYPES, build_bundle, max_sync_items, pending_artifacts, plan_items, single_artifact,
+    )
+    from core.services.exports import ExportUnavailable
+    from core.utils.codegen import COMPONENT_FORMATS, FORMATS
+
+    fmt = request.GET.get('format', 'jsx')
+    if fmt not in FORMATS:
+        return HttpResponse("format deve ser um de: " + ', '.join(FORMATS), status=400, content_type='text/plain; charset=utf-8')
+
+    svgs = accessible_queryset(request.user)
+    if request.GET.get('id'):
+        try:
+            svg = get_object_or_404(SvgFile, pk=int(request.GET['id']), is_public=True)
+        except ValueError:
+            return HttpResponse("id deve ser inteiro", status=400, content_type='text/plain; charset=utf-8')
+        if svg.user_access_type(request.user) == 'locked':
+            raise PermissionDenied("Você não tem acesso a este SVG.")
+        if fmt in COMPONENT_FORMATS:
+            try:
+                relative_path, filename = single_artifact(svg, fmt)
+            except ValueError:
+                return HttpResponse("SVG inválido", status=422, content_type='text/plain; charset=utf-8')
+            return serve_media_file(request, relative_path, CONTENT_TYPES[fmt], filename, local=True)
+        selection, label = [svg], f'svg-{svg.pk}'
+    elif request.GET.get('tag'):
+        tag = request.GET['tag'].strip()
+        selection, label = svgs.filter(tags__icontains=tag), f'tag-{tag}'
+    elif request.GET.get('library'):
+        selection, label = svgs, 'biblioteca'
+    else:
+        return HttpResponse("informe id, tag ou library", status=400, content_type='text/plain; charset=utf-8')
+
+    if not isinstance(selection, list):
+        selection = list(selection.order_by('id'))
+    if not selection:
+        raise Http404("Nenhum SVG para exportar")
+    try:
+        items = plan_items(selection, fmt)
+        # Com o build_code_exports em dia (artefatos e bibliotecas pré-montados), a requisição só
+        # monta o ZIP ou serve o arquivo pronto; gerar muitos componentes aqui fica para o comando
+        if pending_artifacts(items, fmt) > max_sync_items():
+            response = HttpResponse("Exportação em preparo; tente novamente em alguns minutos.",
+                                    status=503, content_type='text/plain; charset=utf-8')
+            response['Retry-After'] = '300'
             return response
-        raise Http404("Thumbnail não encontrada")
-    
-    # Em produção com Nginx, usa X-Accel-Redirect para Nginx servir o arquivo
-    redirect_path = build_internal_media_url(svg.thumbnail.name)
-    response = HttpResponse()
-    response['X-Accel-Redirect'] = redirect_path
-    response['Content-Type'] = ''  # Deixa o Nginx determinar o tipo
-    
-    return response
+        relative_path, _ = build_bundle(selection, fmt, items=items)
+    except ExportUnavailable:
+        return HttpResponse("Exportação indisponível no momento.", status=503, content_type='text/plain; charset=utf-8')
+    safe_label = ''.join(ch if ch.isalnum() or ch in '-_' else '-' for ch in label)
+    return serve_media_file(request, relative_path, 'application/zip', f'akkaui-{safe_label}-{fmt}.zip', local=True)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, PaymentItem, Purchase
+from .models import Payment, PaymentItem, Purchase, WebhookCounter, WebhookEvent
 
 
 class PaymentItemInline(admin.TabularInline):
@@ -62,3 +62,26 @@ class PurchaseAdmin(admin.ModelAdmin):
         }),
     )
 
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'provider', 'event_type', 'ordering_key', 'status', 'attempts', 'next_attempt_at', 'received_at')
+    list_filter = ('provider', 'status', 'received_at')
+    search_fields = ('event_id', 'event_type', 'ordering_key', 'last_error')
+    readonly_fields = ('received_at', 'processed_at', 'locked_until')
+    ordering = ('-id',)
+    actions = ['requeue']
+
+    @admin.action(description='Reenfileirar eventos selecionados')
+    def requeue(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status=WebhookEvent.STATUS_PROCESSING).update(
+            status=WebhookEvent.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} evento(s) reenfileirado(s).')
+
+
+@admin.register(WebhookCounter)
+class WebhookCounterAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'received', 'duplicates', 'updated_at')
+    readonly_fields = ('provider', 'received', 'duplicates', 'updated_at')
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from payment.services.webhook_inbox import prune_processed, run_worker, webhook_metrics
+
+
+class Command(BaseCommand):
+    help = 'Processa a caixa de entrada de webhooks (WebhookEvent) com retentativas e dead-letter.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Threads processando eventos em paralelo.')
+        parser.add_argument('--batch-size', type=int, default=20, help='Eventos reivindicados por vez.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Segundos de espera com a fila vazia.')
+        parser.add_argument('--once', action='store_true', help='Processa o que estiver pronto e sai (para cron).')
+        parser.add_argument('--prune', type=int, default=None, metavar='DIAS',
+                            help='Antes de processar, apaga eventos concluídos há mais de DIAS dias.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Só mostra os contadores de webhooks recebidos e duplicados descartados.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for provider, counts in webhook_metrics().items():
+                self.stdout.write(f"{provider}: {counts['received']} recebidos, {counts['duplicates']} duplicados descartados")
+            return
+        if options['prune'] is not None:
+            self.stdout.write(f"{prune_processed(options['prune'])} eventos antigos removidos")
+        stats = run_worker(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            once=options['once'],
+            poll_interval=options['poll_interval'],
+        )
+        self.stdout.write(
+            f"{stats['claimed']} eventos: {stats['done']} processados, "
+            f"{stats['retry']} reagendados, {stats['dead']} em dead-letter"
+        )
@@ -129,6 +129,84 @@ class Purchase(models.Model):
         verbose_name_plural = "Compras"
         unique_together = ['user', 'svg']
         ordering = ['-purchased_at']
+        indexes = [
+            # "Minhas compras" / biblioteca: filtro por usuário ordenado pela data
+            models.Index(fields=['user', '-purchased_at'], name='payment_purchase_user_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.svg.title_name} ({self.purchased_at.strftime('%Y-%m-%d')})"
+
+
+class WebhookEvent(models.Model):
+    """
+    Caixa de entrada de webhooks dos gateways.
+
+    A view só verifica a origem, grava o evento bruto e responde 200; o comando
+    `process_webhooks` processa em segundo plano, com novas tentativas (backoff
+    exponencial) e dead-letter. Eventos com a mesma `ordering_key` (um pagamento,
+    uma assinatura) são processados na ordem de chegada.
+    """
+    PROVIDER_CHOICES = Payment.GATEWAY_CHOICES
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendente'),
+        (STATUS_PROCESSING, 'Processando'),
+        (STATUS_DONE, 'Processado'),
+        (STATUS_DEAD, 'Dead-letter'),
+    ]
+
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    event_id = models.CharField(max_length=255, blank=True, default='', help_text="ID do evento no gateway (único por provedor), quando existe")
+    event_type = models.CharField(max_length=100, blank=True, default='')
+    ordering_key = models.CharField(max_length=255, blank=True, default='', help_text="Eventos com a mesma chave são processados em ordem")
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type or self.event_id} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Evento de webhook'
+        verbose_name_plural = 'Eventos de webhook'
+        indexes = [
+            # Fila: pendentes vencidos, e o bloqueio por chave (evento anterior ainda aberto)
+            models.Index(fields=['status', 'next_attempt_at'], name='payment_webhook_due_idx'),
+            models.Index(fields=['ordering_key', 'status'], name='payment_webhook_key_idx'),
+        ]
+        constraints = [
+            # Reentregas do gateway: o mesmo evento só entra uma vez na fila
+            models.UniqueConstraint(fields=['provider', 'event_id'], condition=~models.Q(event_id=''),
+                                    name='payment_webhook_event_uniq'),
+        ]
+
+
+class WebhookCounter(models.Model):
+    """
+    Contadores de webhooks por provedor, no banco para valerem entre workers e
+    sobreviverem a reinícios. Uma linha por provedor, incrementada com F().
+    """
+    provider = models.CharField(max_length=20, choices=WebhookEvent.PROVIDER_CHOICES, unique=True)
+    received = models.PositiveBigIntegerField(default=0)
+    duplicates = models.PositiveBigIntegerField(default=0, help_text="Reentregas descartadas antes do processamento")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.provider}: {self.received} recebidos, {self.duplicates} duplicados"
+
+    class Meta:
+        verbose_name = 'Contador de webhooks'
+        verbose_name_plural = 'Contadores de webhooks'
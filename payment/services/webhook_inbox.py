@@ -0,0 +1,253 @@
+"""
+Caixa de entrada de webhooks (WebhookEvent).
+
+As views só verificam a origem e chamam `enqueue`; o comando `process_webhooks` roda
+`run_worker`, que reivindica lotes de eventos vencidos e os processa num pool de threads.
+Falhas voltam para a fila com backoff exponencial; depois de WEBHOOK_MAX_ATTEMPTS
+(ou num erro permanente, como payload sem id) o evento vira dead-letter e fica no admin.
+
+Reentregas: eventos com o mesmo (provider, event_id) são descartados em `enqueue`, antes
+de qualquer escrita ou chamada ao gateway; `webhook_metrics` conta recebidos e duplicados
+(WebhookCounter, no banco).
+
+Ordem: um evento só é reivindicado se nenhum evento anterior com a mesma `ordering_key`
+estiver pendente ou em processamento. Dead-letters não bloqueiam a fila da chave.
+
+Lease: um evento em processamento fica reservado por WEBHOOK_LEASE_SECONDS. Se o worker
+morre, o lease vence e o evento volta para a fila (ou vira dead-letter, se esgotou as
+tentativas). Um handler que demore mais que o lease pode rodar duas vezes; por isso os
+handlers precisam ser idempotentes (conferem o status do pagamento antes de finalizar) e
+o lease deve ficar bem acima do handler mais lento. O resultado do worker que perdeu o
+lease é descartado.
+"""
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from ..models import WebhookCounter, WebhookEvent
+from .webhook_service import process_abacatepay_event, process_mercadopago_event, process_stripe_event
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK_SIZE = 1000
+
+
+class PermanentWebhookError(Exception):
+    """Erro que não se resolve com nova tentativa: o evento vai direto para dead-letter."""
+
+
+def _from_status(status_code: int, payload: dict) -> None:
+    # 400 = payload sem o que precisamos; 404/5xx podem ser atraso do gateway ou do nosso banco
+    if status_code == 400:
+        raise PermanentWebhookError(payload.get('error', 'bad_request'))
+    if status_code != 200:
+        raise RuntimeError(f"{status_code}: {payload.get('error', '')}")
+
+
+PROCESSORS = {
+    'abacatepay': lambda payload: _from_status(*process_abacatepay_event(payload)),
+    'mercadopago': lambda payload: _from_status(*process_mercadopago_event(payload)),
+    'stripe': process_stripe_event,
+}
+
+
+def max_attempts() -> int:
+    return getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', 8)
+
+
+def retry_delay(attempts: int) -> datetime.timedelta:
+    """30s, 1min, 2min, ... até WEBHOOK_RETRY_MAX_SECONDS (1h)."""
+    base = getattr(settings, 'WEBHOOK_RETRY_BASE_SECONDS', 30)
+    ceiling = getattr(settings, 'WEBHOOK_RETRY_MAX_SECONDS', 3600)
+    return datetime.timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), ceiling))
+
+
+def _count(provider: str, metric: str) -> None:
+    """Incrementa o contador do provedor no banco (um UPDATE; a linha nasce na primeira vez)."""
+    if WebhookCounter.objects.filter(provider=provider).update(**{metric: F(metric) + 1}):
+        return
+    try:
+        with transaction.atomic():
+            WebhookCounter.objects.create(provider=provider, **{metric: 1})
+    except IntegrityError:
+        # Outro worker criou a linha entre o UPDATE e o INSERT
+        WebhookCounter.objects.filter(provider=provider).update(**{metric: F(metric) + 1})
+
+
+def webhook_metrics() -> dict:
+    """{provedor: {'received', 'duplicates'}} acumulados no banco, de todos os workers."""
+    rows = {row['provider']: row for row in WebhookCounter.objects.values('provider', 'received', 'duplicates')}
+    return {
+        provider: {metric: rows.get(provider, {}).get(metric, 0) for metric in ('received', 'duplicates')}
+        for provider, _ in WebhookEvent.PROVIDER_CHOICES
+    }
+
+
+def enqueue(provider: str, payload: dict, event_id: str = '', event_type: str = '',
+            ordering_key: str = '') -> Tuple[Optional[WebhookEvent], bool]:
+    """
+    Grava o evento bruto; é a única escrita feita dentro da requisição do webhook.
+    Retorna (evento, True), ou (None, False) se o gateway reentregou um evento que já está na fila.
+    """
+    event_id = str(event_id or '')[:255]
+    _count(provider, 'received')
+    # Caminho comum da reentrega: uma leitura pelo índice único, sem escrita nem chamada externa
+    if event_id and WebhookEvent.objects.filter(provider=provider, event_id=event_id).exists():
+        _count(provider, 'duplicates')
+        logger.info("Webhook %s duplicado ignorado: %s", provider, event_id)
+        return None, False
+    try:
+        with transaction.atomic():
+            event = WebhookEvent.objects.create(
+                provider=provider,
+                event_id=event_id,
+                event_type=str(event_type or '')[:100],
+                ordering_key=str(ordering_key or '')[:255],
+                payload=payload,
+                next_attempt_at=timezone.now(),
+            )
+    except IntegrityError:
+        # Duas entregas simultâneas: a constraint única decide qual entra
+        _count(provider, 'duplicates')
+        logger.info("Webhook %s duplicado ignorado (concorrente): %s", provider, event_id)
+        return None, False
+    return event, True
+
+
+def claim_batch(limit: int = 20, now: Optional[datetime.datetime] = None) -> List[WebhookEvent]:
+    """
+    Reivindica até `limit` eventos prontos. O UPDATE condicional (status ainda pendente)
+    garante que dois workers não peguem o mesmo evento.
+    """
+    now = now or timezone.now()
+    lease = datetime.timedelta(seconds=getattr(settings, 'WEBHOOK_LEASE_SECONDS', 300))
+
+    # Worker que morreu no meio: o lease vence e o evento volta para a fila,
+    # a não ser que já tenha gasto todas as tentativas
+    expired = WebhookEvent.objects.filter(status=WebhookEvent.STATUS_PROCESSING, locked_until__lt=now)
+    dead = expired.filter(attempts__gte=max_attempts()).update(
+        status=WebhookEvent.STATUS_DEAD, locked_until=None, processed_at=now,
+        last_error='lease expirado após a última tentativa',
+    )
+    if dead:
+        logger.error("%s webhook(s) em dead-letter por lease expirado na última tentativa", dead)
+    expired.update(status=WebhookEvent.STATUS_PENDING, locked_until=None)
+
+    earlier_open = WebhookEvent.objects.filter(
+        ordering_key=OuterRef('ordering_key'),
+        id__lt=OuterRef('id'),
+        status__in=[WebhookEvent.STATUS_PENDING, WebhookEvent.STATUS_PROCESSING],
+    ).exclude(ordering_key='')
+    candidates = list(
+        WebhookEvent.objects.filter(status=WebhookEvent.STATUS_PENDING, next_attempt_at__lte=now)
+        .filter(~Exists(earlier_open))
+        .order_by('id')
+        .values_list('id', flat=True)[:limit]
+    )
+
+    claimed = []
+    for event_id in candidates:
+        updated = WebhookEvent.objects.filter(id=event_id, status=WebhookEvent.STATUS_PENDING).update(
+            status=WebhookEvent.STATUS_PROCESSING,
+            locked_until=now + lease,
+            attempts=F('attempts') + 1,
+        )
+        if updated:
+            claimed.append(event_id)
+    return list(WebhookEvent.objects.filter(id__in=claimed).order_by('id'))
+
+
+def process_event(event: WebhookEvent) -> str:
+    """Processa um evento já reivindicado e devolve o status final dele."""
+    lease = event.locked_until
+    try:
+        processor = PROCESSORS.get(event.provider)
+        if processor is None:
+            raise PermanentWebhookError(f"provedor desconhecido: {event.provider}")
+        processor(event.payload)
+    except Exception as e:
+        now = timezone.now()
+        event.last_error = f"{type(e).__name__}: {e}"[:2000]
+        event.locked_until = None
+        if isinstance(e, PermanentWebhookError) or event.attempts >= max_attempts():
+            event.status = WebhookEvent.STATUS_DEAD
+            event.processed_at = now
+            logger.error("Webhook %s #%s em dead-letter após %s tentativa(s): %s",
+                         event.provider, event.pk, event.attempts, event.last_error)
+        else:
+            event.status = WebhookEvent.STATUS_PENDING
+            event.next_attempt_at = now + retry_delay(event.attempts)
+            logger.warning("Webhook %s #%s falhou (tentativa %s), nova tentativa em %s: %s",
+                           event.provider, event.pk, event.attempts, event.next_attempt_at, event.last_error)
+    else:
+        event.status = WebhookEvent.STATUS_DONE
+        event.processed_at = timezone.now()
+        event.locked_until = None
+        event.last_error = ''
+    fields = ('status', 'processed_at', 'locked_until', 'last_error', 'next_attempt_at')
+    # Só grava se o lease ainda é nosso: senão outro worker já reivindicou o evento
+    updated = WebhookEvent.objects.filter(
+        pk=event.pk, status=WebhookEvent.STATUS_PROCESSING, locked_until=lease
+    ).update(**{field: getattr(event, field) for field in fields})
+    if not updated:
+        logger.warning("Webhook %s #%s: lease perdido durante o processamento, resultado descartado",
+                       event.provider, event.pk)
+    return event.status
+
+
+def _process_in_thread(event: WebhookEvent) -> str:
+    try:
+        return process_event(event)
+    finally:
+        close_old_connections()
+
+
+def process_pending(workers: int = 4, batch_size: int = 20) -> dict:
+    """Processa um lote. Com workers <= 1 roda na thread atual (útil em testes e depuração)."""
+    events = claim_batch(batch_size)
+    stats = {'claimed': len(events), 'done': 0, 'retry': 0, 'dead': 0}
+    if not events:
+        return stats
+    if workers <= 1:
+        results = [process_event(event) for event in events]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_process_in_thread, events))
+    for status in results:
+        stats['retry' if status == WebhookEvent.STATUS_PENDING else status] += 1
+    return stats
+
+
+def run_worker(workers: int = 4, batch_size: int = 20, once: bool = False, poll_interval: float = 1.0) -> dict:
+    """Laço do worker: processa lotes até a fila esvaziar (once) ou para sempre."""
+    totals = {'claimed': 0, 'done': 0, 'retry': 0, 'dead': 0}
+    while True:
+        stats = process_pending(workers, batch_size)
+        for key, value in stats.items():
+            totals[key] += value
+        if not stats['claimed']:
+            if once:
+                return totals
+            time.sleep(poll_interval)
+
+
+def prune_processed(retention_days: int = None) -> int:
+    """Apaga eventos processados além da retenção; dead-letters ficam para análise."""
+    retention_days = retention_days if retention_days is not None else getattr(settings, 'WEBHOOK_RETENTION_DAYS', 30)
+    cutoff = timezone.now() - datetime.timedelta(days=retention_days)
+    removed = 0
+    while True:
+        ids = list(WebhookEvent.objects.filter(
+            status=WebhookEvent.STATUS_DONE, processed_at__lt=cutoff
+        ).values_list('id', flat=True)[:DELETE_CHUNK_SIZE])
+        if not ids:
+            break
+        removed += WebhookEvent.objects.filter(id__in=ids).delete()[0]
+    return removed
@@ -5,6 +5,8 @@ from usuario.models import CustomUser
 from datetime import datetime
 from typing import Optional
 from django.db.models import Q
+import hashlib
+import hmac
 import logging
 import requests
 from server.settings import MERCADOPAGO_ACCESS_TOKEN
@@ -64,25 +66,22 @@ def handle_checkout_session_completed(event_data: dict) -> bool:
             print(f"WEBHOOK: Ainda não processamos subscription por aqui, {user_email}, transação {transaction_id}.")
             return True
     else:
+        # Pagamento assíncrono ainda não confirmado: nada a fazer, não é falha a repetir
         print(f"SERVICE: Checkout Session com status de pagamento '{status}' não processado.")
-        return False
+        return True
 
 def handle_invoice_paid(event_data):
     invoice = event_data['object']
     subscription = event_data['object']
     customer_id = subscription.get('customer')
 
-    try:
-        dt_expiracao = get_invoice_period_end_datetime(subscription)
-        if not dt_expiracao:
-            print(f"SERVICE: Não foi possível obter o período de fim da fatura para o cliente {customer_id}.")
-            return
+    # Erros da API do Stripe ou do banco sobem: a caixa de entrada repete o evento
+    dt_expiracao = get_invoice_period_end_datetime(subscription)
+    if not dt_expiracao:
+        print(f"SERVICE: Não foi possível obter o período de fim da fatura para o cliente {customer_id}.")
+        return False
 
-        return update_vip_status(customer_id, dt_expiracao)
-    except CustomUser.DoesNotExist:
-        print(f"SERVICE: Usuário com ID {customer_id} não encontrado.")
-    except Exception as e:
-        print(f"SERVICE: Erro ao atualizar VIP do usuário: {e}")
+    return update_vip_status(customer_id, dt_expiracao)
 
 def handle_invoice_payment_failed(event_data):
     invoice = event_data['object']
@@ -97,7 +96,7 @@ def handle_subscription_updated(event_data):
     dt_expiracao = get_subscription_current_period_end_datetime(subscription)
     if not dt_expiracao:
         print(f"SERVICE: Não foi possível obter o período de fim da fatura para o e-mail {customer_id}.")
-        return
+        return False
     return update_vip_status(customer_id, dt_expiracao)
 
     
@@ -197,6 +196,47 @@ def update_vip_status(customer_id, dt_expiracao: datetime) -> bool:
     return True
 
 
+def mercadopago_payment_id(data: dict) -> Optional[str]:
+    """Extrai o id do pagamento dos vários formatos de notificação do MercadoPago."""
+    payment_id = None
+    if data.get('data') and isinstance(data.get('data'), dict):
+        payment_id = data.get('data', {}).get('id')
+
+    # Alguns webhooks usam 'resource' com URL
+    if not payment_id:
+        resource = data.get('resource')
+        if isinstance(resource, str) and '/payments/' in resource:
+            payment_id = resource.rstrip('/').split('/')[-1]
+
+    return str(payment_id) if payment_id else None
+
+
+def mercadopago_signature_valid(signature: str, request_id: str, data_id: str, secret: str) -> bool:
+    """Confere o cabeçalho x-signature (ts=...,v1=...) de uma notificação do MercadoPago.
+
+    v1 é o HMAC-SHA256, com o segredo do webhook, do manifesto
+    "id:{data.id};request-id:{x-request-id};ts:{ts};" (partes ausentes ficam de fora).
+    """
+    if not (secret and signature):
+        return False
+    parts = {}
+    for item in signature.split(','):
+        key, _, value = item.partition('=')
+        parts[key.strip()] = value.strip()
+    ts, v1 = parts.get('ts'), parts.get('v1')
+    if not (ts and v1):
+        return False
+    manifest = ''
+    if data_id:
+        # IDs alfanuméricos entram em minúsculas, como o MP assina
+        manifest += f'id:{str(data_id).lower()};'
+    if request_id:
+        manifest += f'request-id:{request_id};'
+    manifest += f'ts:{ts};'
+    expected = hmac.new(secret.encode('utf-8'), manifest.encode('utf-8'), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, v1)
+
+
 def process_mercadopago_event(data: dict):
     """Processa payload de webhook do MercadoPago.
 
@@ -214,17 +254,7 @@ def process_mercadopago_event(data: dict):
         logger.info("MercadoPago webhook (não-pagamento) recebido: action=%s topic=%s type=%s", action, topic, type_field)
         return 200, {"status": "ignored_non_payment_event", "action": action or topic or type_field}
 
-    # Extrair payment_id de vários formatos possíveis
-    payment_id = None
-    if data.get('data') and isinstance(data.get('data'), dict):
-        payment_id = data.get('data', {}).get('id')
-
-    # Alguns webhooks usam 'resource' com URL
-    if not payment_id:
-        resource = data.get('resource')
-        if isinstance(resource, str) and '/payments/' in resource:
-            payment_id = resource.rstrip('/').split('/')[-1]
-
+    payment_id = mercadopago_payment_id(data)
     if not payment_id:
         logger.error("Webhook MercadoPago: ID do pagamento ausente no payload")
         return 400, {"error": "missing_payment_id"}
@@ -303,4 +333,86 @@ def process_mercadopago_event(data: dict):
                 PaymentService._finalize_payment(payment, old_status=old_status)
             except Exception:
                 logger.exception("Erro ao finalizar pagamento após webhook MP (fallback)")
-        return 200, {"status": "success", "mp_status": mp_status_raw, "payment_status": payment.status}
\ No newline at end of file
+        return 200, {"status": "success", "mp_status": mp_status_raw, "payment_status": payment.status}
+
+
+def process_abacatepay_event(data: dict):
+    """Processa payload de webhook do AbacatePay (billing pago ou com outro status).
+
+    Retorna (status_code, response_dict), no mesmo formato de process_mercadopago_event.
+    """
+    logger = logging.getLogger(__name__)
+    payload = data.get("data")
+    billing = payload.get("billing", {}) if payload else {}
+
+    gateway_pay_id = billing.get("id")
+    amount = billing.get("amount", 0)
+    paid_amount = billing.get("paidAmount", 0)
+    status = (billing.get("status") or "").lower()
+
+    if paid_amount != amount:
+        logger.warning(f"Webhook AbacatePay: Aviso de valor divergente - amount: {amount}, paid_amount: {paid_amount}")
+
+    if not gateway_pay_id:
+        logger.error("Webhook AbacatePay: ID do pagamento ausente")
+        return 400, {"error": "missing_payment_id"}
+
+    payment = Payment.objects.filter(
+        gateway_payment_id=gateway_pay_id,
+        gateway='abacatepay'
+    ).first()
+
+    if not payment:
+        logger.warning(f"Webhook AbacatePay: Pagamento não encontrado para ID {gateway_pay_id}")
+        return 404, {"error": "payment_not_found"}
+
+    old_status = payment.status
+    payment_id = payment.transaction_id
+    if status == 'paid':
+        payment.status = 'completed'
+        if old_status != 'completed':
+            try:
+                PaymentService._register_svg_purchases(payment)
+            except Exception as e:
+                logger.exception(f"Erro ao registrar compras de SVGs: {e}")
+        payment.save()
+        logger.info(f"Pagamento {payment_id} atualizado: {old_status} -> {payment.status}")
+    else:
+        # Para outros status, apenas atualizar
+        payment.gateway_response = data
+        payment.status = PaymentService.STATUS_MAP.get(status, payment.status)
+        payment.save()
+        logger.info(f"Status do pagamento {payment_id} atualizado para {payment.status}")
+
+    return 200, {"status": "success", "payment_status": payment.status}
+
+
+EVENT_HANDLER_MAP = {
+    # Cliente se inscreveu
+    'checkout.session.completed': handle_checkout_session_completed,
+    # Renovação paga
+    'invoice.paid': handle_invoice_paid,
+    # Renovação falhou
+    'invoice.payment_failed': handle_invoice_payment_failed,
+    # Cliente mudou o plano ou agendou cancelamento
+    'customer.subscription.updated': handle_subscription_updated,
+    # Assinatura efetivamente cancelada (acesso removido)
+    'customer.subscription.deleted': handle_subscription_deleted,
+}
+
+
+def process_stripe_event(event: dict):
+    """Despacha um evento Stripe (já verificado) para o handler do tipo.
+
+    Handler que devolve False falhou: levanta RuntimeError para a caixa de entrada
+    repetir o evento (e mandá-lo para dead-letter), em vez de marcá-lo como feito.
+    Tipos sem handler são só registrados.
+    """
+    event_type = event.get('type')
+    handler = EVENT_HANDLER_MAP.get(event_type)
+    if handler is None:
+        handle_unmanaged_event(event)
+        return True
+    if handler(event.get('data') or {}) is False:
+        raise RuntimeError(f"handler de '{event_type}' não concluiu o evento {event.get('id', '')}")
+    return True
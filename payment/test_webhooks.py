@@ -0,0 +1,259 @@
+import datetime
+import hashlib
+import hmac
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from payment.models import Payment, WebhookEvent
+from payment.services import webhook_inbox
+
+User = get_user_model()
+
+
+def abacate_body(billing_id, status='PAID'):
+    return json.dumps({
+        'event': 'billing.paid',
+        'data': {'billing': {'id': billing_id, 'amount': 1000, 'paidAmount': 1000, 'status': status}},
+    })
+
+
+@override_settings(WEBHOOK_RETRY_BASE_SECONDS=30, WEBHOOK_MAX_ATTEMPTS=3)
+@patch('payment.views.views_webhook.ABACATE_WEBHOOK_SECRET', 'segredo')
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='comprador', email='c@example.com', password='x')
+        self.payment = Payment.objects.create(
+            user=self.user, gateway='abacatepay', amount=10, gateway_payment_id='bill_1'
+        )
+        self.url = reverse('payment:abacatepay_webhook') + '?webhookSecret=segredo'
+
+    def post_abacate(self, billing_id='bill_1', status='PAID'):
+        return self.client.post(self.url, data=abacate_body(billing_id, status), content_type='application/json')
+
+    def test_view_only_enqueues(self):
+        with patch('payment.services.webhook_service.process_abacatepay_event') as processor:
+            response = self.post_abacate()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'queued')
+        processor.assert_not_called()
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.ordering_key, 'abacatepay:bill_1')
+        self.assertEqual(event.status, WebhookEvent.STATUS_PENDING)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+
+    def test_view_still_rejects_bad_secret_and_missing_id(self):
+        bad = self.client.post(reverse('payment:abacatepay_webhook') + '?webhookSecret=errado',
+                               data=abacate_body('bill_1'), content_type='application/json')
+        self.assertEqual(bad.status_code, 403)
+        self.assertEqual(self.post_abacate(billing_id=None).status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_worker_completes_payment(self):
+        self.post_abacate()
+        stats = webhook_inbox.run_worker(workers=1, once=True)
+        self.assertEqual(stats['done'], 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.STATUS_DONE)
+        self.assertEqual(event.attempts, 1)
+
+    def test_same_key_waits_for_earlier_event(self):
+        self.post_abacate(status='PENDING')
+        self.post_abacate(status='PAID')
+        first, second = WebhookEvent.objects.order_by('id')
+
+        claimed = webhook_inbox.claim_batch(10)
+        self.assertEqual([e.pk for e in claimed], [first.pk])
+
+        # Primeiro evento falha e vai para backoff: o segundo continua bloqueado
+        with patch.dict(webhook_inbox.PROCESSORS, {'abacatepay': lambda payload: 1 / 0}):
+            self.assertEqual(webhook_inbox.process_event(claimed[0]), WebhookEvent.STATUS_PENDING)
+        self.assertEqual(webhook_inbox.claim_batch(10), [])
+
+        later = timezone.now() + datetime.timedelta(minutes=5)
+        self.assertEqual([e.pk for e in webhook_inbox.claim_batch(10, now=later)], [first.pk])
+
+    def test_other_keys_are_not_blocked(self):
+        Payment.objects.create(user=self.user, gateway='abacatepay', amount=10, gateway_payment_id='bill_2')
+        self.post_abacate('bill_1')
+        self.post_abacate('bill_2')
+        self.assertEqual(len(webhook_inbox.claim_batch(10)), 2)
+
+    def test_retries_with_backoff_then_dead_letter(self):
+        self.post_abacate(billing_id='bill_inexistente')
+        event = WebhookEvent.objects.get()
+        now = timezone.now()
+        for attempt in (1, 2):
+            [claimed] = webhook_inbox.claim_batch(10, now=now)
+            self.assertEqual(webhook_inbox.process_event(claimed), WebhookEvent.STATUS_PENDING)
+            claimed.refresh_from_db()
+            self.assertIn('payment_not_found', claimed.last_error)
+            self.assertGreaterEqual(claimed.next_attempt_at - timezone.now(),
+                                    datetime.timedelta(seconds=30 * 2 ** (attempt - 1) - 5))
+            now = claimed.next_attempt_at
+        [claimed] = webhook_inbox.claim_batch(10, now=now)
+        self.assertEqual(webhook_inbox.process_event(claimed), WebhookEvent.STATUS_DEAD)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 3)
+
+    def test_permanent_error_goes_straight_to_dead_letter(self):
+        webhook_inbox.enqueue('abacatepay', {'data': {}})
+        stats = webhook_inbox.run_worker(workers=1, once=True)
+        self.assertEqual(stats['dead'], 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        self.post_abacate()
+        [claimed] = webhook_inbox.claim_batch(10)
+        self.assertEqual(webhook_inbox.claim_batch(10), [])
+        later = timezone.now() + datetime.timedelta(hours=1)
+        self.assertEqual([e.pk for e in webhook_inbox.claim_batch(10, now=later)], [claimed.pk])
+
+    def test_expired_lease_on_last_attempt_goes_to_dead_letter(self):
+        self.post_abacate()
+        WebhookEvent.objects.update(attempts=2)
+        [claimed] = webhook_inbox.claim_batch(10)
+        later = timezone.now() + datetime.timedelta(hours=1)
+        self.assertEqual(webhook_inbox.claim_batch(10, now=later), [])
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.attempts), (WebhookEvent.STATUS_DEAD, 3))
+        self.assertIn('lease', claimed.last_error)
+
+    def test_result_of_worker_that_lost_the_lease_is_discarded(self):
+        self.post_abacate()
+        [slow] = webhook_inbox.claim_batch(10)
+        later = timezone.now() + datetime.timedelta(hours=1)
+        [other] = webhook_inbox.claim_batch(10, now=later)
+        webhook_inbox.process_event(slow)
+        other.refresh_from_db()
+        self.assertEqual(other.status, WebhookEvent.STATUS_PROCESSING)
+
+
+@patch('payment.views.views_webhook.ABACATE_WEBHOOK_SECRET', 'segredo')
+class WebhookDeduplicationTests(TestCase):
+    def setUp(self):
+        self.url = reverse('payment:abacatepay_webhook') + '?webhookSecret=segredo'
+
+    def post_abacate(self, status='PAID'):
+        return self.client.post(self.url, data=abacate_body('bill_1', status), content_type='application/json')
+
+    def test_redelivery_is_dropped_before_processing(self):
+        self.assertEqual(self.post_abacate().json()['status'], 'queued')
+        self.assertEqual(self.post_abacate().json(), {'status': 'duplicate'})
+        self.assertEqual(WebhookEvent.objects.get().event_id, 'bill_1:paid')
+        # Mudança de status do mesmo billing é um evento novo
+        self.assertEqual(self.post_abacate(status='REFUNDED').json()['status'], 'queued')
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+
+    def test_duplicate_after_processing_does_not_reprocess(self):
+        event, created = webhook_inbox.enqueue('mercadopago', {'id': 99, 'data': {'id': '1'}}, event_id='99')
+        WebhookEvent.objects.filter(pk=event.pk).update(status=WebhookEvent.STATUS_DONE)
+        self.assertEqual(webhook_inbox.enqueue('mercadopago', {'id': 99}, event_id='99'), (None, False))
+        with patch('payment.services.webhook_service.requests.get') as api:
+            webhook_inbox.run_worker(workers=1, once=True)
+        api.assert_not_called()
+
+    def test_events_without_id_are_not_deduplicated(self):
+        webhook_inbox.enqueue('mercadopago', {'topic': 'payment'})
+        webhook_inbox.enqueue('mercadopago', {'topic': 'payment'})
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+
+    def test_metrics_count_dropped_duplicates(self):
+        for _ in range(3):
+            self.post_abacate()
+        webhook_inbox.enqueue('stripe', {}, event_id='evt_1')
+        metrics = webhook_inbox.webhook_metrics()
+        self.assertEqual(metrics['abacatepay'], {'received': 3, 'duplicates': 2})
+        self.assertEqual(metrics['stripe'], {'received': 1, 'duplicates': 0})
+        self.assertEqual(metrics['mercadopago'], {'received': 0, 'duplicates': 0})
+
+    def test_metrics_are_shared_through_the_database(self):
+        from payment.models import WebhookCounter
+
+        self.post_abacate()
+        self.post_abacate()
+        self.assertEqual(WebhookCounter.objects.values_list('provider', 'received', 'duplicates').get(),
+                         ('abacatepay', 2, 1))
+
+
+def mercadopago_signature(data_id, request_id, ts, secret='mp-segredo'):
+    manifest = f'id:{data_id};request-id:{request_id};ts:{ts};'
+    return f"ts={ts},v1={hmac.new(secret.encode(), manifest.encode(), hashlib.sha256).hexdigest()}"
+
+
+@patch('payment.views.views_webhook.MERCADOPAGO_WEBHOOK_SECRET', 'mp-segredo')
+class MercadoPagoWebhookTests(TestCase):
+    body = json.dumps({'id': 12345, 'action': 'payment.updated', 'data': {'id': '987'}})
+
+    def post(self, signature, data_id='987'):
+        url = reverse('payment:mercadopago_webhook') + f'?data.id={data_id}&type=payment'
+        return self.client.post(url, data=self.body, content_type='application/json',
+                                HTTP_X_SIGNATURE=signature, HTTP_X_REQUEST_ID='req-1')
+
+    def test_signed_notification_is_enqueued(self):
+        response = self.post(mercadopago_signature('987', 'req-1', '1700000000'))
+        self.assertEqual(response.json()['status'], 'queued')
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.event_id, event.ordering_key), ('12345', 'mercadopago:987'))
+
+    def test_forged_or_missing_signature_is_rejected_before_enqueue(self):
+        self.assertEqual(self.post('').status_code, 403)
+        self.assertEqual(self.post(mercadopago_signature('987', 'req-1', '1', secret='outro')).status_code, 403)
+        # Assinatura válida de outro pagamento não serve para este corpo
+        self.assertEqual(self.post(mercadopago_signature('111', 'req-1', '1'), data_id='111').status_code, 403)
+        self.assertFalse(WebhookEvent.objects.exists())
+        # A entrega real não foi bloqueada pela deduplicação
+        self.assertEqual(self.post(mercadopago_signature('987', 'req-1', '1')).json()['status'], 'queued')
+
+
+class StripeWebhookTests(TestCase):
+    def test_verified_event_is_enqueued_with_customer_key(self):
+        body = json.dumps({
+            'id': 'evt_1', 'type': 'invoice.paid',
+            'data': {'object': {'customer': 'cus_1'}},
+        })
+        with patch('stripe.Webhook.construct_event', return_value={}):
+            response = self.client.post(reverse('payment:stripe_webhook'), data=body, content_type='application/json',
+                                        HTTP_STRIPE_SIGNATURE='t=1,v1=x')
+        self.assertEqual(response.status_code, 200)
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.event_id, event.event_type, event.ordering_key), ('evt_1', 'invoice.paid', 'stripe:cus_1'))
+
+        with patch('stripe.Webhook.construct_event', return_value={}):
+            again = self.client.post(reverse('payment:stripe_webhook'), data=body, content_type='application/json',
+                                     HTTP_STRIPE_SIGNATURE='t=1,v1=x')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.client.post(reverse('payment:stripe_webhook'), data='{}', content_type='application/json',
+                                    HTTP_STRIPE_SIGNATURE='t=1,v1=x')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_worker_dispatches_to_handler(self):
+        webhook_inbox.enqueue('stripe', {'id': 'evt_2', 'type': 'invoice.paid', 'data': {'object': {}}})
+        with patch.dict('payment.services.webhook_service.EVENT_HANDLER_MAP', {'invoice.paid': lambda data: True}):
+            stats = webhook_inbox.run_worker(workers=1, once=True)
+        self.assertEqual(stats['done'], 1)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failed_handler_is_retried_not_marked_done(self):
+        webhook_inbox.enqueue('stripe', {'id': 'evt_3', 'type': 'invoice.paid', 'data': {'object': {}}})
+        with patch.dict('payment.services.webhook_service.EVENT_HANDLER_MAP', {'invoice.paid': lambda data: False}):
+            stats = webhook_inbox.run_worker(workers=1, once=True)
+            self.assertEqual((stats['done'], stats['retry']), (0, 1))
+            WebhookEvent.objects.update(next_attempt_at=timezone.now())
+            stats = webhook_inbox.run_worker(workers=1, once=True)
+        self.assertEqual(stats['dead'], 1)
+        self.assertIn('invoice.paid', WebhookEvent.objects.get().last_error)
+
+    def test_unmanaged_event_type_is_done(self):
+        webhook_inbox.enqueue('stripe', {'id': 'evt_4', 'type': 'customer.created', 'data': {'object': {}}})
+        self.assertEqual(webhook_inbox.run_worker(workers=1, once=True)['done'], 1)
@@ -6,7 +6,8 @@ from ..views.views_stripe import get_stripe_payment_data
 from ..views.views_abacate import get_abacate_payment_data
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
-from ..models import Payment
+from ..models import Payment, PaymentItem
+from core.utils.serialization import FastJsonResponse
 from ..services.payment_service import PaymentService
 from message.views import notify_discord
 
@@ -266,33 +267,30 @@ def simulate_payment_view(request):
 @login_required
 def list_user_payments(request):
     """Lista todos os pagamentos do usuário"""
-    payments = Payment.objects.filter(user=request.user).prefetch_related('items').order_by('-created_at')[:20]
+    payments = list(
+        Payment.objects.filter(user=request.user).order_by('-created_at').values(
+            'id', 'transaction_id', 'gateway', 'plan', 'amount', 'currency', 'status', 'created_at', 'completed_at',
+        )[:20]
+    )
+    # Itens de todos os pagamentos em uma única query, agrupados em memória
+    items_by_payment = {p['id']: [] for p in payments}
+    items = PaymentItem.objects.filter(payment_id__in=list(items_by_payment)).order_by('id').values(
+        'payment_id', 'item_type', 'item_name', 'quantity', 'unit_price', 'total_price',
+    )
+    for item in items:
+        items_by_payment[item['payment_id']].append({
+            "type": item['item_type'],
+            "name": item['item_name'],
+            "quantity": item['quantity'],
+            "unit_price": item['unit_price'],
+            "total_price": item['total_price'],
+        })
+    for p in payments:
+        p['items'] = items_by_payment[p.pop('id')]
     
-    return JsonResponse({
+    return FastJsonResponse({
         "status": "success",
-        "payments": [
-            {
-                "transaction_id": p.transaction_id,
-                "gateway": p.gateway,
-                "plan": p.plan,
-                "amount": str(p.amount),
-                "currency": p.currency,
-                "status": p.status,
-                "items": [
-                    {
-                        "type": item.item_type,
-                        "name": item.item_name,
-                        "quantity": item.quantity,
-                        "unit_price": str(item.unit_price),
-                        "total_price": str(item.total_price),
-                    }
-                    for item in p.items.all()
-                ],
-                "created_at": p.created_at.isoformat(),
-                "completed_at": p.completed_at.isoformat() if p.completed_at else None,
-            }
-            for p in payments
-        ]
+        "payments": payments,
     })
 
 
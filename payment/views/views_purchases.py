@@ -4,8 +4,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from ..models import Purchase
+from django.db.models import F
 from ..serializers import PurchasedSvgSerializer
 from core.models import SvgFile
+from core.utils.serialization import FastJsonResponse
 
 
 @login_required
@@ -43,18 +45,21 @@ def purchased_svgs_api(request, user_id):
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
     if request.user.is_vip:
-        return JsonResponse({
+        return FastJsonResponse({
             'is_vip': True,
             'message': 'Usuário VIP tem acesso a todos os SVGs',
             'purchases': []
         })
     
-    purchases = Purchase.objects.filter(user=request.user).select_related('svg').order_by('-purchased_at')
-    serializer = PurchasedSvgSerializer(purchases, many=True)
+    # Mesmos campos do PurchasedSvgSerializer, projetados direto do banco (JOIN, sem instâncias)
+    purchases = Purchase.objects.filter(user=request.user).order_by('-purchased_at').values(
+        'id', 'svg_id', 'price', 'payment_method', 'purchased_at',
+        svg_title=F('svg__title_name'), svg_price=F('svg__price'),
+    )
     
-    return JsonResponse({
+    return FastJsonResponse({
         'is_vip': False,
-        'purchases': serializer.data
+        'purchases': list(purchases)
     })
 
 
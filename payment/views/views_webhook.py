@@ -14,8 +14,9 @@ from django.db.models import Q
 from ..services.payment_service import PaymentService
 from ..services.stripe_service import stripe_signature_verification
 from ..services.webhook_service import *
+from ..services.webhook_inbox import enqueue
 from usuario.views.views_vip import add_vip_to_user_by_hash
-from server.settings import MERCADOPAGO_ACCESS_TOKEN, STRIPE_WEBHOOK_CHECKOUT, ABACATE_WEBHOOK_SECRET
+from server.settings import MERCADOPAGO_ACCESS_TOKEN, MERCADOPAGO_WEBHOOK_SECRET, STRIPE_WEBHOOK_CHECKOUT, ABACATE_WEBHOOK_SECRET
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -27,8 +28,8 @@ def abacatepay_webhook(request):
     """
     Webhook para receber notificações do AbacatePay quando um pagamento for confirmado.
     
-    O AbacatePay envia uma notificação POST quando o status do pagamento muda.
-    Esperamos um payload JSON com pelo menos: {"id": "payment_id", "status": "confirmed"}
+    Só valida o secret e o formato e grava o evento na caixa de entrada (WebhookEvent);
+    o processamento fica com `manage.py process_webhooks`.
     """
     secret_da_url = request.GET.get('webhookSecret') 
 
@@ -40,65 +41,26 @@ def abacatepay_webhook(request):
     except json.JSONDecodeError:
         logger.error("Webhook AbacatePay: JSON inválido")
         return JsonResponse({"error": "invalid_json"}, status=400)
-    payload = data.get("data")
-    billing = payload.get("billing", {}) if payload else {}
+    payload = data.get("data") if isinstance(data, dict) else None
+    billing = payload.get("billing", {}) if isinstance(payload, dict) else {}
 
     gateway_pay_id = billing.get("id")
-    amount = billing.get("amount", 0)
-    paid_amount = billing.get("paidAmount", 0)
-    status = billing.get("status", "")
-
-    if paid_amount != amount:
-        logger.warning(f"Webhook AbacatePay: Aviso de valor divergente - amount: {amount}, paid_amount: {paid_amount}")
-    amount = float(amount) / 100  # Usar o valor pago efetivamente
-
     if not gateway_pay_id:
         logger.error("Webhook AbacatePay: ID do pagamento ausente")
         return JsonResponse({"error": "missing_payment_id"}, status=400)
 
-    logger.info(f"Webhook AbacatePay recebido: payment_id={gateway_pay_id}, status={status}")
-
-    try:
-        # Buscar o pagamento no banco pelo gateway_payment_id
-        payment = Payment.objects.filter(
-            gateway_payment_id=gateway_pay_id,
-            gateway='abacatepay'
-        ).first()
-
-        if not payment:
-            logger.warning(f"Webhook AbacatePay: Pagamento não encontrado para ID {gateway_pay_id}")
-            return JsonResponse({"error": "payment_not_found"}, status=404)
-
-        # Atualizar o status do pagamento
-        old_status = payment.status
-        # Se o status for "confirmed" ou "paid", marcar como completado
-        status = status.lower()
-        payment_id = payment.transaction_id
-        if status == 'paid':
-            logger.info(f"Pagamento {payment_id} atualizado: {old_status} -> {payment.status}")
-            payment.status = 'completed'
-            if old_status != 'completed':
-                    try:
-                        PaymentService._register_svg_purchases(payment)
-                    except Exception as e:
-                        logger.exception(f"Erro ao registrar compras de SVGs: {e}")
-            payment.save()
-        else:
-            # Para outros status, apenas atualizar
-            payment.gateway_response = data
-            payment.status = PaymentService.STATUS_MAP.get(status, payment.status)
-            payment.save()
-            logger.info(f"Status do pagamento {payment_id} atualizado para {payment.status}")
-
-        return JsonResponse({
-            "status": "success",
-            "message": "Webhook processado com sucesso",
-            "payment_status": payment.status
-        })
-
-    except Exception as e:
-        logger.error(f"Erro ao processar webhook AbacatePay: {e}", exc_info=True)
-        return JsonResponse({"error": "internal_error"}, status=500)
+    # O AbacatePay reenvia o mesmo billing/status até receber 200: esse par identifica a entrega
+    status = str(billing.get("status") or "").lower()
+    event, created = enqueue(
+        'abacatepay', data,
+        event_id=f"{gateway_pay_id}:{status}",
+        event_type=data.get("event", ""),
+        ordering_key=f"abacatepay:{gateway_pay_id}",
+    )
+    if not created:
+        return JsonResponse({"status": "duplicate"})
+    logger.info(f"Webhook AbacatePay enfileirado: payment_id={gateway_pay_id}, evento={event.pk}")
+    return JsonResponse({"status": "queued", "event": event.pk})
 
 @csrf_exempt
 @require_POST
@@ -125,37 +87,42 @@ def mercadopago_webhook(request):
     Webhook para receber notificações do Mercado Pago.
 
     Recebe payload com: {"action": "payment.created", "data": {"id": "..."}, ...}
-    Busca o detalhe do pagamento usando o `MERCADOPAGO_ACCESS_TOKEN` e atualiza o Payment local.
+    Confere o x-signature com MERCADOPAGO_WEBHOOK_SECRET e grava o evento na caixa de
+    entrada; a consulta à API do MP e a atualização do Payment são feitas pelo worker
+    (process_mercadopago_event). Notificações sem assinatura válida são recusadas antes
+    de qualquer escrita, então não ocupam o id de deduplicação de uma entrega real.
     """
-    # Delegate processing to service to reduce duplication and keep view leve
     try:
         data = json.loads(request.body)
     except json.JSONDecodeError:
         logger.error("Webhook MercadoPago: JSON inválido")
         return JsonResponse({"error": "invalid_json"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "invalid_json"}, status=400)
 
-    # process_mercadopago_event retorna (status_code, payload)
-    try:
-        status_code, payload = process_mercadopago_event(data)
-    except Exception as e:
-        logger.exception("Erro inesperado ao processar webhook MP: %s", e)
-        return JsonResponse({"error": "internal_error"}, status=500)
-
-    return JsonResponse(payload, status=status_code)
-
+    payment_id = mercadopago_payment_id(data)
+    # O MP assina o data.id da query string; o do corpo precisa ser o mesmo
+    signed_id = request.GET.get('data.id') or payment_id
+    if payment_id and str(signed_id).lower() != payment_id.lower():
+        logger.error("Webhook MercadoPago: data.id da URL difere do corpo")
+        return JsonResponse({"error": "unauthorized"}, status=403)
+    if not mercadopago_signature_valid(
+        request.headers.get('x-signature', ''), request.headers.get('x-request-id', ''),
+        signed_id, MERCADOPAGO_WEBHOOK_SECRET,
+    ):
+        logger.error("Webhook MercadoPago: assinatura inválida ou ausente")
+        return JsonResponse({"error": "unauthorized"}, status=403)
 
-EVENT_HANDLER_MAP = {
-    # Cliente se inscreveu
-    'checkout.session.completed': handle_checkout_session_completed,
-    # Renovação paga
-    'invoice.paid': handle_invoice_paid,
-    # Renovação falhou
-    'invoice.payment_failed': handle_invoice_payment_failed,
-    # Cliente mudou o plano ou agendou cancelamento
-    'customer.subscription.updated': handle_subscription_updated,
-    # Assinatura efetivamente cancelada (acesso removido)
-    'customer.subscription.deleted': handle_subscription_deleted,
-}
+    # `id` é o da notificação (reentregas repetem o mesmo); o formato antigo (topic/resource) não traz id
+    event, created = enqueue(
+        'mercadopago', data,
+        event_id=data.get('id') or '',
+        event_type=data.get('action') or data.get('type') or data.get('topic') or '',
+        ordering_key=f"mercadopago:{payment_id}" if payment_id else '',
+    )
+    if not created:
+        return JsonResponse({"status": "duplicate"})
+    return JsonResponse({"status": "queued", "event": event.pk})
 
 
 @csrf_exempt
@@ -170,22 +137,19 @@ def stripe_webhook(request):
     except ValueError as e:
         print(f"WEBHOOK ERRO: Payload inválido. {e}")
         return HttpResponse(status=400)
-    except stripe.error.SignatureVerificationError as e:
+    except stripe.SignatureVerificationError as e:
         print(f"WEBHOOK ERRO: Assinatura inválida. {e}")
         return HttpResponse(status=400)
 
-    event_type = event['type']
-    event_data = event['data']
-
-    handler = EVENT_HANDLER_MAP.get(
-        event_type, 
-        handle_unmanaged_event
+    # Assinatura conferida: o corpo bruto vai para a fila e o handler roda no worker
+    data = json.loads(payload)
+    obj = (data.get('data') or {}).get('object') or {}
+    customer = obj.get('customer') if isinstance(obj, dict) else None
+    # Reentregas do Stripe trazem o mesmo event.id e são descartadas em enqueue
+    enqueue(
+        'stripe', data,
+        event_id=data.get('id') or '',
+        event_type=data.get('type') or '',
+        ordering_key=f"stripe:{customer}" if customer else '',
     )
-
-    try:
-        handler(event_data)
-    except Exception as e:
-        print(f"ERRO NO HANDLER: Falha ao processar {event_type}: {e}")
-
-    print("DEBUG: Finalizando processamento do webhook Stripe")
     return HttpResponse(status=200)
@@ -1,6 +1,7 @@
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,6 +42,13 @@ if not SECRET_KEY:
     else:
         raise RuntimeError("SECRET_KEY not found in environment; set it in .env for production")
 
+# Segredo das thumbnails assinadas (guardian/signing.py). Vai também no conf do Nginx,
+# por isso é separado do SECRET_KEY.
+THUMBNAIL_SIGNING_KEY = os.getenv('THUMBNAIL_SIGNING_KEY', '')
+if not THUMBNAIL_SIGNING_KEY and DEBUG:
+    # Development fallback (not for production)
+    THUMBNAIL_SIGNING_KEY = 'dev-thumbnail-key-change-me'
+
 RENDER_EXTERNAL_HOSTNAME = os.environ.get('RENDER_EXTERNAL_HOSTNAME')
 
 ALLOWED_HOSTS = []
@@ -77,6 +85,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'guardian.middleware.language_neutral_media',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -102,6 +111,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.i18n',
                 'core.context_processors.stripe_prices',
+                'usuario.context_processors.favorites',
             ],
         },
     },
@@ -130,6 +140,32 @@ DATABASES = {
     }
 }
 
+# Cache compartilhado entre workers (limite de taxa, facetas, favoritos).
+# Sem CACHE_URL cai no LocMemCache, que vale só por processo.
+CACHE_URL = os.getenv('CACHE_URL') or os.getenv('REDIS_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'akka'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Buffers de contadores/log (core.utils.buffering) descarregam numa thread por processo.
+# Em `manage.py test` o flush é explícito, para os testes não dependerem do relógio.
+WRITE_BEHIND_BACKGROUND = sys.argv[1:2] != ['test']
+
+# Proxies cujo X-Real-IP / X-Forwarded-For é aceito (IPs ou CIDRs separados por vírgula),
+# p.ex. 127.0.0.1 com o Nginx local ou a rede interna do balanceador do Render.
+TRUSTED_PROXIES = [value.strip() for value in os.getenv('TRUSTED_PROXIES', '').split(',') if value.strip()]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -205,6 +241,26 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # quando o Django retornar um X-Accel-Redirect
 INTERNAL_MEDIA_URL = '/internal_media/'
 
+# Storage de mídia (FileAsset, thumbnails): disco local por padrão; MEDIA_STORAGE=s3 usa um
+# bucket S3-compatível (AWS, MinIO...) e o Nginx busca os objetos pelo proxy interno abaixo.
+# Caches regeneráveis (exportações PNG/código) continuam no MEDIA_ROOT de cada nó.
+INTERNAL_REMOTE_URL = '/internal_remote/'
+if os.getenv('MEDIA_STORAGE', 'local').lower() == 's3':
+    STORAGES = {
+        'default': {
+            'BACKEND': 'guardian.storage.S3Storage',
+            'OPTIONS': {
+                'endpoint_url': os.getenv('S3_ENDPOINT_URL'),
+                'bucket': os.getenv('S3_BUCKET'),
+                'access_key': os.getenv('S3_ACCESS_KEY'),
+                'secret_key': os.getenv('S3_SECRET_KEY'),
+                'region': os.getenv('S3_REGION', 'us-east-1'),
+                'addressing': os.getenv('S3_ADDRESSING', 'path'),
+            },
+        },
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -27,13 +27,15 @@ urlpatterns = [
     path('i18n/setlang/', set_language, name='set_language'),
     path('admin/', admin.site.urls),
     path('payment/', include('payment.urls')),
+    # Mídia protegida: caminho fixo para os blocos location do Nginx (cache_policy.nginx_snippet)
+    # e para as URLs assinadas, cuja assinatura cobre o caminho
+    path('guardian/', include('guardian.urls')),
 ]
 
 # Rotas que DEVEM TER PREFIXO DE IDIOMA
 urlpatterns += i18n_patterns(
     path('usuario/', include('usuario.urls')),
     path('support/', include('support.urls')),
-    path('guardian/', include('guardian.urls')),
     path('', include('core.urls')),
     prefix_default_language=True,
 )
@@ -0,0 +1,177 @@
+/*
+ * Busca instantânea no navegador sobre o índice binário do snapshot do catálogo
+ * (gerado por core/utils/search_index.py; formato descrito lá).
+ *
+ * Uso: AkkaInstantSearch.load(manifestUrl).then(ok => ...); AkkaInstantSearch.search('ico', 8)
+ * Se o manifest/índice não estiver disponível, load() resolve false e a página
+ * continua usando os endpoints do servidor (search_svg / autocomplete).
+ */
+(function () {
+  'use strict';
+
+  var MAGIC = 'AKIX';
+  var FORMAT_VERSION = 1;
+  var state = null;
+  var loading = null;
+
+  function Reader(bytes) {
+    this.bytes = bytes;
+    this.pos = 0;
+    this.decoder = new TextDecoder('utf-8');
+  }
+
+  Reader.prototype.varint = function () {
+    var result = 0;
+    var mul = 1;
+    var byte;
+    do {
+      byte = this.bytes[this.pos++];
+      result += (byte & 0x7f) * mul;
+      mul *= 128;
+    } while (byte >= 0x80);
+    return result;
+  };
+
+  Reader.prototype.string = function () {
+    var length = this.varint();
+    var text = this.decoder.decode(this.bytes.subarray(this.pos, this.pos + length));
+    this.pos += length;
+    return text;
+  };
+
+  // Mesma regra de core/utils/prefix_index.normalize: NFKD sem nenhuma marca (categoria M)
+  function normalize(text) {
+    return (text || '').normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase().trim();
+  }
+
+  function tokenize(text) {
+    return normalize(text).replace(/[-_,./]/g, ' ').split(/\s+/).filter(Boolean);
+  }
+
+  function decode(buffer) {
+    var bytes = new Uint8Array(buffer);
+    var header = String.fromCharCode(bytes[0], bytes[1], bytes[2], bytes[3]);
+    if (header !== MAGIC || bytes[4] !== FORMAT_VERSION) {
+      throw new Error('índice de busca inválido');
+    }
+    var r = new Reader(bytes);
+    r.pos = 5;
+
+    var docCount = r.varint();
+    var docs = new Array(docCount);
+    for (var i = 0; i < docCount; i++) {
+      var doc = { id: r.varint(), title: r.string(), priceCents: r.varint(), hasThumbnail: (r.varint() & 1) === 1, tagIds: [] };
+      for (var t = r.varint(); t > 0; t--) doc.tagIds.push(r.varint());
+      docs[i] = doc;
+    }
+
+    var tagCount = r.varint();
+    var tags = new Array(tagCount);
+    for (var j = 0; j < tagCount; j++) tags[j] = r.string();
+
+    // Tokens ordenados + postings como Uint32Array (posições crescentes = ordem de ranking)
+    var tokenCount = r.varint();
+    var tokens = new Array(tokenCount);
+    var postings = new Array(tokenCount);
+    var previous = '';
+    for (var k = 0; k < tokenCount; k++) {
+      var token = previous.slice(0, r.varint()) + r.string();
+      var n = r.varint();
+      var list = new Uint32Array(n);
+      var last = 0;
+      for (var p = 0; p < n; p++) {
+        last += r.varint();
+        list[p] = last;
+      }
+      tokens[k] = token;
+      postings[k] = list;
+      previous = token;
+    }
+    return { docs: docs, tags: tags, tokens: tokens, postings: postings };
+  }
+
+  function lowerBound(tokens, term) {
+    var lo = 0;
+    var hi = tokens.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >>> 1;
+      if (tokens[mid] < term) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  // Une as postings de todos os tokens com o prefixo (marcadas em um bitmap por documento)
+  function prefixMatches(term) {
+    var marks = new Uint8Array(state.docs.length);
+    var any = false;
+    for (var i = lowerBound(state.tokens, term); i < state.tokens.length && state.tokens[i].lastIndexOf(term, 0) === 0; i++) {
+      var list = state.postings[i];
+      for (var j = 0; j < list.length; j++) marks[list[j]] = 1;
+      any = true;
+    }
+    return any ? marks : null;
+  }
+
+  function toResult(doc) {
+    return {
+      id: doc.id,
+      title: doc.title,
+      price: (doc.priceCents / 100).toFixed(2),
+      tags: doc.tagIds.map(function (t) { return state.tags[t]; }),
+      hasThumbnail: doc.hasThumbnail
+    };
+  }
+
+  function search(query, limit) {
+    if (!state) return null;
+    var terms = tokenize(query);
+    if (!terms.length) return [];
+    limit = limit || 24;
+
+    var combined = null;
+    for (var i = 0; i < terms.length; i++) {
+      var marks = prefixMatches(terms[i]);
+      if (!marks) return [];
+      if (combined) {
+        for (var d = 0; d < combined.length; d++) combined[d] &= marks[d];
+      } else {
+        combined = marks;
+      }
+    }
+    var results = [];
+    for (var pos = 0; pos < combined.length && results.length < limit; pos++) {
+      if (combined[pos]) results.push(toResult(state.docs[pos]));
+    }
+    return results;
+  }
+
+  function load(manifestUrl) {
+    if (state) return Promise.resolve(true);
+    if (loading) return loading;
+    if (!manifestUrl || !window.fetch || !window.TextDecoder) return Promise.resolve(false);
+    var base = manifestUrl.slice(0, manifestUrl.lastIndexOf('/') + 1);
+    loading = fetch(manifestUrl, { credentials: 'same-origin' })
+      .then(function (r) { return r.ok ? r.json() : null; })
+      .then(function (manifest) {
+        if (!manifest || !manifest.search_index) return null;
+        // Nome com hash de conteúdo: o navegador pode manter o arquivo em cache indefinidamente
+        return fetch(base + manifest.search_index.file, { credentials: 'same-origin' });
+      })
+      .then(function (r) { return r && r.ok ? r.arrayBuffer() : null; })
+      .then(function (buffer) {
+        if (buffer) state = decode(buffer);
+        return !!state;
+      })
+      .catch(function () {
+        loading = null;
+        return false;
+      });
+    return loading;
+  }
+
+  window.AkkaInstantSearch = {
+    load: load,
+    search: search,
+    isReady: function () { return !!state; }
+  };
+})();
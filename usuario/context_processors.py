@@ -0,0 +1,14 @@
+from .services import get_favorite_ids
+
+
+def favorites(request):
+    """Injeta os IDs favoritos do usuário no contexto do template.
+
+    O valor é um callable para que o cache só seja consultado quando o
+    template realmente usar `favorite_ids`.
+    """
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return {'favorite_ids': []}
+    user_id = user.pk
+    return {'favorite_ids': lambda: get_favorite_ids(user_id, request)}
@@ -0,0 +1,53 @@
+import hashlib
+import json
+from typing import List
+
+from django.core.cache import cache
+
+from .models import Favorite
+
+FAVORITES_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _favorites_cache_key(user_id: int) -> str:
+    return f"usuario:favorites:{user_id}"
+
+
+def _build_favorites_entry(svg_ids) -> dict:
+    ids = list(svg_ids or [])
+    digest = hashlib.sha1(json.dumps(ids).encode('utf-8')).hexdigest()
+    return {'ids': ids, 'etag': digest}
+
+
+def get_favorites_entry(user_id: int, request=None) -> dict:
+    """Retorna {'ids', 'etag'} dos favoritos do usuário, lendo do cache quando possível.
+
+    A entrada vive no cache compartilhado (CACHES/CACHE_URL) e é regravada pelos sinais
+    de Favorite a cada save, em qualquer worker. Com `request`, é lida uma vez por
+    requisição (ETag e corpo usam a mesma). Não cria o registro Favorite: usuários sem
+    favoritos recebem lista vazia.
+    """
+    entry = getattr(request, '_favorites_entry', None)
+    if entry is not None:
+        return entry
+    key = _favorites_cache_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        svg_ids = Favorite.objects.filter(user_id=user_id).values_list('svg_ids', flat=True).first()
+        entry = _build_favorites_entry(svg_ids)
+        cache.set(key, entry, FAVORITES_CACHE_TIMEOUT)
+    if request is not None:
+        request._favorites_entry = entry
+    return entry
+
+
+def get_favorite_ids(user_id: int, request=None) -> List[int]:
+    return get_favorites_entry(user_id, request)['ids']
+
+
+def refresh_favorites_cache(user_id: int, svg_ids) -> None:
+    cache.set(_favorites_cache_key(user_id), _build_favorites_entry(svg_ids), FAVORITES_CACHE_TIMEOUT)
+
+
+def clear_favorites_cache(user_id: int) -> None:
+    cache.delete(_favorites_cache_key(user_id))
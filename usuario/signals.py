@@ -1,3 +1,20 @@
 import logging
 
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Favorite
+from .services import clear_favorites_cache, refresh_favorites_cache
+
 logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Favorite)
+def sync_favorites_cache(sender, instance, **kwargs):
+    # Mantém o cache coerente também para edições feitas pelo admin
+    refresh_favorites_cache(instance.user_id, instance.svg_ids)
+
+
+@receiver(post_delete, sender=Favorite)
+def drop_favorites_cache(sender, instance, **kwargs):
+    clear_favorites_cache(instance.user_id)
@@ -1,3 +1,60 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
 
-# Create your tests here.
+from .models import CustomUser, Favorite
+
+
+class FavoritesCacheTests(TestCase):
+    """Favoritos servidos pelo contexto da página e pelo endpoint com ETag."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='fav', email='fav@test.com', password='test123')
+        self.client.login(username='fav', password='test123')
+
+    def test_get_favorites_does_not_create_row(self):
+        response = self.client.get(reverse('usuario:get_favorites'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['favorite_ids'], [])
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
+
+    def test_get_favorites_returns_etag_and_304(self):
+        Favorite.objects.create(user=self.user, svg_ids=[3, 5])
+        response = self.client.get(reverse('usuario:get_favorites'))
+        self.assertEqual(response.json()['favorite_ids'], [3, 5])
+        etag = response['ETag']
+
+        response = self.client.get(reverse('usuario:get_favorites'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_when_favorites_change(self):
+        favorite = Favorite.objects.create(user=self.user, svg_ids=[3])
+        etag = self.client.get(reverse('usuario:get_favorites'))['ETag']
+
+        favorite.svg_ids.append(7)
+        favorite.save()
+
+        response = self.client.get(reverse('usuario:get_favorites'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['favorite_ids'], [3, 7])
+
+    def test_entry_is_read_once_per_request_and_cached_between_requests(self):
+        from django.test import RequestFactory
+        from .services import get_favorites_entry
+
+        Favorite.objects.create(user=self.user, svg_ids=[3])
+        cache.clear()
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(1):
+            get_favorites_entry(self.user.pk, request)
+            get_favorites_entry(self.user.pk, request)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_favorites_entry(self.user.pk)['ids'], [3])
+
+    def test_page_embeds_favorite_ids(self):
+        Favorite.objects.create(user=self.user, svg_ids=[42])
+        response = self.client.get(reverse('core:faq'))
+        self.assertContains(response, 'id="favorite-ids-data"')
+        self.assertContains(response, '[42]')
@@ -1,10 +1,13 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods, require_POST
+from django.views.decorators.http import require_http_methods, require_POST, condition
 from django.views.decorators.csrf import csrf_exempt
 from ..models import Favorite
+from ..services import get_favorites_entry
 from core.models import SvgFile
+from core.services.popularity import record_event
+from core.utils.serialization import FastJsonResponse
 import json
 
 
@@ -69,6 +72,7 @@ def toggle_favorite(request):
             message = 'SVG adicionado aos favoritos'
         
         favorite_obj.save()
+        record_event(svg.pk, 'favorite', 1 if is_favorited else -1)
         
         return JsonResponse({
             'success': True,
@@ -83,15 +87,22 @@ def toggle_favorite(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _favorites_etag(request):
+    return get_favorites_entry(request.user.pk, request)['etag']
+
+
 @login_required
 @require_http_methods(["GET"])
+@condition(etag_func=_favorites_etag)
 def get_favorites(request):
-    """API endpoint para obter a lista de IDs dos favoritos do usuário"""
+    """API endpoint para obter a lista de IDs dos favoritos do usuário.
+
+    Responde com ETag; clientes que enviam If-None-Match recebem 304 se a lista não mudou.
+    """
     try:
-        favorite_obj, created = Favorite.objects.get_or_create(user=request.user)
-        svg_ids = favorite_obj.svg_ids if favorite_obj.svg_ids else []
+        svg_ids = get_favorites_entry(request.user.pk, request)['ids']
         
-        return JsonResponse({
+        return FastJsonResponse({
             'success': True,
             'favorite_ids': svg_ids,
             'total_favorites': len(svg_ids)
@@ -13,6 +13,7 @@ from django.core.signing import BadSignature, SignatureExpired
 import logging
  
 from core.utils.date_utils import datefield_now, one_month_more, one_year_more
+from core.utils.serialization import FastJsonResponse
 from message.views import notify_discord
 
 stripe.api_key = STRIPE_SECRET_KEY
@@ -89,15 +90,9 @@ def add_vip_to_user_by_hash(hash_id: str, addition_type: str = "month"):
 
 @admin_or_system_only
 def vip_status_all(request):
-    users = CustomUser.objects.filter(is_vip=True)
-    vip_users = []
-    for user in users:  
-        vip_users.append({
-            'username': user.username,
-            'vip_expiration': user.vip_expiration,
-        })
+    vip_users = list(CustomUser.objects.filter(is_vip=True).values('username', 'vip_expiration'))
     context = { 'vip_users': vip_users }
-    return JsonResponse({'vip_status_all': context})
+    return FastJsonResponse({'vip_status_all': context})
 
 
 